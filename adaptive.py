@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import math
+from statistics import NormalDist
+from typing import Callable
+import numpy as np
+
+from warframe_simulacrum.weapon import FireMode
+from warframe_simulacrum.unit import Unit
+from warframe_simulacrum.batch import BatchSimulation
+
+STAT_MEAN = 'mean'
+STAT_MEDIAN = 'median'
+STAT_QUANTILE = 'quantile'
+BATCH_BLOCK_SIZE = 100
+
+
+def run_adaptive(run_trials:Callable[[int, int], np.ndarray], statistic:str=STAT_MEAN, quantile:float=0.5, target_width:float=0.02,
+                 relative:bool=True, confidence:float=0.95, batch_size:int=100, min_trials:int=100, max_trials:int=10000) -> dict:
+    '''
+    Adds trials in batches until the confidence interval of the kill time statistic is at most target_width wide, or max_trials ran.
+    run_trials(start, count) runs trials start..start+count-1 and returns their kill times, inf for trials without a kill.
+    With relative the width is a fraction of the estimate, otherwise it is in seconds.
+    statistic is 'mean' (over the kills), 'median' or 'quantile', where quantiles count trials without a kill as infinitely slow.
+    '''
+    if statistic == STAT_MEDIAN:
+        quantile = 0.5
+    elif statistic not in (STAT_MEAN, STAT_QUANTILE):
+        raise ValueError(f"Unknown statistic {statistic}")
+    if max_trials < 1:
+        raise ValueError(f"max_trials must be at least 1, got {max_trials}")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    parts = []
+    trials = 0
+    while True:
+        count = min(batch_size if trials >= min_trials else max(batch_size, min_trials), max_trials - trials)
+        parts.append(np.asarray(run_trials(trials, count), dtype=np.float64))
+        trials += count
+        kill_times = np.concatenate(parts)
+        parts = [kill_times]
+
+        if statistic == STAT_MEAN:
+            estimate, low, high = get_mean_interval(kill_times[np.isfinite(kill_times)], z)
+        else:
+            estimate, low, high = get_quantile_interval(kill_times, quantile, z)
+        width = high - low if math.isfinite(low) and math.isfinite(high) else math.inf
+        relative_width = width / estimate if 0 < estimate < math.inf else math.inf
+        converged = (relative_width if relative else width) <= target_width
+        if statistic != STAT_MEAN and low == math.inf:
+            # the quantile is confidently past max time, more trials will not bound it
+            converged = True
+        if converged or trials >= max_trials:
+            break
+
+    kills = int(np.sum(np.isfinite(kill_times)))
+    return dict(statistic=statistic, quantile=quantile if statistic != STAT_MEAN else None, confidence=confidence, trials=trials,
+                kills=kills, kill_rate=kills/trials, estimate=estimate, ci_low=low, ci_high=high, ci_width=width,
+                ci_relative_width=relative_width, converged=converged, kill_times=kill_times)
+
+
+def get_mean_interval(kill_times:np.ndarray, z:float):
+    '''
+    Normal approximation interval of the mean, nan while there are fewer than two kills.
+    '''
+    n = len(kill_times)
+    if n < 2:
+        return math.nan, -math.inf, math.inf
+    mean = float(np.mean(kill_times))
+    half_width = z * float(np.std(kill_times, ddof=1)) / math.sqrt(n)
+    return mean, mean - half_width, mean + half_width
+
+
+def get_quantile_interval(kill_times:np.ndarray, quantile:float, z:float):
+    '''
+    Distribution free interval of a quantile from the order statistics around it, with the binomial ranks in normal approximation.
+    The bounds are inf while they fall on trials without a kill.
+    '''
+    n = len(kill_times)
+    ordered = np.sort(kill_times)
+    spread = z * math.sqrt(n * quantile * (1 - quantile))
+    # 1-based ranks n*q - spread and n*q + 1 + spread
+    low_rank = min(n - 1, max(0, round(n * quantile - spread) - 1))
+    high_rank = min(n - 1, max(0, round(n * quantile + spread)))
+    estimate = float(np.quantile(ordered, quantile, method='inverted_cdf'))
+    return estimate, float(ordered[low_rank]), float(ordered[high_rank])
+
+
+def get_simulation_trials(simulation, enemy:Unit, fire_mode:FireMode, primer:FireMode=None):
+    '''
+    run_trials for run_adaptive on a Simulation. Trial i always runs on substream i, so the first n trials do not depend on the batching.
+    '''
+    def run_trials(start, count):
+        kill_times = np.full(count, np.inf)
+        for i in range(count):
+            censored = simulation.stats.censored
+            simulation.run(enemy, fire_mode, primer, start + i, keep_records=False)
+            if simulation.stats.censored == censored:
+                kill_times[i] = simulation.time
+        return kill_times
+    return run_trials
+
+
+def get_batch_trials(enemy:Unit, fire_mode:FireMode, primer:FireMode=None, max_time:float=20, seed_sequence:np.random.SeedSequence=None,
+                     block_size:int=BATCH_BLOCK_SIZE):
+    '''
+    run_trials for run_adaptive on the batched engine. Trials run in blocks of block_size, block k on child k of seed_sequence,
+    so trial i does not depend on the batching. Batches of block_size run one block each.
+    '''
+    seed_sequence = seed_sequence if seed_sequence is not None else np.random.SeedSequence()
+    # only the last block is kept, run_adaptive asks for consecutive trials
+    blocks = {}
+
+    def get_block(index):
+        if index not in blocks:
+            blocks.clear()
+            child = np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + (index,), pool_size=seed_sequence.pool_size)
+            blocks[index] = BatchSimulation(block_size, max_time=max_time, seed=child).run(enemy, fire_mode, primer)
+        return blocks[index]
+
+    def run_trials(start, count):
+        parts = []
+        for index in range(start // block_size, (start + count - 1) // block_size + 1):
+            offset = index * block_size
+            parts.append(get_block(index)[max(start, offset) - offset:min(start + count, offset + block_size) - offset])
+        return np.concatenate(parts) if parts else np.zeros(0)
+    return run_trials
@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import math
+import numpy as np
+import warframe_simulacrum.constants as const
+from warframe_simulacrum.batch import BatchSimulation, BatchState, BatchFireMode
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from warframe_simulacrum.unit import Unit
+    from warframe_simulacrum.weapon import FireMode
+
+# rows of the per hit layer damage arrays
+OVERGUARD = 0
+SHIELD = 1
+BLEED = 2 # toxin damage reaching health while shields are up
+HEALTH = 3
+
+# triggers stepped through before a fire mode that does not kill is reported as never killing
+MAX_TRIGGERS = 100000
+# kill probability left over when the trigger walk stops
+SURVIVAL_TOLERANCE = 1e-6
+# proc stacks are recomputed once the time since the first hit grew by this many seconds, or this fraction
+RAMP_STEP = 0.1
+RAMP_RATIO = 0.05
+
+# damage over time procs: proc id -> (damage lane, weapon bonus modifier, radial tick)
+DOT_PROCS = {const.PT_INDEX['PT_SLASH']: (const.PROCID_DAMAGETYPE[const.PT_INDEX['PT_SLASH']], None, False),
+             const.PT_INDEX['PT_HEAT']: (const.DT_INDEX['DT_HEAT'], 'heat_m', False),
+             const.PT_INDEX['PT_TOXIN']: (const.DT_INDEX['DT_TOXIN'], 'toxin_m', False),
+             const.PT_INDEX['PT_ELECTRIC']: (const.DT_INDEX['DT_ELECTRIC'], 'electric_m', True),
+             const.PT_INDEX['PT_GAS']: (const.DT_INDEX['DT_GAS'], None, True)}
+
+
+class AnalyticEvaluator():
+    '''
+    Closed form expected damage, DPS and time to kill of one fire mode against one enemy, without running events.
+
+    Crit tiers, multishot and proc rolls are summed over their exact distributions. Procs build up from the first hit:
+    t seconds in, each proc type holds min(rate * min(t, lifetime), max stacks) stacks, where the lifetime is the duration,
+    or for procs that refresh the whole stack the expected time until a gap between procs outlasts it. The stacks set the
+    armor strip, viral/magnetic multipliers, crit bonuses and condition overload, and each damage over time stack ticks once
+    per second from a second after it was applied. The time to kill steps through the triggers of the fire mode, and DPS
+    is reported with the procs built up by then. The damage controllers are evaluated with the batched engine's formulas,
+    one row per crit tier.
+    '''
+    def __init__(self, enemy:Unit, fire_mode:FireMode) -> None:
+        fire_mode.reset()
+        enemy.reset()
+        self.enemy = enemy
+        self.fire_mode = fire_mode
+        # two rows: the two crit tiers a roll can land on
+        self.state = BatchState(BatchSimulation(2), enemy, fire_mode)
+        self.stats = BatchFireMode(fire_mode, enemy)
+        self.effects = [(BatchFireMode(fme, enemy), float(fme.multishot.modded)) for fme in fire_mode.fire_mode_effects.values()]
+        self.proc_managers = enemy.proc_controller.proc_managers
+
+        self.trigger_rate = self.get_trigger_rate()
+        self.hits_per_trigger = self.get_hits_per_trigger()
+        self.proc_durations = self.get_proc_durations()
+        self.max_stacks = np.array([manager.max_stacks for manager in self.proc_managers], dtype=np.float64)
+        self.proc_rates = self.get_proc_rates()
+        self.stack_lifetimes = self.get_stack_lifetimes()
+        self.set_proc_time(math.inf)
+
+    def get_trigger_rate(self):
+        fm = self.fire_mode
+        cycle_time = fm.fireTime.modded + fm.chargeTime.modded
+        if fm.ammoCost.modded <= 0:
+            return 1 / cycle_time
+        # the last shot of a magazine waits for the reload instead of the fire time
+        shots = max(1, math.ceil(fm.magazineSize.modded / fm.ammoCost.modded))
+        magazine_time = shots * cycle_time - fm.fireTime.modded + max(fm.reloadTime.modded, fm.fireTime.modded)
+        return shots / magazine_time
+
+    def get_hits_per_trigger(self):
+        # (stats, expected hits per trigger, status chance multiplier)
+        pellets = 1 if self.stats.held else self.stats.multishot
+        held_status = self.stats.multishot if self.stats.held else 1
+        hits = [(self.stats, pellets, held_status)]
+        hits += [(stats, pellets * multishot, held_status) for stats, multishot in self.effects]
+        return hits
+
+    def get_proc_durations(self):
+        return np.array([manager.base_duration * self.stats.status_duration for manager in self.proc_managers])
+
+    def get_proc_rates(self):
+        rates = np.zeros(len(self.proc_managers))
+        for stats, hits, held_status in self.hits_per_trigger:
+            # damage lanes past the last proc type never proc
+            per_hit = stats.proc_chance * held_status * np.asarray(stats.fire_mode.procProbabilities[:len(rates)], dtype=np.float64)
+            for proc_id in stats.forced_procs:
+                per_hit[proc_id] += 1
+            rates += self.trigger_rate * hits * per_hit
+        return rates
+
+    def get_stack_lifetimes(self):
+        # procs that refresh the whole stack keep it until a gap between procs is longer than the duration
+        lifetimes = self.proc_durations.copy()
+        for proc_id, manager in enumerate(self.proc_managers):
+            rate = self.proc_rates[proc_id]
+            if getattr(manager, 'refresh', False) and rate > 0:
+                lifetimes[proc_id] = math.expm1(min(rate * lifetimes[proc_id], 700)) / rate
+        return lifetimes
+
+    def get_proc_stacks(self, time:float):
+        # stacks built up `time` seconds after the first hit, procs older than their lifetime have expired
+        active_time = np.minimum(max(0., time), self.stack_lifetimes)
+        return np.minimum(self.proc_rates * active_time, self.max_stacks), active_time
+
+    def set_proc_time(self, time:float):
+        '''
+        Sets the proc stacks and the debuffs they cause to their expected values `time` seconds after the first hit.
+        '''
+        state = self.state
+        self.proc_stacks, active_time = self.get_proc_stacks(time)
+        self.unique_proc_count = float(np.sum(1 - np.exp(-self.proc_rates * active_time)))
+        stacks = self.proc_stacks
+        heat_active = 1 - math.exp(-self.proc_rates[state.heat_id] * active_time[state.heat_id])
+        state.corrosive_multiplier[:] = interpolate(const.CORROSIVE_ARMOR_STRIP, stacks[const.PT_INDEX['PT_CORROSIVE']])
+        state.heat_multiplier[:] = 1 - heat_active * (1 - const.HEAT_ARMOR_STRIP[4])
+        if state.armor_initial > 0:
+            state.set_armor(state.all_index)
+        state.health_damage_multiplier[:] = interpolate(const.VIRAL_DEBUFF, stacks[const.PT_INDEX['PT_VIRAL']])
+        state.shield_damage_multiplier[:] = interpolate(const.MAGNETIC_DEBUFF, stacks[const.PT_INDEX['PT_MAGNETIC']])
+
+    def set_critical_tiers(self, stats:BatchFireMode):
+        '''
+        Fills the two state rows with the crit tiers of one hit. Returns their probabilities and the tiered and unmodified crit multipliers.
+        '''
+        state = self.state
+        critical_chance = stats.critical_chance
+        cold_bonus = 0
+        if not stats.radial:
+            critical_chance += self.proc_stacks[const.PT_INDEX['PT_PUNCTURE']] * 0.05
+            cold_count = self.proc_stacks[const.PT_INDEX['PT_COLD']]
+            cold_bonus = min(1, cold_count) * 0.1 + max(0, cold_count - 1) * 0.05
+        low = math.floor(critical_chance)
+        critical_tier = np.array([low, low + 1])
+        probabilities = np.array([1 - (critical_chance - low), critical_chance - low])
+
+        base_cm = np.where(critical_tier > 0, (stats.critical_multiplier + cold_bonus) * stats.bodypart_critical_bonus * stats.critical_final_multiplier, stats.critical_multiplier)
+        state.critical_tier[:] = critical_tier
+        state.critical_multiplier[:] = base_cm
+
+        unmodified_cm = np.where(critical_tier > 0, (base_cm - 1) * critical_tier + 1, 1.)
+        if state.critical_controller_type == "CC_ACOLYTE":
+            tier_1 = (base_cm - 1) * 0.5 + 1
+            tier_increase = tier_1 / (1 + 1 / (base_cm - 1))
+            tiered_cm = np.where(critical_tier > 0, tier_1 + (critical_tier - 1) * tier_increase, 1.)
+        else:
+            tiered_cm = unmodified_cm
+        return probabilities, tiered_cm, unmodified_cm
+
+    def get_multiplier(self, stats:BatchFireMode, bodypart:str, held_multiplier:float, multishot_damage:float, radial=False):
+        # same factors as BatchState.apply_damage
+        enemy = self.enemy
+        bodypart_multiplier = float(enemy.bodypart_multipliers.get(bodypart, {}).get('multiplier', 1))
+        if radial and bodypart == 'head':
+            bodypart_multiplier = 1
+        bodypart_bonus = stats.headshot_bonus if bodypart == 'head' else 1
+        return bodypart_multiplier * bodypart_bonus * self.state.animation_multiplier * self.state.base_dr * stats.faction_bonus * \
+                    held_multiplier * (1 + multishot_damage)
+
+    def layer_damage(self, stats:BatchFireMode, damage:np.ndarray, scale:np.ndarray, critical_multiplier:np.ndarray):
+        '''
+        Damage one hit deals to each protection layer, one column per state row. Mirrors BatchState.remove_protection without applying it.
+        '''
+        state = self.state
+        j = state.all_index
+        res = np.zeros((4, len(j)))
+
+        overguard_damage = (damage @ state.overguard_modifier) * scale
+        res[OVERGUARD] = overguard_damage * state.damage_reduction(stats, j, overguard_damage, critical_multiplier) * critical_multiplier
+
+        if damage[6] > 0:
+            bleed_damage = damage[6] * scale * state.armor_dr[j, 6] * state.health_modifier[6] * state.health_damage_multiplier * state.health_vulnerability
+            res[BLEED] = bleed_damage * state.damage_reduction(stats, j, bleed_damage, critical_multiplier) * critical_multiplier * critical_multiplier
+        shield_damage = (damage @ state.shield_modifier) * scale * state.shield_damage_multiplier * state.shield_vulnerability
+        res[SHIELD] = shield_damage * state.damage_reduction(stats, j, shield_damage, critical_multiplier) * critical_multiplier
+
+        health_damage = (state.armor_dr[j] @ (damage * state.health_modifier)) * scale * state.health_damage_multiplier * state.health_vulnerability
+        res[HEALTH] = health_damage * state.damage_reduction(stats, j, health_damage, critical_multiplier) * critical_multiplier
+        return res
+
+    def hit_moments(self, stats:BatchFireMode, held_multiplier:float, multishot_damage:float):
+        '''
+        Mean and second moment of the layer damage of one hit, and its mean status damage.
+        '''
+        probabilities, tiered_cm, unmodified_cm = self.set_critical_tiers(stats)
+        damage_multiplier = stats.damage_multiplier(self.unique_proc_count)
+        multiplier = self.get_multiplier(stats, stats.bodypart, held_multiplier, multishot_damage)
+
+        scale = np.full(2, damage_multiplier * multiplier)
+        if stats.attrition_chance > 0:
+            scale[self.state.critical_tier == 0] *= stats.attrition_chance + (1 - stats.attrition_chance) * 21
+
+        res = self.layer_damage(stats, stats.base_damage, scale, tiered_cm)
+        status_damage = stats.total_damage_base * damage_multiplier * multiplier * (unmodified_cm @ probabilities)
+        return res @ probabilities, (res ** 2) @ probabilities, status_damage
+
+    def trigger_moments(self):
+        '''
+        Mean and variance of the layer damage of one trigger pull (pellets and secondary effects), and the expected status damage dealt per trigger by each hit source.
+        '''
+        stats = self.stats
+        low = math.floor(stats.multishot)
+        rolls = [(low, 1 - (stats.multishot - low)), (low + 1, stats.multishot - low)]
+        base_held = float(stats.weapon.damagePerShot_m["multishot_multiplier"])
+
+        mean = np.zeros(4)
+        second = np.zeros(4)
+        status_damage = np.zeros(len(self.hits_per_trigger))
+        for roll, p in rolls:
+            if p <= 0:
+                continue
+            if stats.held:
+                pellets, held_multiplier, multishot_damage = 1, roll, 0
+            else:
+                pellets, held_multiplier, multishot_damage = roll, base_held, stats.multishot_damage if roll > 1 else 0
+
+            m, s, sd = self.hit_moments(stats, held_multiplier, multishot_damage)
+            roll_mean = pellets * m
+            roll_var = pellets * (s - m ** 2)
+            status_damage[0] += p * pellets * sd
+            for k, (fme_stats, fme_multishot) in enumerate(self.effects):
+                fme_m, fme_s, fme_sd = self.hit_moments(fme_stats, held_multiplier, multishot_damage)
+                fme_low = math.floor(fme_multishot)
+                fme_frac = fme_multishot - fme_low
+                roll_mean = roll_mean + pellets * fme_multishot * fme_m
+                roll_var = roll_var + pellets * (fme_multishot * (fme_s - fme_m ** 2) + fme_frac * (1 - fme_frac) * fme_m ** 2)
+                status_damage[k + 1] += p * pellets * fme_multishot * fme_sd
+            mean += p * roll_mean
+            second += p * (roll_var + roll_mean ** 2)
+
+        # hits_per_trigger already counts the pellets, status damage is per hit
+        hits = np.array([h for _, h, _ in self.hits_per_trigger])
+        status_damage = np.divide(status_damage, hits, out=np.zeros_like(status_damage), where=hits > 0)
+        return mean, second - mean ** 2, status_damage
+
+    def dot_dps(self, status_damage:np.ndarray, stacks:np.ndarray=None):
+        '''
+        Layer DPS of the damage over time procs: every stack ticks its share of its source status damage once per second.
+        stacks defaults to the current proc stacks.
+        '''
+        stacks = self.proc_stacks if stacks is None else stacks
+        dps = np.zeros(4)
+        self.set_critical_tiers(self.stats)
+        for proc_id, (lane, bonus_name, radial) in DOT_PROCS.items():
+            if stacks[proc_id] <= 0:
+                continue
+            manager = self.proc_managers[proc_id]
+            bonus = 1 + getattr(self.stats.weapon, bonus_name)["base"] if bonus_name is not None else 1
+            # expected status damage of one stack, weighted by the rate each hit source procs it
+            source_rates = np.zeros(len(self.hits_per_trigger))
+            for k, (stats, hits, held_status) in enumerate(self.hits_per_trigger):
+                source_rates[k] = self.trigger_rate * hits * (stats.proc_chance * held_status * stats.fire_mode.procProbabilities[proc_id] + stats.forced_procs.count(proc_id))
+            stack_damage = (source_rates @ status_damage) / source_rates.sum() * manager.damage_scaling * bonus
+
+            damage = np.zeros(20)
+            damage[lane] = 1
+            bodypart = self.stats.bodypart if radial else 'body'
+            multiplier = self.get_multiplier(self.stats, bodypart, float(self.stats.weapon.damagePerShot_m["multishot_multiplier"]), 0, radial)
+            tick = self.layer_damage(self.stats, damage, np.full(2, stack_damage * multiplier), np.ones(2))
+            dps += tick[:, 0] * stacks[proc_id]
+        return dps
+
+    def evaluate(self) -> dict:
+        ttk, ttk_std = self.get_time_to_kill()
+        # refreshed stacks can grow for as long as the fight lasts, without a kill they are taken over one duration
+        self.set_proc_time(ttk - self.get_first_hit() if math.isfinite(ttk) else float(np.max(self.proc_durations)))
+        mean, var, status_damage = self.trigger_moments()
+        direct_dps = mean * self.trigger_rate
+        dot_dps = self.dot_dps(status_damage)
+        dps = direct_dps + dot_dps
+
+        pellets_per_second = self.trigger_rate * (1 if self.stats.held else self.stats.multishot)
+        return dict(trigger_rate=self.trigger_rate, pellets_per_second=pellets_per_second,
+                    trigger_damage=float(mean[HEALTH]), trigger_damage_std=float(math.sqrt(max(0, var[HEALTH]))),
+                    direct_dps=float(direct_dps[HEALTH]), dot_dps=float(dot_dps[HEALTH]), dps=float(dps[HEALTH]),
+                    shield_dps=float(dps[SHIELD]), overguard_dps=float(dps[OVERGUARD]),
+                    unique_proc_count=self.unique_proc_count, ttk=ttk, ttk_std=ttk_std)
+
+    def get_first_hit(self):
+        # the first trigger is pulled after the charge time and embed delay, and its pellets land an embed delay later
+        fm = self.fire_mode
+        return fm.chargeTime.modded + 2 * fm.embedDelay.modded
+
+    def get_time_to_kill(self):
+        '''
+        Mean and std of the time of the killing hit. Triggers are stepped through on the fire mode's schedule, each removing
+        its expected layer damage with the procs built up by then, and damage over time is added between them.
+        After n triggers the remaining pool, in triggers of the current damage, is normal with the summed relative variance
+        of the triggers so far, which gives the chance the enemy is still alive.
+        '''
+        fm = self.fire_mode
+        state = self.state
+        pool = Pool(float(state.overguard[0]), float(state.shield[0]), float(state.health[0]))
+        if pool.is_dead():
+            return 0., 0.
+
+        # procs stop building up once the longest lasting one expires, a second later for its last tick
+        ramp_time = float(np.max(self.stack_lifetimes[self.proc_rates > 0], initial=0)) + 1
+        trigger_time = fm.chargeTime.modded + fm.embedDelay.modded
+        first_hit = self.get_first_hit()
+        # the average hit of a trigger also sees the procs of the hits before it in the same trigger
+        hits = sum(h for _, h, _ in self.hits_per_trigger)
+        trigger_offset = (1 - 1 / hits) / 2 / self.trigger_rate if hits > 1 else 0.
+        magazine = float(fm.magazineSize.current)
+
+        survival = 1.
+        variance = 0.
+        ttk = ttk_square = 0.
+        last_hit = first_hit
+        dot_dps = np.zeros(4)
+        stacks_time = -math.inf
+        for _ in range(MAX_TRIGGERS):
+            hit_time = trigger_time + fm.embedDelay.modded
+            pool.remove(dot_dps, hit_time - last_hit)
+            last_hit = hit_time
+
+            proc_time = min(hit_time - first_hit, ramp_time)
+            if stacks_time < ramp_time and proc_time >= min(ramp_time, stacks_time + max(RAMP_STEP, RAMP_RATIO * stacks_time)):
+                stacks_time = proc_time
+                self.set_proc_time(proc_time + trigger_offset)
+                mean, var, status_damage = self.trigger_moments()
+                # a stack ticks a second after it was applied
+                dot_dps = self.dot_dps(status_damage, self.get_proc_stacks(proc_time - 1)[0])
+
+            layer = pool.get_layer()
+            if mean[layer] > 0:
+                variance += var[layer] / mean[layer] ** 2
+            triggers_left = pool.remove(mean, 1)
+            if stacks_time >= ramp_time and triggers_left == math.inf and dot_dps[pool.get_layer()] <= 0:
+                # nothing left that damages the current layer
+                return math.inf, math.inf
+
+            if variance > 0:
+                alive = 0.5 * math.erfc(-triggers_left / math.sqrt(2 * variance))
+            else:
+                alive = 1. if triggers_left > 0 else 0.
+            alive = min(survival, alive)
+            ttk += (survival - alive) * hit_time
+            ttk_square += (survival - alive) * hit_time ** 2
+            survival = alive
+            if survival < SURVIVAL_TOLERANCE:
+                break
+
+            magazine -= fm.ammoCost.modded
+            if magazine > 0:
+                trigger_time += fm.fireTime.modded + fm.chargeTime.modded
+            else:
+                magazine = fm.magazineSize.modded
+                trigger_time += max(fm.reloadTime.modded, fm.fireTime.modded) + fm.chargeTime.modded
+        else:
+            return math.inf, math.inf
+
+        ttk /= 1 - survival
+        return ttk, math.sqrt(max(0., ttk_square / (1 - survival) - ttk ** 2))
+
+
+class Pool():
+    '''
+    Expected overguard, shield and health left, removed layer by layer like BatchState.apply_damage.
+    '''
+    def __init__(self, overguard:float, shield:float, health:float) -> None:
+        self.overguard = max(0., overguard)
+        self.shield = max(0., shield)
+        self.health = health
+
+    def is_dead(self):
+        return self.overguard <= 0 and self.health <= 0
+
+    def get_layer(self):
+        if self.overguard > 0:
+            return OVERGUARD
+        if self.shield > 0:
+            return SHIELD
+        return HEALTH
+
+    def remove(self, damage:np.ndarray, fraction:float):
+        '''
+        Removes fraction of the layer damage, the part of it left after a layer breaks carries over to the next one.
+        Returns how many more of that damage the pool takes, negative once it is dead.
+        '''
+        if fraction > 0 and self.overguard > 0:
+            used = min(fraction, self.overguard / damage[OVERGUARD]) if damage[OVERGUARD] > 0 else fraction
+            self.overguard = max(0., self.overguard - damage[OVERGUARD] * used)
+            fraction -= used
+        if fraction > 0 and self.overguard <= 0 and self.shield > 0:
+            used = min(fraction, self.shield / damage[SHIELD]) if damage[SHIELD] > 0 else fraction
+            self.shield = max(0., self.shield - damage[SHIELD] * used)
+            # toxin bleeds through to health while shields are up
+            self.health -= damage[BLEED] * used
+            fraction -= used
+        if fraction > 0 and self.overguard <= 0 and self.shield <= 0:
+            self.health -= damage[HEALTH] * fraction
+        return self.get_triggers_left(damage)
+
+    def get_triggers_left(self, damage:np.ndarray):
+        if self.is_dead():
+            return self.health / damage[HEALTH] if damage[HEALTH] > 0 else -math.inf
+        left = 0.
+        for value, layer in ((self.overguard, OVERGUARD), (self.shield, SHIELD), (max(0., self.health), HEALTH)):
+            if value > 0:
+                if damage[layer] <= 0:
+                    return math.inf
+                left += value / damage[layer]
+        return left
+
+
+def interpolate(table:dict, stacks:float):
+    # linear between the integer stack counts of a debuff table, capped at its last entry
+    stacks = min(stacks, max(table))
+    low = math.floor(stacks)
+    if low == stacks:
+        return table[low]
+    return table[low] + (table[low + 1] - table[low]) * (stacks - low)
+
+
+def evaluate(enemy:Unit, fire_mode:FireMode) -> dict:
+    return AnalyticEvaluator(enemy, fire_mode).evaluate()
+
+
+def rank_fire_modes(enemy:Unit, fire_modes:List[FireMode], key:str='ttk') -> List[tuple]:
+    '''
+    Evaluates every fire mode and returns (result, fire mode) pairs sorted by key, best first.
+    '''
+    results = [(evaluate(enemy, fire_mode), fire_mode) for fire_mode in fire_modes]
+    reverse = key != 'ttk'
+    return sorted(results, key=lambda r: r[0][key], reverse=reverse)
@@ -0,0 +1,771 @@
+from __future__ import annotations
+
+import heapq
+import numpy as np
+import warframe_simulacrum.constants as const
+import warframe_simulacrum.procs as pm
+from warframe_simulacrum.killstats import TrialStats
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from warframe_simulacrum.unit import Unit
+    from warframe_simulacrum.weapon import FireMode
+
+# event kinds
+TRIGGER = 0
+PELLET = 1
+CONTAINER_TICK = 2
+CONTAINER_EXPIRY = 3
+AOE_TICK = 4
+STACK_EXPIRY = 5
+HEAT_TICK = 6
+HEAT_EXPIRY = 7
+HEAT_STRIP = 8
+HEAT_REGEN = 9
+
+EMPTY_INDEX = np.zeros(0, dtype=np.int64)
+
+
+class BatchSimulation():
+    '''
+    Runs `trials` independent kill-time simulations of one fire mode against one enemy in lockstep.
+
+    Trigger pulls, pellet arrival times and proc tick phases are the same for every trial (they only
+    depend on the fire mode), so the event timeline is shared and each event updates the state of all
+    trials it applies to as NumPy arrays of shape (trials,) or (trials, 20).
+    '''
+    def __init__(self, trials:int, max_time:float=20, seed=None) -> None:
+        self.trials = trials
+        self.max_time = max_time
+        self.rng = np.random.default_rng(seed)
+        self.kill_times = []
+        self.kill_time_array = np.full(trials, np.inf)
+        self.stats = TrialStats(max_time)
+
+    def clear_records(self):
+        self.kill_times = []
+        self.stats = TrialStats(self.max_time)
+
+    def run(self, enemy:Unit, fire_mode:FireMode, primer:FireMode=None):
+        fire_mode.reset()
+        enemy.reset()
+        state = BatchState(self, enemy, fire_mode)
+        start_pool = state.overguard + state.shield + state.health
+
+        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded + 1e-6
+        state.push(event_time, TRIGGER, None)
+
+        if primer and len(primer.forcedProc)>0:
+            state.pellet_event(state.get_stats(primer), state.all_index)
+
+        state.run_events()
+
+        self.kill_time_array = state.kill_time
+        self.kill_times += state.kill_time[np.isfinite(state.kill_time)].tolist()
+        remaining = np.maximum(state.overguard, 0) + np.maximum(state.shield, 0) + np.maximum(state.health, 0)
+        self.stats.add_many(state.kill_time, start_pool - remaining)
+        return state.kill_time
+
+    def run_reapeated(self, enemy:Unit, fire_mode:FireMode, primer:FireMode=None, count=1):
+        self.kill_times = []
+        for _ in range(count):
+            self.run(enemy, fire_mode, primer)
+        return np.array(self.kill_times)
+
+
+class BatchFireMode():
+    '''
+    Snapshot of the modded values of a FireMode (or FireModeEffect) used by the batched engine.
+    '''
+    def __init__(self, fire_mode:FireMode, enemy:Unit) -> None:
+        weapon = fire_mode.weapon
+        self.fire_mode = fire_mode
+        self.weapon = weapon
+        self.radial = fire_mode.radial
+        self.held = fire_mode.trigger == "HELD"
+        self.bodypart = fire_mode.target_bodypart
+
+        self.base_damage = (fire_mode.damagePerShot.quantized * fire_mode.damagePerShot.base_total).astype(np.float64)
+        self.total_damage_base = float(fire_mode.totalDamage.base_modified)
+        self.condition_overloaded = fire_mode.condition_overloaded
+        self.damage_base = weapon.damagePerShot_m["base"]
+        self.damage_direct = weapon.damagePerShot_m["condition_overload_base"] + weapon.damagePerShot_m["direct"]
+        self.damage_multiplicative = weapon.damagePerShot_m["multiplicative_condition_overload"]
+        self.damage_final = weapon.damagePerShot_m["final_multiplier"]
+        self.multishot_damage = weapon.damagePerShot_m["multishot_damage"]
+
+        self.critical_chance = float(fire_mode.criticalChance.modded)
+        self.critical_multiplier = float(fire_mode.criticalMultiplier.modded)
+        self.critical_final_multiplier = float(weapon.criticalMultiplier_m["final_multiplier"])
+        self.bodypart_critical_bonus = 1. if self.radial else float(enemy.bodypart_multipliers.get(self.bodypart, {}).get('critical_damage_multiplier', 1))
+
+        self.proc_chance = float(fire_mode.procChance.modded)
+        self.proc_cumulative = np.cumsum(np.asarray(fire_mode.procProbabilities, dtype=np.float64))
+        self.forced_procs = list(fire_mode.forcedProc)
+        self.status_duration = 1 + weapon.statusDuration_m["base"]
+        self.toxin_bonus = 1 + weapon.toxin_m["base"]
+        self.heat_bonus = 1 + weapon.heat_m["base"]
+        self.electric_bonus = 1 + weapon.electric_m["base"]
+
+        self.headshot_bonus = 1 + weapon.damagePerShot_m["headshot_base"]
+        self.faction_bonus = 1 + weapon.factionDamage_m["base"]
+
+        self.fire_rate = float(fire_mode.fireRate.modded)
+        self.multishot = float(fire_mode.multishot.modded)
+        self.multishot_base = float(fire_mode.multishot.base)
+
+        self.attrition_chance = weapon.special_m['attrition_chance']
+        self.encumber_chance = weapon.special_m['encumber_chance']
+
+    def damage_multiplier(self, unique_proc_count):
+        if self.radial or not self.condition_overloaded:
+            unique_proc_count = 0
+        return (1 + self.damage_base + unique_proc_count * self.damage_direct) * self.damage_final * \
+                    (1 + unique_proc_count * self.damage_multiplicative)
+
+
+class StackPool():
+    '''
+    FIFO stacks of one proc type for every trial, bucketed by the time slot they were applied in.
+    '''
+    def __init__(self, trials:int) -> None:
+        self.count = np.zeros(trials, dtype=np.int64)
+        self.total = np.zeros(trials)
+        self.slots = {}
+
+    def add(self, slot:int, idx:np.ndarray, damage, max_stacks):
+        full = idx[self.count[idx] >= max_stacks]
+        if len(full) > 0:
+            self.remove_oldest(full)
+
+        new_slot = slot not in self.slots
+        if new_slot:
+            self.slots[slot] = (np.zeros(len(self.count), dtype=np.int64), np.zeros(len(self.count)))
+        counts, damages = self.slots[slot]
+        counts[idx] += 1
+        damages[idx] += damage
+        self.count[idx] += 1
+        self.total[idx] += damage
+        return new_slot
+
+    def remove_oldest(self, idx:np.ndarray):
+        for counts, damages in self.slots.values():
+            if len(idx) == 0:
+                return
+            has = counts[idx] > 0
+            j = idx[has]
+            per_proc = damages[j] / counts[j]
+            counts[j] -= 1
+            damages[j] -= per_proc
+            self.count[j] -= 1
+            self.total[j] -= per_proc
+            idx = idx[~has]
+
+    def expire(self, slot:int):
+        if slot not in self.slots:
+            return EMPTY_INDEX
+        counts, damages = self.slots.pop(slot)
+        j = np.flatnonzero(counts)
+        self.count[j] -= counts[j]
+        self.total[j] -= damages[j]
+        self.total[j[self.count[j] == 0]] = 0
+        return j
+
+
+class ContainerPool():
+    '''
+    Batched equivalent of ContainerizedProcManager: 10 rotating containers per trial, each ticking on
+    the phase of the proc that opened it.
+    '''
+    def __init__(self, trials:int) -> None:
+        self.damage = np.zeros((trials, 10))
+        self.count = np.zeros((trials, 10), dtype=np.int64)
+        self.offset = np.full((trials, 10), -np.inf)
+        self.chain = np.full((trials, 10), -1, dtype=np.int64)
+        self.index = np.zeros(trials, dtype=np.int64)
+        self.total_count = np.zeros(trials, dtype=np.int64)
+        self.slots = {}
+        self.chain_members = {}
+
+    def add(self, slot:int, idx:np.ndarray, damage:np.ndarray, time:float):
+        prev = (self.index[idx] - 1) % 10
+        same = (self.count[idx, prev] > 0) & (np.abs(self.offset[idx, prev] - time) < 1/120)
+        container = np.where(same, prev, self.index[idx])
+        opened = self.count[idx, container] == 0
+
+        self.damage[idx, container] += damage
+        self.count[idx, container] += 1
+        self.offset[idx, container] = time
+        self.index[idx] = np.where(same, self.index[idx], (self.index[idx] + 1) % 10)
+        self.total_count[idx] += 1
+
+        new_slot = slot not in self.slots
+        if new_slot:
+            self.slots[slot] = (np.full(len(self.index), -1, dtype=np.int64), np.zeros(len(self.index), dtype=np.int64), np.zeros(len(self.index)))
+        slot_container, slot_count, slot_damage = self.slots[slot]
+        slot_container[idx] = container
+        slot_count[idx] += 1
+        slot_damage[idx] += damage
+        return new_slot, idx[opened], container[opened]
+
+    def open_chain(self, chain_id:int, idx:np.ndarray, container:np.ndarray):
+        self.chain[idx, container] = chain_id
+        self.chain_members[chain_id] = (idx, container)
+
+    def chain_damage(self, chain_id:int):
+        idx, container = self.chain_members[chain_id]
+        keep = (self.chain[idx, container] == chain_id) & (self.count[idx, container] > 0)
+        if not keep.any():
+            del self.chain_members[chain_id]
+            return EMPTY_INDEX, None
+        idx, container = idx[keep], container[keep]
+        self.chain_members[chain_id] = (idx, container)
+        return idx, self.damage[idx, container]
+
+    def expire(self, slot:int):
+        if slot not in self.slots:
+            return EMPTY_INDEX
+        slot_container, slot_count, slot_damage = self.slots.pop(slot)
+        j = np.flatnonzero(slot_count)
+        c = slot_container[j]
+        self.damage[j, c] -= slot_damage[j]
+        self.count[j, c] -= slot_count[j]
+        self.total_count[j] -= slot_count[j]
+        emptied = self.count[j, c] == 0
+        self.chain[j[emptied], c[emptied]] = -1
+        self.damage[j[emptied], c[emptied]] = 0
+        return j
+
+
+class BatchState():
+    def __init__(self, batch:BatchSimulation, enemy:Unit, fire_mode:FireMode, trials:int=None) -> None:
+        n = batch.trials if trials is None else trials
+        self.batch = batch
+        self.rng = batch.rng
+        self.max_time = batch.max_time
+        self.enemy = enemy
+        self.fire_mode = fire_mode
+        self.time = 0
+        self.event_queue = []
+        self.call_index = 0
+        self.chain_index = 0
+        self.slot_index = -1
+        self.slot_key = None
+        self.all_index = np.arange(n)
+        self.stats_cache = {}
+
+        # enemy constants
+        self.overguard_modifier = enemy.overguard.modifier.astype(np.float64)
+        self.shield_modifier = enemy.shield.modifier.astype(np.float64)
+        self.health_modifier = enemy.health.modifier.astype(np.float64)
+        self.armor_modifier = enemy.armor.modifier.astype(np.float64)
+        self.base_dr = float(enemy.base_dr)
+        self.health_vulnerability = float(enemy.health_vulnerability)
+        self.shield_vulnerability = float(enemy.shield_vulnerability)
+        self.animation_multiplier = float(enemy.animation_multipliers[enemy.current_animation]['multiplier'])
+        self.damage_controller_type = enemy.damage_controller_type
+        self.critical_controller_type = enemy.critical_controller_type
+        self.controller_value = float(enemy.controller_value)
+        self.cold_max_stacks = enemy.proc_info['PT_COLD']['max_stacks']
+
+        # enemy state
+        self.overguard = np.full(n, float(enemy.overguard.current_value))
+        self.shield = np.full(n, float(enemy.shield.current_value))
+        self.health = np.full(n, float(enemy.health.current_value))
+        self.armor_initial = float(enemy.armor.current_value)
+        self.armor = np.full(n, self.armor_initial)
+        self.armor_dr = np.tile(enemy.armor_dr.astype(np.float64), (n, 1))
+        self.corrosive_multiplier = np.ones(n)
+        self.heat_multiplier = np.ones(n)
+        self.health_damage_multiplier = np.ones(n)
+        self.shield_damage_multiplier = np.ones(n)
+        self.cold_max = np.full(n, enemy.proc_controller.cold_proc_manager.max_stacks, dtype=np.int64)
+
+        self.critical_tier = np.zeros(n, dtype=np.int64)
+        self.critical_multiplier = np.ones(n)
+        self.held_multiplier = np.full(n, float(fire_mode.weapon.damagePerShot_m["multishot_multiplier"]))
+        self.multishot_damage = np.zeros(n)
+        self.last_encumber_time = np.full(n, np.nan)
+
+        self.alive = (self.overguard > 0) | (self.health > 0)
+        self.kill_time = np.full(n, np.inf)
+        self.magazine = float(fire_mode.magazineSize.current)
+
+        # proc state, indexed like ProcController.proc_managers
+        self.proc_managers = enemy.proc_controller.proc_managers
+        self.proc_pools = {}
+        self.container_pools = {}
+        for i, manager in enumerate(self.proc_managers):
+            if isinstance(manager, pm.ContainerizedProcManager):
+                self.container_pools[i] = ContainerPool(n)
+            elif not isinstance(manager, pm.HeatProcManager):
+                self.proc_pools[i] = StackPool(n)
+        self.aoe_chain = {i: np.full(n, -1, dtype=np.int64) for i, manager in enumerate(self.proc_managers) if isinstance(manager, pm.AOEProcManager)}
+
+        self.heat_id = const.PT_INDEX['PT_HEAT']
+        heat_manager = self.proc_managers[self.heat_id]
+        self.heat_count = np.zeros(n, dtype=np.int64)
+        self.heat_total = np.zeros(n)
+        self.heat_expiry = np.zeros(n)
+        self.heat_chain = np.full(n, -1, dtype=np.int64)
+        self.strip_index = np.zeros(n, dtype=np.int64)
+        self.strip_chain = np.full(n, -1, dtype=np.int64)
+        self.regen_chain = np.full(n, -1, dtype=np.int64)
+        self.heat_expiry_slots = set()
+        self.heat_strip_delay = heat_manager.base_armor_strip_delay
+        self.heat_regen_delay = heat_manager.base_armor_regen_delay
+
+    def push(self, time, kind, payload):
+        heapq.heappush(self.event_queue, (time, self.call_index, kind, payload))
+        self.call_index += 1
+
+    def consume_chain_index(self):
+        idx = self.chain_index
+        self.chain_index += 1
+        return idx
+
+    def get_stats(self, fire_mode:FireMode):
+        stats = self.stats_cache.get(id(fire_mode))
+        if stats is None:
+            stats = BatchFireMode(fire_mode, self.enemy)
+            self.stats_cache[id(fire_mode)] = stats
+        return stats
+
+    def get_slot(self, stats:BatchFireMode):
+        # procs applied at the same time by the same weapon share a slot
+        key = (self.time, id(stats.weapon))
+        if key != self.slot_key:
+            self.slot_key = key
+            self.slot_index += 1
+        return self.slot_index
+
+    def get_tier(self, chance):
+        chance = np.asarray(chance, dtype=np.float64)
+        n = chance.shape[0] if chance.ndim else 1
+        return (np.floor(chance) + (self.rng.random(n) < chance % 1)).astype(np.int64)
+
+    def run_events(self):
+        while len(self.event_queue) > 0 and self.alive.any():
+            time, _, kind, payload = heapq.heappop(self.event_queue)
+            if time > self.max_time:
+                break
+            self.time = time
+            self.dispatch(kind, payload)
+
+    def dispatch(self, kind, payload):
+        if kind == TRIGGER:
+            self.trigger_event()
+        elif kind == PELLET:
+            stats, idx = payload
+            self.pellet_event(stats, idx)
+        elif kind == CONTAINER_TICK:
+            self.container_tick_event(*payload)
+        elif kind == CONTAINER_EXPIRY:
+            proc_id, slot = payload
+            self.container_pools[proc_id].expire(slot)
+        elif kind == AOE_TICK:
+            self.aoe_tick_event(*payload)
+        elif kind == STACK_EXPIRY:
+            proc_id, slot = payload
+            j = self.proc_pools[proc_id].expire(slot)
+            self.count_changed(proc_id, j)
+        elif kind == HEAT_TICK:
+            self.heat_tick_event(*payload)
+        elif kind == HEAT_EXPIRY:
+            self.heat_expiry_event(*payload)
+        elif kind == HEAT_STRIP:
+            self.heat_strip_event(*payload)
+        elif kind == HEAT_REGEN:
+            self.heat_regen_event(*payload)
+
+    # Weapon
+    def trigger_event(self):
+        fm = self.fire_mode
+        stats = self.get_stats(fm)
+        idx = self.all_index[self.alive]
+        multishot_roll = self.get_tier(np.full(len(idx), stats.multishot))
+
+        self.magazine -= fm.ammoCost.modded
+        fm_time = self.time + fm.embedDelay.modded
+        if stats.held:
+            self.held_multiplier[idx] = multishot_roll
+            pellets = [idx]
+        else:
+            self.multishot_damage[idx[multishot_roll == 1]] = 0
+            self.multishot_damage[idx[multishot_roll > 1]] = stats.multishot_damage
+            pellets = [idx[multishot_roll > i] for i in range(multishot_roll.max(initial=0))]
+
+        for pellet_idx in pellets:
+            self.push(fm_time, PELLET, (stats, pellet_idx))
+            for fme in fm.fire_mode_effects.values():
+                fme_stats = self.get_stats(fme)
+                fme_time = fme.embedDelay.modded + fm_time + 1e-4
+                fme_roll = self.get_tier(np.full(len(pellet_idx), fme.multishot.modded))
+                for i in range(fme_roll.max(initial=0)):
+                    self.push(fme_time, PELLET, (fme_stats, pellet_idx[fme_roll > i]))
+
+        if self.magazine > 0:
+            next_event = self.time + fm.fireTime.modded + fm.chargeTime.modded
+        else:
+            self.magazine = fm.magazineSize.modded
+            next_event = self.time + max(fm.reloadTime.modded, fm.fireTime.modded) + fm.chargeTime.modded
+        self.push(next_event, TRIGGER, None)
+
+    def pellet_event(self, stats:BatchFireMode, idx:np.ndarray):
+        idx = idx[self.alive[idx]]
+        if len(idx) == 0:
+            return
+        damage_multiplier = stats.damage_multiplier(self.unique_proc_count(idx))
+
+        tiered_cm, unmodified_cm = self.critical_multiplier_roll(stats, idx)
+
+        scale = damage_multiplier * np.ones(len(idx))
+        if stats.attrition_chance > 0:
+            attrition = (self.critical_tier[idx] == 0) & (self.rng.random(len(idx)) > stats.attrition_chance)
+            scale[attrition] *= 21
+
+        enemy_multiplier = self.apply_damage(stats, idx, stats.base_damage, scale, tiered_cm, stats.bodypart)
+        status_damage = stats.total_damage_base * damage_multiplier * enemy_multiplier * unmodified_cm
+        self.apply_status(stats, idx, status_damage)
+
+    def critical_multiplier_roll(self, stats:BatchFireMode, idx:np.ndarray):
+        critical_chance = stats.critical_chance
+        cold_bonus = 0
+        if not stats.radial:
+            critical_chance = critical_chance + self.proc_pools[const.PT_INDEX['PT_PUNCTURE']].count[idx] * 0.05
+            cold_count = self.proc_pools[const.PT_INDEX['PT_COLD']].count[idx]
+            cold_bonus = np.minimum(1, cold_count) * 0.1 + np.maximum(0, cold_count - 1) * 0.05
+        critical_tier = self.get_tier(np.broadcast_to(critical_chance, idx.shape))
+
+        base_cm = np.where(critical_tier > 0, (stats.critical_multiplier + cold_bonus) * stats.bodypart_critical_bonus * stats.critical_final_multiplier, stats.critical_multiplier)
+        self.critical_tier[idx] = critical_tier
+        self.critical_multiplier[idx] = base_cm
+
+        unmodified_cm = np.where(critical_tier > 0, (base_cm - 1) * critical_tier + 1, 1.)
+        if self.critical_controller_type == "CC_ACOLYTE":
+            tier_1 = (base_cm - 1) * 0.5 + 1
+            tier_increase = tier_1 / (1 + 1 / (base_cm - 1))
+            tiered_cm = np.where(critical_tier > 0, tier_1 + (critical_tier - 1) * tier_increase, 1.)
+        else:
+            tiered_cm = unmodified_cm
+        return tiered_cm, unmodified_cm
+
+    # Unit
+    def apply_damage(self, stats:BatchFireMode, idx:np.ndarray, damage:np.ndarray, scale:np.ndarray, critical_multiplier, bodypart:str, radial=False):
+        bodypart_multiplier = float(self.enemy.bodypart_multipliers.get(bodypart, {}).get('multiplier', 1))
+        if radial and bodypart == 'head':
+            bodypart_multiplier = 1
+        bodypart_bonus = stats.headshot_bonus if bodypart == 'head' else 1
+
+        multiplier = bodypart_multiplier * bodypart_bonus * self.animation_multiplier * self.base_dr * stats.faction_bonus
+        if stats.weapon is self.fire_mode.weapon:
+            multiplier = multiplier * self.held_multiplier[idx] * (1 + self.multishot_damage[idx])
+        else:
+            multiplier = multiplier * stats.weapon.damagePerShot_m["multishot_multiplier"] * np.ones(len(idx))
+        scale = scale * multiplier
+        critical_multiplier = np.broadcast_to(critical_multiplier, idx.shape)
+
+        overguard, shield = self.overguard[idx], self.shield[idx]
+        self.remove_protection(stats, idx, damage, scale, critical_multiplier)
+        og_applied = overguard - self.overguard[idx]
+        sg_applied = shield - self.shield[idx]
+
+        dead = (self.health[idx] <= 0) & (self.overguard[idx] <= 0)
+        overflow_og = ~dead & (self.overguard[idx] < 0)
+        if overflow_og.any():
+            j = idx[overflow_og]
+            ratio = np.abs(self.overguard[j] / og_applied[overflow_og])
+            self.overguard[j] = 0
+            shield = self.shield[j]
+            self.remove_protection(stats, j, damage, scale[overflow_og] * ratio, np.ones(len(j)))
+            sg = shield - self.shield[j]
+            overflow_sg = self.shield[j] < 0
+            if overflow_sg.any():
+                k = j[overflow_sg]
+                ratio = np.abs(self.shield[k] / sg[overflow_sg])
+                self.shield[k] = 0
+                self.remove_protection(stats, k, damage, scale[overflow_og][overflow_sg] * ratio, np.ones(len(k)))
+
+        overflow_sg = ~dead & ~overflow_og & (self.shield[idx] < 0)
+        if overflow_sg.any():
+            j = idx[overflow_sg]
+            ratio = np.abs(self.shield[j] / sg_applied[overflow_sg])
+            self.shield[j] = 0
+            self.remove_protection(stats, j, damage, scale[overflow_sg] * ratio, np.ones(len(j)))
+
+        killed = idx[(self.health[idx] <= 0) & (self.overguard[idx] <= 0)]
+        self.alive[killed] = False
+        self.kill_time[killed] = np.minimum(self.kill_time[killed], self.time)
+        return multiplier
+
+    def remove_protection(self, stats:BatchFireMode, idx:np.ndarray, damage:np.ndarray, scale:np.ndarray, critical_multiplier:np.ndarray):
+        overguard_layer = self.overguard[idx] > 0
+        shield_layer = ~overguard_layer & (self.shield[idx] > 0)
+        health_layer = ~overguard_layer & ~shield_layer
+
+        if overguard_layer.any():
+            j, cm = idx[overguard_layer], critical_multiplier[overguard_layer]
+            tot_damage = (damage @ self.overguard_modifier) * scale[overguard_layer]
+            dr = self.damage_reduction(stats, j, tot_damage, cm)
+            self.overguard[j] -= tot_damage * dr * cm
+            self.cold_max[j[self.overguard[j] <= 0]] = self.cold_max_stacks
+
+        if shield_layer.any():
+            j, cm, s = idx[shield_layer], critical_multiplier[shield_layer], scale[shield_layer]
+            if damage[6] > 0:
+                health_damage = damage[6] * s * self.armor_dr[j, 6] * self.health_modifier[6] * self.health_damage_multiplier[j] * self.health_vulnerability
+                dr = self.damage_reduction(stats, j, health_damage, cm) * cm
+                self.health[j] -= health_damage * dr * cm
+
+            shield_damage = (damage @ self.shield_modifier) * s * self.shield_damage_multiplier[j] * self.shield_vulnerability
+            dr = self.damage_reduction(stats, j, shield_damage, cm)
+            self.shield[j] -= shield_damage * dr * cm
+
+        if health_layer.any():
+            j, cm = idx[health_layer], critical_multiplier[health_layer]
+            health_damage = (self.armor_dr[j] @ (damage * self.health_modifier)) * scale[health_layer] * self.health_damage_multiplier[j] * self.health_vulnerability
+            dr = self.damage_reduction(stats, j, health_damage, cm)
+            self.health[j] -= health_damage * dr * cm
+
+    def damage_reduction(self, stats:BatchFireMode, idx:np.ndarray, damage:np.ndarray, critical_multiplier:np.ndarray):
+        dc = self.damage_controller_type
+        if dc == "DC_NONE":
+            return 1.
+
+        if dc in ("DC_STATIC_DPS_DEMOLISHER", "DC_STATIC_DPS_ACOLYTE"):
+            tier_min = 1 - 1 / np.maximum(1, self.critical_tier[idx])
+            dps_reducer = tier_min / (self.critical_multiplier[idx] - tier_min) + 1
+            dps_multiplier = stats.fire_rate * stats.multishot
+            if dc == "DC_STATIC_DPS_DEMOLISHER" and dps_multiplier == 0:
+                dps_multiplier = 1
+            dps_multiplier = dps_multiplier / 2 if stats.multishot_base > 1 else dps_multiplier
+            tier0_dps = damage * (dps_multiplier / dps_reducer)
+            with np.errstate(divide='ignore'):
+                if dc == "DC_STATIC_DPS_DEMOLISHER":
+                    return np.select([(tier0_dps >= 1000) & (tier0_dps <= 2500), (tier0_dps >= 2500) & (tier0_dps <= 5000),
+                                      (tier0_dps >= 5000) & (tier0_dps <= 10000), (tier0_dps >= 10000) & (tier0_dps <= 20000), tier0_dps >= 20000],
+                                     [0.8 + 200/tier0_dps, 0.7 + 450/tier0_dps, 0.4 + 1950/tier0_dps, 0.2 + 3950/tier0_dps, 0.1 + 5950/tier0_dps], 1.)
+                return np.select([(tier0_dps >= 3000) & (tier0_dps <= 7500), (tier0_dps >= 7500) & (tier0_dps <= 22500), tier0_dps >= 22500],
+                                 [0.8 + 600/tier0_dps, 1.6/3 + 2600/tier0_dps, 14600/tier0_dps], 1.)
+
+        dpt = damage * critical_multiplier * stats.multishot
+        if dc == "DC_DYNAMIC_DPS_ARCHON":
+            return 1 / (1 + dpt / 460e3)
+        elif dc == "DC_DYNAMIC_DPS_FRAGMENTED":
+            return 1 / (1 + dpt / 175e3)
+        elif dc == "DC_DYNAMIC_DPS_NECRAMITE":
+            return 1 / (1 + dpt / self.controller_value)
+        return 1.
+
+    def set_armor(self, idx:np.ndarray):
+        armor = self.armor_initial * self.corrosive_multiplier[idx] * self.heat_multiplier[idx]
+        armor[armor <= 0.5] = 0
+        # once armor is fully stripped it stays stripped, see Protection.set_value_multiplier
+        armor[self.armor[idx] <= 0] = 0
+        self.armor[idx] = armor
+
+        current_armor = np.floor(armor)
+        dr = self.armor_modifier / ((2 - self.armor_modifier) * (current_armor[:, None] * const.ARMOR_RATIO) + 1)
+        dr[:, const.DT_INDEX["DT_FINISHER"]] = 1
+        dr[:, const.DT_INDEX["DT_CINEMATIC"]] = 1
+        dr[:, const.DT_INDEX["DT_HEALTH_DRAIN"]] = 1
+        dr[current_armor < 1] = 1
+        self.armor_dr[idx] = dr
+
+    def unique_proc_count(self, idx:np.ndarray):
+        count = (self.heat_count[idx] > 0).astype(np.int64)
+        for pool in self.proc_pools.values():
+            count += pool.count[idx] > 0
+        for pool in self.container_pools.values():
+            count += pool.total_count[idx] > 0
+        return count
+
+    # Procs
+    def apply_status(self, stats:BatchFireMode, idx:np.ndarray, status_damage:np.ndarray):
+        total_status_chance = stats.proc_chance * np.ones(len(idx))
+        if stats.held and stats.weapon is self.fire_mode.weapon:
+            total_status_chance *= self.held_multiplier[idx]
+        status_tier = self.get_tier(total_status_chance)
+        status_procced = np.zeros(len(idx), dtype=np.int64)
+
+        for i in range(status_tier.max(initial=0)):
+            rolled = status_tier > i
+            proc_index = np.searchsorted(stats.proc_cumulative, self.rng.random(len(idx)), side='right')
+            rolled &= proc_index < len(stats.proc_cumulative)
+            status_procced += rolled
+            for proc_id in np.unique(proc_index[rolled]):
+                sel = rolled & (proc_index == proc_id)
+                self.add_proc(int(proc_id), stats, idx[sel], status_damage[sel])
+
+        for proc_id in stats.forced_procs:
+            self.add_proc(proc_id, stats, idx, status_damage)
+            status_procced += 1
+
+        if stats.encumber_chance > 0:
+            encumbered = (status_procced > 0) & (self.last_encumber_time[idx] != self.time)
+            encumber_tier = self.get_tier(np.full(len(idx), stats.encumber_chance)) * encumbered
+            for i in range(encumber_tier.max(initial=0)):
+                sel = encumber_tier > i
+                proc_index = self.rng.integers(3, 13, len(idx))
+                for proc_id in np.unique(proc_index[sel]):
+                    j = sel & (proc_index == proc_id)
+                    self.add_proc(int(proc_id), stats, idx[j], np.ones(j.sum()))
+                self.last_encumber_time[idx[sel]] = self.time
+
+    def add_proc(self, proc_id:int, stats:BatchFireMode, idx:np.ndarray, damage:np.ndarray):
+        if len(idx) == 0:
+            return
+        manager = self.proc_managers[proc_id]
+        slot = self.get_slot(stats)
+        duration = manager.base_duration * stats.status_duration
+
+        if proc_id == self.heat_id:
+            self.add_heat_proc(stats, idx, damage, duration, slot)
+        elif proc_id in self.container_pools:
+            if proc_id == const.DT_INDEX["DT_SLASH"]:
+                damage = manager.damage_scaling * damage
+            elif proc_id == const.DT_INDEX["DT_TOXIN"]:
+                damage = manager.damage_scaling * damage * stats.toxin_bonus
+            new_slot, opened, container = self.container_pools[proc_id].add(slot, idx, damage, self.time)
+            if len(opened) > 0:
+                chain_id = self.consume_chain_index()
+                self.container_pools[proc_id].open_chain(chain_id, opened, container)
+                self.push(self.time + 1, CONTAINER_TICK, (proc_id, chain_id, stats, self.time + 1))
+            if new_slot:
+                self.push(self.time + duration, CONTAINER_EXPIRY, (proc_id, slot))
+        elif proc_id in self.aoe_chain:
+            if proc_id == const.DT_INDEX["DT_ELECTRIC"]:
+                damage = manager.damage_scaling * damage * stats.electric_bonus
+            elif proc_id == const.DT_INDEX["DT_GAS"]:
+                damage = manager.damage_scaling * damage
+            pool = self.proc_pools[proc_id]
+            opened = idx[pool.count[idx] == 0]
+            if pool.add(slot, idx, damage, manager.max_stacks):
+                self.push(self.time + duration, STACK_EXPIRY, (proc_id, slot))
+            if len(opened) > 0:
+                chain_id = self.consume_chain_index()
+                self.aoe_chain[proc_id][opened] = chain_id
+                self.push(self.time, AOE_TICK, (proc_id, chain_id, stats))
+        else:
+            pool = self.proc_pools[proc_id]
+            max_stacks = self.cold_max[idx] if proc_id == const.PT_INDEX['PT_COLD'] else manager.max_stacks
+            if pool.add(slot, idx, 0, max_stacks):
+                self.push(self.time + duration, STACK_EXPIRY, (proc_id, slot))
+            self.count_changed(proc_id, idx)
+
+    def count_changed(self, proc_id:int, idx:np.ndarray):
+        if len(idx) == 0:
+            return
+        count = self.proc_pools[proc_id].count[idx]
+        if proc_id == const.PT_INDEX['PT_CORROSIVE']:
+            self.corrosive_multiplier[idx] = [const.CORROSIVE_ARMOR_STRIP[c] for c in count]
+            self.set_armor(idx)
+        elif proc_id == const.PT_INDEX['PT_VIRAL']:
+            self.health_damage_multiplier[idx] = [const.VIRAL_DEBUFF[c] for c in count]
+        elif proc_id == const.PT_INDEX['PT_MAGNETIC']:
+            self.shield_damage_multiplier[idx] = [const.MAGNETIC_DEBUFF[c] for c in count]
+
+    def dot_damage(self, proc_id:int):
+        damage = np.zeros(20)
+        damage[const.PROCID_DAMAGETYPE[proc_id]] = 1
+        return damage
+
+    def container_tick_event(self, proc_id:int, chain_id:int, stats:BatchFireMode, tick_time:float):
+        idx, damage = self.container_pools[proc_id].chain_damage(chain_id)
+        alive = self.alive[idx]
+        idx = idx[alive]
+        if len(idx) == 0:
+            return
+        self.apply_damage(stats, idx, self.dot_damage(proc_id), damage[alive], 1., 'body')
+        self.push(tick_time + 1, CONTAINER_TICK, (proc_id, chain_id, stats, tick_time + 1))
+
+    def aoe_tick_event(self, proc_id:int, chain_id:int, stats:BatchFireMode):
+        chain = self.aoe_chain[proc_id]
+        pool = self.proc_pools[proc_id]
+        idx = np.flatnonzero(chain == chain_id)
+        ended = idx[pool.count[idx] == 0]
+        chain[ended] = -1
+        idx = idx[(pool.count[idx] > 0) & self.alive[idx]]
+        if len(idx) == 0:
+            return
+        self.apply_damage(stats, idx, self.dot_damage(proc_id), pool.total[idx], 1., stats.bodypart, radial=True)
+        self.push(self.time + 1, AOE_TICK, (proc_id, chain_id, stats))
+
+    def add_heat_proc(self, stats:BatchFireMode, idx:np.ndarray, damage:np.ndarray, duration:float, slot:int):
+        manager = self.proc_managers[self.heat_id]
+        opened = idx[self.heat_count[idx] == 0]
+        if len(opened) > 0:
+            chain_id = self.consume_chain_index()
+            self.heat_chain[opened] = chain_id
+            self.strip_chain[opened] = chain_id
+            self.push(self.time + self.heat_strip_delay * stats.status_duration, HEAT_STRIP, (chain_id, stats))
+            self.push(self.time + 1, HEAT_TICK, (chain_id, stats, self.time + 1))
+
+        # heat procs refresh the expiry of the whole stack
+        self.heat_expiry[idx] = self.time + duration
+        if slot not in self.heat_expiry_slots:
+            self.heat_expiry_slots.add(slot)
+            self.push(self.time + duration, HEAT_EXPIRY, (slot, stats))
+
+        self.heat_total[idx] += manager.damage_scaling * damage * stats.heat_bonus
+        self.heat_count[idx] += 1
+
+    def heat_tick_event(self, chain_id:int, stats:BatchFireMode, tick_time:float):
+        idx = np.flatnonzero(self.heat_chain == chain_id)
+        ended = idx[self.heat_count[idx] == 0]
+        self.heat_chain[ended] = -1
+        idx = idx[(self.heat_count[idx] > 0) & self.alive[idx]]
+        if len(idx) == 0:
+            return
+        self.apply_damage(stats, idx, self.dot_damage(self.heat_id), self.heat_total[idx], 1., 'body')
+        self.push(tick_time + 1, HEAT_TICK, (chain_id, stats, tick_time + 1))
+
+    def heat_expiry_event(self, slot:int, stats:BatchFireMode):
+        self.heat_expiry_slots.discard(slot)
+        idx = np.flatnonzero((self.heat_count > 0) & (self.heat_expiry <= self.time))
+        if len(idx) == 0:
+            return
+        self.heat_count[idx] = 0
+        self.heat_total[idx] = 0
+        chain_id = self.consume_chain_index()
+        self.regen_chain[idx] = chain_id
+        self.push(self.time + self.heat_regen_delay * stats.status_duration, HEAT_REGEN, (chain_id, stats))
+
+    def heat_strip_event(self, chain_id:int, stats:BatchFireMode):
+        idx = np.flatnonzero(self.strip_chain == chain_id)
+        if len(idx) == 0:
+            return
+        self.strip_index[idx] += 1
+        capped = self.strip_index[idx] > 4
+        self.strip_index[idx[capped]] = 4
+        self.strip_chain[idx[capped]] = -1
+        idx = idx[~capped]
+
+        self.heat_multiplier[idx] = [const.HEAT_ARMOR_STRIP[i] for i in self.strip_index[idx]]
+        self.set_armor(idx)
+
+        done = self.strip_index[idx] >= 4
+        self.strip_chain[idx[done]] = -1
+        if not done.all():
+            self.push(self.time + self.heat_strip_delay * stats.status_duration, HEAT_STRIP, (chain_id, stats))
+
+    def heat_regen_event(self, chain_id:int, stats:BatchFireMode):
+        idx = np.flatnonzero(self.regen_chain == chain_id)
+        stopped = self.heat_count[idx] > 0
+        self.regen_chain[idx[stopped]] = -1
+        idx = idx[~stopped]
+        if len(idx) == 0:
+            return
+        self.strip_index[idx] -= 1
+        capped = self.strip_index[idx] < 0
+        self.strip_index[idx[capped]] = 0
+        self.regen_chain[idx[capped]] = -1
+        idx = idx[~capped]
+
+        self.heat_multiplier[idx] = [const.HEAT_ARMOR_STRIP[i] for i in self.strip_index[idx]]
+        self.set_armor(idx)
+
+        done = self.strip_index[idx] <= 0
+        self.regen_chain[idx[done]] = -1
+        if not done.all():
+            self.push(self.time + self.heat_regen_delay * stats.status_duration, HEAT_REGEN, (chain_id, stats))
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from warframe_simulacrum.simulation import Simulation
+from warframe_simulacrum.weapon import Weapon
+from warframe_simulacrum.unit import Unit
+
+# plotting and data libraries the simulation core must not pull in
+HEAVY_MODULES = ("pandas", "matplotlib", "seaborn", "scipy", "PySide6", "pyarrow")
+IMPORT_BUDGET = 0.5
+
+SCENARIO_MODS = {"procChance_m": {"base": 1}, "damagePerShot_m": {"base": 2}}
+# name -> (enemy, level, weapon, mod config)
+SCENARIOS = {
+    "health": ("Charger", 100, "Hek", SCENARIO_MODS),
+    "armored": ("Elite Lancer", 100, "Hek", SCENARIO_MODS),
+    "shielded": ("Corpus Tech", 100, "Hek", SCENARIO_MODS),
+    "overguard_eximus": ("Corrupted Heavy Gunner Eximus", 100, "Hek", SCENARIO_MODS),
+    "demolisher": ("Demolisher Devourer", 100, "Hek", SCENARIO_MODS),
+    "acolyte": ("Acolyte", 100, "Hek", SCENARIO_MODS),
+    "archon": ("Archon", 1, "Hek", SCENARIO_MODS),
+    "fragmented": ("The Fragmented", 1, "Hek", SCENARIO_MODS),
+    "necramite": ("Virtiol Necramite", 100, "Hek", SCENARIO_MODS),
+}
+# proc scenarios stack mostly one status type on a tanky target so its manager dominates the event loop
+PROC_ENEMY = ("Demolisher Voidrig", 100, "Hek")
+PROC_ELEMENTS = ("slash", "heat", "toxin", "electric", "gas", "corrosive", "viral", "magnetic")
+# benchmark -> result key compared between runs
+RATE_KEYS = {"pellets": "pellets_per_second", "trials": "trials_per_second", "fast_run": "trials_per_second", "procs": "events_per_second"}
+
+
+def bench_pellets(weapon_name:str='Hek', enemy_name:str='Charger', level:int=100, fire_mode_name:str=None, pellets:int=100000, mod_config:dict=None, seed:int=0) -> dict:
+    '''
+    Times Unit.pellet_hit in isolation. The enemy is reset whenever it dies so every pellet lands on a live target.
+    '''
+    simulation = Simulation(seed)
+    weapon = Weapon(weapon_name, None, simulation)
+    if mod_config is not None:
+        weapon.load_mod_config(mod_config)
+    fire_mode = weapon.fire_modes[fire_mode_name if fire_mode_name is not None else list(weapon.fire_modes)[0]]
+    enemy = Unit(enemy_name, level, simulation)
+
+    simulation.reset()
+    fire_mode.reset()
+    enemy.reset()
+    bodypart = fire_mode.target_bodypart
+
+    def loop(count):
+        for _ in range(count):
+            enemy.pellet_hit(fire_mode, bodypart)
+            if enemy.health.current_value <= 0 and enemy.overguard.current_value <= 0:
+                simulation.reset()
+                enemy.reset()
+
+    start = time.perf_counter()
+    loop(pellets)
+    elapsed = time.perf_counter() - start
+
+    result = dict(benchmark='pellets', weapon=weapon_name, enemy=enemy_name, level=level, pellets=pellets,
+                  seconds=elapsed, pellets_per_second=pellets/elapsed)
+    result.update(measure_allocations(loop, max(1, pellets // 10)))
+    return result
+
+
+def get_proc_mods(element:str) -> dict:
+    return {"procChance_m": {"base": 3}, f"{element}_m": {"base": 5}}
+
+
+def measure_allocations(loop, count:int) -> dict:
+    '''
+    Runs loop(count) under tracemalloc. Kept apart from the timed run since tracing slows everything down.
+    '''
+    tracemalloc.start()
+    try:
+        loop(count)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dict(alloc_peak_kib=peak/1024, alloc_retained_kib=current/1024)
+
+
+def bench_trials(enemy_name:str, level:int, weapon_name:str='Hek', mod_config:dict=None, trials:int=200, seed:int=0, scenario:str='', benchmark:str='trials') -> dict:
+    '''
+    Times whole Simulation.run trials without records, counting the events they dispatch.
+    '''
+    simulation = Simulation(seed)
+    weapon = Weapon(weapon_name, None, simulation)
+    if mod_config is not None:
+        weapon.load_mod_config(mod_config)
+    fire_mode = weapon.fire_modes[list(weapon.fire_modes)[0]]
+    enemy = Unit(enemy_name, level, simulation)
+
+    def loop(count):
+        events = 0
+        for i in range(count):
+            simulation.run(enemy, fire_mode, None, i, keep_records=False)
+            events += simulation.event_index
+        return events
+
+    start = time.perf_counter()
+    events = loop(trials)
+    elapsed = time.perf_counter() - start
+    result = dict(benchmark=benchmark, scenario=scenario, weapon=weapon_name, enemy=enemy_name, level=level, trials=trials, events=events,
+                  seconds=elapsed, trials_per_second=trials/elapsed, events_per_second=events/elapsed)
+    result.update(measure_allocations(loop, max(1, trials // 10)))
+    return result
+
+
+def bench_fast_run(enemy_name:str, level:int, weapon_name:str='Hek', mod_config:dict=None, trials:int=200, seed:int=0, scenario:str='') -> dict:
+    '''
+    Times Simulacrum.fast_run on a headless figure, the plotting layer's event loop.
+    '''
+    from warframe_simulacrum.simulacrum import Simulacrum
+    from warframe_simulacrum.liveplot import create_headless_figure
+    simulacrum = Simulacrum(*create_headless_figure(), seed=seed)
+    weapon = Weapon(weapon_name, None, simulacrum)
+    if mod_config is not None:
+        weapon.load_mod_config(mod_config)
+    fire_mode = weapon.fire_modes[list(weapon.fire_modes)[0]]
+    enemy = Unit(enemy_name, level, simulacrum)
+
+    # fast_run does not count its events, only trials are reported
+    def loop(count):
+        for i in range(count):
+            simulacrum.rng.set_trial(i)
+            simulacrum.fast_run([enemy], fire_mode, None)
+
+    start = time.perf_counter()
+    loop(trials)
+    elapsed = time.perf_counter() - start
+    result = dict(benchmark='fast_run', scenario=scenario, weapon=weapon_name, enemy=enemy_name, level=level, trials=trials,
+                  seconds=elapsed, trials_per_second=trials/elapsed)
+    result.update(measure_allocations(loop, max(1, trials // 10)))
+    return result
+
+
+def run_suite(trials:int=200, pellets:int=100000, seed:int=0, verbose:bool=True) -> list:
+    '''
+    Runs every benchmark over every scenario with fixed seeds and returns the result rows.
+    '''
+    results = []
+    def add(result):
+        results.append(result)
+        if verbose:
+            print(format_result(result))
+
+    for scenario, (enemy_name, level, weapon_name, mods) in SCENARIOS.items():
+        result = bench_pellets(weapon_name, enemy_name, level, pellets=pellets, mod_config=mods, seed=seed)
+        result['scenario'] = scenario
+        add(result)
+        add(bench_trials(enemy_name, level, weapon_name, mods, trials, seed, scenario))
+        add(bench_fast_run(enemy_name, level, weapon_name, mods, trials, seed, scenario))
+    enemy_name, level, weapon_name = PROC_ENEMY
+    for element in PROC_ELEMENTS:
+        add(bench_trials(enemy_name, level, weapon_name, get_proc_mods(element), max(1, trials // 4), seed, element, benchmark='procs'))
+    return results
+
+
+def format_result(result:dict) -> str:
+    rate_key = RATE_KEYS.get(result['benchmark'])
+    line = f"{result['benchmark']:>9} {result.get('scenario', ''):>17} {result['enemy']} L{result['level']}: {result[rate_key]:,.0f} {rate_key.replace('_per_second', '')}/s"
+    if 'events_per_second' in result and rate_key != 'events_per_second':
+        line += f", {result['events_per_second']:,.0f} events/s"
+    if 'alloc_peak_kib' in result:
+        line += f", peak {result['alloc_peak_kib']:,.0f} KiB"
+    return line
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def save_results(results:list, path:str):
+    data = dict(commit=get_commit(), python=sys.version.split()[0], platform=platform.platform(), time=time.time(), results=results)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def compare_results(base_path:str, results:list, tolerance:float=0.1) -> list:
+    '''
+    Compares the results against a saved run, returning the (benchmark, scenario, ratio) rows that got slower than tolerance allows.
+    '''
+    with open(base_path) as f:
+        base = {(r['benchmark'], r.get('scenario', '')): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        key = (result['benchmark'], result.get('scenario', ''))
+        if key not in base:
+            continue
+        rate_key = RATE_KEYS[result['benchmark']]
+        ratio = result[rate_key] / base[key][rate_key]
+        print(f"{key[0]:>9} {key[1]:>17}: {ratio:.2f}x")
+        if ratio < 1 - tolerance:
+            regressions.append((key[0], key[1], ratio))
+    return regressions
+
+
+def bench_import(module:str='warframe_simulacrum.simulation', repeats:int=5) -> dict:
+    '''
+    Times importing module in fresh interpreters, best of repeats, and lists the heavy modules the import loaded.
+    '''
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; elapsed = time.perf_counter() - start; "
+            f"print(elapsed); print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    best = float('inf')
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        seconds, heavy = (result.stdout.split('\n') + [''])[:2]
+        best = min(best, float(seconds))
+    return dict(benchmark='import', module=module, seconds=best, heavy_modules=heavy.split())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weapon", default='Hek')
+    parser.add_argument("--enemy", default='Charger')
+    parser.add_argument("--level", type=int, default=100)
+    parser.add_argument("--pellets", type=int, default=100000)
+    parser.add_argument("--imports", action='store_true', help="time importing the simulation core instead")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET)
+    parser.add_argument("--suite", action='store_true', help="run every benchmark over every scenario")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--json", default=None, help="save the suite results to this file")
+    parser.add_argument("--compare", default=None, help="compare the suite results against a saved file")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.suite:
+        results = run_suite(args.trials, args.pellets)
+        if args.json is not None:
+            save_results(results, args.json)
+        if args.compare is not None:
+            regressions = compare_results(args.compare, results, args.tolerance)
+            sys.exit(1 if regressions else 0)
+        sys.exit(0)
+
+    if args.imports:
+        result = bench_import()
+        print(f"import {result['module']}: {result['seconds']:.3f}s, heavy modules: {', '.join(result['heavy_modules']) or 'none'}")
+        # fail when the core outgrows its budget or starts importing plotting libraries again
+        sys.exit(1 if result['seconds'] > args.import_budget or result['heavy_modules'] else 0)
+
+    result = bench_pellets(args.weapon, args.enemy, args.level, pellets=args.pellets)
+    print(f"{result['weapon']} vs {result['enemy']} L{result['level']}: {result['pellets_per_second']:,.0f} pellets/s")
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import collections.abc
+import copy
+import json
+import os
+from pathlib import Path
+from types import MappingProxyType
+
+import warframe_simulacrum.datapack as datapack
+
+DATA_FOLDER = os.path.join(Path(__file__).parent.resolve(), "data")
+WEAPON_DATA_FILE = "ExportWeapons.json"
+RIVEN_DATA_FILE = "ExportRivenUpgrades.json"
+UNIT_DATA_FILE = "unit_data.json"
+
+EMPTY_VIEW = MappingProxyType({})
+
+# one catalog per data file, shared by every object in the process
+_catalogs = {}
+
+
+class DataCatalog():
+    '''
+    Parses a json data file once and hands out read-only views of its entries by name.
+    The file is reparsed when its modification time changes.
+    Entries are read from the compiled data pack instead when it is up to date.
+    '''
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self.mtime = None
+        self.index = EMPTY_VIEW
+        self.merged = {}
+
+    def refresh(self):
+        # a compiled pack built from the current json takes precedence over parsing it
+        pack = datapack.get_pack(os.path.dirname(self.path))
+        filename = os.path.basename(self.path)
+        if pack is not None and pack.is_current(filename):
+            mtime = (pack.path, os.stat(pack.path).st_mtime_ns)
+            if mtime != self.mtime:
+                self.index = pack.get_index(filename)
+                self.merged = {}
+                self.mtime = mtime
+            return self.index
+
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            # list exports (ex. rivens) are indexed by their name
+            if isinstance(data, list):
+                data = {elem.get("name", str(i)):elem for i, elem in enumerate(data)}
+            self.index = freeze(data)
+            self.merged = {}
+            self.mtime = mtime
+        return self.index
+
+    def get(self, name:str, default=EMPTY_VIEW):
+        return self.refresh().get(name, default)
+
+    def get_merged(self, name:str, defaults:dict):
+        # entry layered over a defaults dict, built once per entry
+        index = self.refresh()
+        key = (name, id(defaults))
+        entry = self.merged.get(key)
+        # the entry keeps a reference to its defaults, so their id cannot be handed to another dict while it is cached
+        if entry is None or entry[0] is not defaults:
+            entry = (defaults, freeze(update(copy.deepcopy(defaults), index.get(name, EMPTY_VIEW))))
+            self.merged[key] = entry
+        return entry[1]
+
+    def names(self):
+        return list(self.refresh().keys())
+
+    def __contains__(self, name:str):
+        return name in self.refresh()
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k:freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def update(d, u):
+    for k, v in u.items():
+        if isinstance(v, collections.abc.Mapping):
+            d[k] = update(d.get(k, {}), v)
+        else:
+            d[k] = v
+    return d
+
+
+def get_catalog(filename:str) -> DataCatalog:
+    path = os.path.join(DATA_FOLDER, filename)
+    if path not in _catalogs:
+        _catalogs[path] = DataCatalog(path)
+    return _catalogs[path]
+
+
+def get_weapon_data(name:str):
+    return get_catalog(WEAPON_DATA_FILE).get(name)
+
+
+def get_riven_data(name:str):
+    return get_catalog(RIVEN_DATA_FILE).get(name)
+
+
+def get_unit_data(name:str):
+    return get_catalog(UNIT_DATA_FILE).get(name)
+
+
+def get_unit_config(name:str, defaults:dict):
+    return get_catalog(UNIT_DATA_FILE).get_merged(name, defaults)
+
+
+def clear():
+    _catalogs.clear()
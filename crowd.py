@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import heapq
+import numpy as np
+from warframe_simulacrum.batch import BatchState, TRIGGER, PELLET
+from warframe_simulacrum.killstats import TrialStats
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from warframe_simulacrum.unit import Unit
+    from warframe_simulacrum.weapon import FireMode
+
+
+class CrowdSimulation():
+    '''
+    Runs one fire mode against a crowd of enemies that are all in range at the same time.
+
+    Radial pellets (fire modes or fire mode effects with radial set) hit every living enemy, other pellets hit
+    the first living enemy in crowd order. Each enemy keeps its own health, armor and procs, and rolls its own
+    crits and procs. Records the time to clear the whole crowd, inf when an enemy survives max time.
+    '''
+    def __init__(self, max_time:float=20, seed=None) -> None:
+        self.max_time = max_time
+        self.rng = np.random.default_rng(seed)
+        self.clear_time = np.inf
+        self.clear_times = []
+        self.kill_time_array = np.zeros(0)
+        self.stats = TrialStats(max_time)
+
+    def clear_records(self):
+        self.clear_times = []
+        self.stats = TrialStats(self.max_time)
+
+    def run(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None):
+        '''
+        Returns the kill time of every enemy in the order of enemies, inf for enemies that were not killed.
+        The same Unit may be passed several times for several enemies of that type.
+        '''
+        fire_mode.reset()
+        state = CrowdState(self, enemies, fire_mode)
+        start_pool = state.get_pool()
+
+        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded + 1e-6
+        state.push(event_time, TRIGGER, None)
+
+        if primer and len(primer.forcedProc)>0:
+            for group in state.groups:
+                group.pellet_event(group.get_stats(primer), group.all_index)
+
+        state.run_events()
+
+        self.kill_time_array = state.get_kill_times()
+        self.clear_time = self.kill_time_array.max(initial=0)
+        if np.isfinite(self.clear_time):
+            self.clear_times.append(float(self.clear_time))
+        self.stats.add(self.clear_time, start_pool - state.get_pool())
+        return self.kill_time_array
+
+    def run_reapeated(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None, count=1):
+        self.clear_times = []
+        for _ in range(count):
+            self.run(enemies, fire_mode, primer)
+        return np.array(self.clear_times)
+
+
+class CrowdGroup(BatchState):
+    '''
+    The enemies of one type in a crowd, one lane of the batched state each. Its events go on the crowd's timeline.
+    '''
+    def __init__(self, crowd:CrowdState, enemy:Unit, fire_mode:FireMode, count:int) -> None:
+        super().__init__(crowd, enemy, fire_mode, count)
+        self.crowd = crowd
+
+    def push(self, time, kind, payload):
+        self.crowd.push(time, kind, (self, payload))
+
+
+class CrowdState():
+    def __init__(self, crowd:CrowdSimulation, enemies:List[Unit], fire_mode:FireMode) -> None:
+        self.rng = crowd.rng
+        self.max_time = crowd.max_time
+        self.fire_mode = fire_mode
+        self.time = 0
+        self.event_queue = []
+        self.call_index = 0
+        self.magazine = float(fire_mode.magazineSize.current)
+
+        # enemies are grouped by Unit, a target is a (group, lane) pair in crowd order
+        counts = {}
+        lanes = []
+        for enemy in enemies:
+            lanes.append(counts.get(id(enemy), 0))
+            counts[id(enemy)] = lanes[-1] + 1
+        groups = {}
+        for enemy in enemies:
+            if id(enemy) not in groups:
+                enemy.reset()
+                groups[id(enemy)] = CrowdGroup(self, enemy, fire_mode, counts[id(enemy)])
+        self.groups = list(groups.values())
+        self.targets = [(groups[id(enemy)], lane) for enemy, lane in zip(enemies, lanes)]
+        self.focus = 0
+
+    def push(self, time, kind, payload):
+        heapq.heappush(self.event_queue, (time, self.call_index, kind, payload))
+        self.call_index += 1
+
+    def get_tier(self, chance:float):
+        return int(np.floor(chance) + (self.rng.random() < chance % 1))
+
+    def get_focus(self):
+        # targets never revive, so the focus only moves forward
+        while self.focus < len(self.targets):
+            group, lane = self.targets[self.focus]
+            if group.alive[lane]:
+                return group, lane
+            self.focus += 1
+        return None, None
+
+    def get_kill_times(self):
+        return np.array([group.kill_time[lane] for group, lane in self.targets])
+
+    def get_pool(self):
+        return sum(float(np.sum(np.maximum(g.overguard, 0) + np.maximum(g.shield, 0) + np.maximum(g.health, 0))) for g in self.groups)
+
+    def run_events(self):
+        while len(self.event_queue) > 0 and any(group.alive.any() for group in self.groups):
+            time, _, kind, payload = heapq.heappop(self.event_queue)
+            if time > self.max_time:
+                break
+            self.time = time
+
+            if kind == TRIGGER:
+                self.trigger_event()
+            elif kind == PELLET:
+                self.pellet_event(payload)
+            else:
+                group, payload = payload
+                group.time = time
+                group.dispatch(kind, payload)
+
+    def trigger_event(self):
+        # one shot for the whole crowd, so multishot is rolled once and shared by every target it hits
+        fm = self.fire_mode
+        stats = self.groups[0].get_stats(fm)
+        multishot_roll = self.get_tier(stats.multishot)
+
+        self.magazine -= fm.ammoCost.modded
+        fm_time = self.time + fm.embedDelay.modded
+        if stats.held:
+            for group in self.groups:
+                group.held_multiplier[:] = multishot_roll
+            pellets = 1
+        else:
+            if multishot_roll > 0:
+                for group in self.groups:
+                    group.multishot_damage[:] = 0 if multishot_roll == 1 else stats.multishot_damage
+            pellets = multishot_roll
+
+        for _ in range(pellets):
+            self.push(fm_time, PELLET, fm)
+            for fme in fm.fire_mode_effects.values():
+                fme_time = fme.embedDelay.modded + fm_time + 1e-4
+                for _ in range(self.get_tier(fme.multishot.modded)):
+                    self.push(fme_time, PELLET, fme)
+
+        if self.magazine > 0:
+            next_event = self.time + fm.fireTime.modded + fm.chargeTime.modded
+        else:
+            self.magazine = fm.magazineSize.modded
+            next_event = self.time + max(fm.reloadTime.modded, fm.fireTime.modded) + fm.chargeTime.modded
+        self.push(next_event, TRIGGER, None)
+
+    def pellet_event(self, fire_mode:FireMode):
+        # targets are picked when the pellet lands, so a pellet in flight moves on if its target died
+        if fire_mode.radial:
+            for group in self.groups:
+                group.time = self.time
+                group.pellet_event(group.get_stats(fire_mode), group.all_index)
+            return
+        group, lane = self.get_focus()
+        if group is None:
+            return
+        group.time = self.time
+        group.pellet_event(group.get_stats(fire_mode), group.all_index[lane:lane+1])
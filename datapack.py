@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import collections.abc
+import json
+import os
+import struct
+import numpy as np
+from pathlib import Path
+from types import MappingProxyType
+
+DATA_FOLDER = os.path.join(Path(__file__).parent.resolve(), "data")
+PACK_FILE = "datapack.bin"
+PACK_MAGIC = b"WFSPACK1"
+PACK_VERSION = 1
+ALIGNMENT = 64
+
+# source file -> table holding its top level entries
+SOURCE_TABLES = {"ExportWeapons.json": "weapons", "ExportRivenUpgrades.json": "rivens", "unit_data.json": "units"}
+# fixed length numeric vectors stored as float32 rows
+VECTOR_FIELDS = {"damagePerShot": 20}
+
+KIND_MISSING = 0
+KIND_FLOAT = 1
+KIND_INT = 2
+KIND_BOOL = 3
+
+# one loaded pack per path, reloaded when the file is rebuilt
+_packs = {}
+
+
+class DataPack():
+    '''
+    Read-only view of a compiled data pack.
+    Numeric columns are memory-mapped so every process reading the pack shares the same pages.
+    '''
+    def __init__(self, path:str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, header_offset, header_length = struct.unpack("<8sQQ", f.read(24))
+            if magic != PACK_MAGIC:
+                raise Exception(f"{path} is not a data pack")
+            f.seek(header_offset)
+            header = json.loads(f.read(header_length).decode())
+        if header["version"] != PACK_VERSION:
+            raise Exception(f"{path} has pack version {header['version']}, expected {PACK_VERSION}")
+        self.sources:dict = header["sources"]
+        self.tables = {name:PackTable(self, spec) for name, spec in header["tables"].items()}
+
+    def memmap(self, spec:dict):
+        # mmap cannot map zero bytes
+        if 0 in spec["shape"]:
+            return np.zeros(spec["shape"], dtype=np.dtype(spec["dtype"]))
+        return np.memmap(self.path, dtype=np.dtype(spec["dtype"]), mode='r', offset=spec["offset"], shape=tuple(spec["shape"]))
+
+    def is_current(self, filename:str):
+        if filename not in self.sources:
+            return False
+        source = os.path.join(os.path.dirname(self.path), filename)
+        # a pack shipped without its json sources is used as is
+        if not os.path.isfile(source):
+            return True
+        return self.sources.get(filename) == os.stat(source).st_mtime_ns
+
+    def get_index(self, filename:str):
+        return self.tables[SOURCE_TABLES[filename]].get_index()
+
+    def resolve(self, value):
+        if isinstance(value, dict):
+            if "$row" in value:
+                table, row = value["$row"]
+                return PackRecord(self.tables[table], row)
+            return MappingProxyType({k:self.resolve(v) for k, v in value.items()})
+        if isinstance(value, list):
+            return tuple(self.resolve(v) for v in value)
+        return value
+
+
+class PackTable():
+    def __init__(self, pack:DataPack, spec:dict) -> None:
+        self.pack = pack
+        self.names:dict = spec["names"]
+        self.fields:list = spec["fields"]
+        self.numeric:dict = {k:i for i, k in enumerate(spec["numeric"])}
+        self.vectors:dict = {k:i+len(self.numeric) for i, k in enumerate(spec["vectors"])}
+        self.values = pack.memmap(spec["columns"]["values"])
+        self.kinds = pack.memmap(spec["columns"]["kinds"])
+        self.vector_columns = {k:pack.memmap(spec["columns"][k]) for k in self.vectors}
+
+    def get_index(self):
+        return MappingProxyType({name:PackRecord(self, row) for name, row in self.names.items()})
+
+    def get_value(self, row:int, key:str):
+        if key in self.numeric:
+            col = self.numeric[key]
+            kind = self.kinds[row, col]
+            if kind == KIND_MISSING:
+                raise KeyError(key)
+            value = self.values[row, col]
+            if kind == KIND_INT:
+                return int(value)
+            if kind == KIND_BOOL:
+                return bool(value)
+            return float(value)
+        if key in self.vectors:
+            if self.kinds[row, self.vectors[key]] == KIND_MISSING:
+                raise KeyError(key)
+            return self.vector_columns[key][row]
+        return self.pack.resolve(self.fields[row][key])
+
+    def get_keys(self, row:int):
+        keys = list(self.fields[row])
+        keys += [k for k, col in self.numeric.items() if self.kinds[row, col] != KIND_MISSING]
+        keys += [k for k, col in self.vectors.items() if self.kinds[row, col] != KIND_MISSING]
+        return keys
+
+
+class PackRecord(collections.abc.Mapping):
+    '''
+    Mapping over one row of a pack table, interchangeable with the parsed json entry.
+    '''
+    __slots__ = ("table", "row")
+
+    def __init__(self, table:PackTable, row:int) -> None:
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key:str):
+        return self.table.get_value(self.row, key)
+
+    def __iter__(self):
+        return iter(self.table.get_keys(self.row))
+
+    def __len__(self):
+        return len(self.table.get_keys(self.row))
+
+
+class TableBuilder():
+    def __init__(self, name:str) -> None:
+        self.name = name
+        self.names = {}
+        self.records = []
+
+    def add(self, record:dict, name:str=None):
+        row = len(self.records)
+        self.records.append(record)
+        if name is not None:
+            self.names[name] = row
+        return {"$row": [self.name, row]}
+
+    def compile(self):
+        numeric = []
+        for record in self.records:
+            for k, v in record.items():
+                if k not in VECTOR_FIELDS and k not in numeric and isinstance(v, (int, float)):
+                    numeric.append(k)
+        # keys that are not numeric in every record stay in the string index
+        numeric = [k for k in numeric if all(isinstance(r[k], (int, float)) for r in self.records if k in r)]
+        vectors = [k for k in VECTOR_FIELDS if any(k in r for r in self.records)]
+
+        n = len(self.records)
+        values = np.zeros((n, len(numeric)), dtype=np.float64)
+        kinds = np.zeros((n, len(numeric)+len(vectors)), dtype=np.uint8)
+        vector_columns = {k:np.zeros((n, VECTOR_FIELDS[k]), dtype=np.single) for k in vectors}
+        fields = []
+        for row, record in enumerate(self.records):
+            for col, k in enumerate(numeric):
+                if k not in record:
+                    continue
+                v = record[k]
+                values[row, col] = v
+                kinds[row, col] = KIND_BOOL if isinstance(v, bool) else KIND_INT if isinstance(v, int) else KIND_FLOAT
+            for col, k in enumerate(vectors):
+                if k not in record:
+                    continue
+                vector_columns[k][row] = record[k]
+                kinds[row, col+len(numeric)] = KIND_FLOAT
+            fields.append({k:v for k, v in record.items() if k not in numeric and k not in vectors})
+
+        columns = dict(values=values, kinds=kinds, **vector_columns)
+        spec = dict(names=self.names, fields=fields, numeric=numeric, vectors=vectors)
+        return spec, columns
+
+
+def build_pack(data_folder:str=DATA_FOLDER, pack_file:str=PACK_FILE):
+    '''
+    Compiles the json exports found in data_folder into a single columnar pack file.
+    '''
+    tables = {name:TableBuilder(name) for name in SOURCE_TABLES.values()}
+    tables["fire_modes"] = TableBuilder("fire_modes")
+    sources = {}
+
+    for filename, table_name in SOURCE_TABLES.items():
+        path = os.path.join(data_folder, filename)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'r') as f:
+            data = json.load(f)
+        sources[filename] = os.stat(path).st_mtime_ns
+        if isinstance(data, list):
+            data = {elem.get("name", str(i)):elem for i, elem in enumerate(data)}
+        for name, entry in data.items():
+            if table_name == "weapons":
+                entry = dict(entry)
+                if "fireModes" in entry:
+                    entry["fireModes"] = {k:add_fire_mode(tables["fire_modes"], fm) for k, fm in entry["fireModes"].items()}
+            tables[table_name].add(entry, name)
+
+    path = os.path.join(data_folder, pack_file)
+    header_tables = {}
+    with open(path + ".tmp", 'wb') as f:
+        f.write(b"\0" * ALIGNMENT)
+        for table_name, builder in tables.items():
+            spec, columns = builder.compile()
+            spec["columns"] = {}
+            for column_name, array in columns.items():
+                offset = f.tell()
+                f.write(array.tobytes())
+                f.write(b"\0" * (-f.tell() % ALIGNMENT))
+                spec["columns"][column_name] = dict(dtype=array.dtype.str, shape=list(array.shape), offset=offset)
+            header_tables[table_name] = spec
+        header = json.dumps(dict(version=PACK_VERSION, sources=sources, tables=header_tables)).encode()
+        header_offset = f.tell()
+        f.write(header)
+        f.seek(0)
+        f.write(struct.pack("<8sQQ", PACK_MAGIC, header_offset, len(header)))
+    os.replace(path + ".tmp", path)
+    _packs.pop(path, None)
+    return path
+
+
+def add_fire_mode(builder:TableBuilder, fire_mode:dict):
+    fire_mode = dict(fire_mode)
+    if "secondaryEffects" in fire_mode:
+        fire_mode["secondaryEffects"] = {k:add_fire_mode(builder, fm) for k, fm in fire_mode["secondaryEffects"].items()}
+    return builder.add(fire_mode)
+
+
+def get_pack(data_folder:str=DATA_FOLDER, pack_file:str=PACK_FILE):
+    path = os.path.join(data_folder, pack_file)
+    if not os.path.isfile(path):
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    if path not in _packs or _packs[path][0] != mtime:
+        _packs[path] = (mtime, DataPack(path))
+    return _packs[path][1]
+
+
+if __name__ == "__main__":
+    print(build_pack())
@@ -5,6 +5,7 @@ import re
 import string
 import os
 from pathlib import Path
+import warframe_simulacrum.datapack as datapack
 
 def download_weapons(save_file=False):
     current_folder = Path(__file__).parent.resolve()
@@ -90,6 +91,7 @@ def download_weapons(save_file=False):
     if save_file:
         with open(os.path.join(current_folder, "data", "ExportWeapons.json"), 'w') as fout:
             json.dump(reformat_data, fout, indent=4)
+        datapack.build_pack(os.path.join(current_folder, "data"))
 
     return reformat_data
 
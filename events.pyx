@@ -0,0 +1,230 @@
+from libc.stdlib cimport realloc, free
+
+# event kinds, exported to python as module level ints
+cpdef enum:
+    EV_TRIGGER = 0          # target: fire mode, arg: enemy
+    EV_PELLET_HIT = 1       # target: enemy, arg: fire mode, extra: bodypart
+    EV_EFFECT_HIT = 2       # target: enemy, arg: fire mode effect, extra: bodypart
+    EV_PROC_TICK = 3        # target: unit's DoT clock, arg: tick time
+    EV_PROC_REMOVE = 5      # target: default proc manager
+    EV_HEAT_EXPIRY = 6      # target: heat proc manager, arg: fire mode
+    EV_ARMOR_STRIP = 7      # target: heat proc manager, arg: fire mode
+    EV_ARMOR_REGEN = 8      # target: heat proc manager, arg: fire mode
+
+cdef struct EventRecord:
+    double time
+    long long order
+    int kind
+
+cdef class EventQueue:
+    '''
+    Binary heap of preallocated event records ordered by (time, push order).
+    Records live in a slot pool that is reused across pushes, objects referenced by an event are kept in parallel lists.
+    '''
+    cdef EventRecord* records
+    cdef int* heap
+    cdef int* free_slots
+    cdef int capacity
+    cdef int size
+    cdef int free_count
+    cdef long long order
+    cdef list targets
+    cdef list args
+    cdef list extras
+
+    # event that was last popped
+    cdef readonly int kind
+    cdef readonly double time
+    cdef readonly object target
+    cdef readonly object arg
+    cdef readonly object extra
+
+    def __cinit__(self, int capacity=256):
+        self.capacity = 0
+        self.records = NULL
+        self.heap = NULL
+        self.free_slots = NULL
+        self.free_count = 0
+        self.targets = []
+        self.args = []
+        self.extras = []
+        self.size = 0
+        self.order = 0
+        self.grow(capacity)
+
+    def __dealloc__(self):
+        free(self.records)
+        free(self.heap)
+        free(self.free_slots)
+
+    cdef void grow(self, int capacity) except *:
+        cdef int i
+        self.records = <EventRecord*>realloc(self.records, capacity * sizeof(EventRecord))
+        self.heap = <int*>realloc(self.heap, capacity * sizeof(int))
+        self.free_slots = <int*>realloc(self.free_slots, capacity * sizeof(int))
+        if self.records == NULL or self.heap == NULL or self.free_slots == NULL:
+            raise MemoryError()
+        for i in range(self.capacity, capacity):
+            self.free_slots[self.free_count] = i
+            self.free_count += 1
+        self.targets.extend([None] * (capacity - self.capacity))
+        self.args.extend([None] * (capacity - self.capacity))
+        self.extras.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    cpdef void clear(self):
+        # only the pending slots are returned to the pool
+        cdef int i, slot
+        for i in range(self.size):
+            slot = self.heap[i]
+            self.targets[slot] = None
+            self.args[slot] = None
+            self.extras[slot] = None
+            self.free_slots[self.free_count] = slot
+            self.free_count += 1
+        self.size = 0
+        self.order = 0
+        self.target = None
+        self.arg = None
+        self.extra = None
+
+    def __len__(self):
+        return self.size
+
+    def get_state(self):
+        '''
+        The pending events as (time, order, kind, target, arg, extra) tuples and the push counter.
+        '''
+        cdef int i, slot
+        events = []
+        for i in range(self.size):
+            slot = self.heap[i]
+            events.append((self.records[slot].time, self.records[slot].order, self.records[slot].kind,
+                           self.targets[slot], self.args[slot], self.extras[slot]))
+        return events, self.order
+
+    def set_state(self, state):
+        # events keep their push order, so they pop in the same sequence as when the state was taken
+        events, order = state
+        self.clear()
+        for time, event_order, kind, target, arg, extra in events:
+            self.insert(time, event_order, kind, target, arg, extra)
+        self.order = order
+
+    cdef inline bint less(self, int a, int b):
+        cdef EventRecord* ra = &self.records[a]
+        cdef EventRecord* rb = &self.records[b]
+        return ra.time < rb.time or (ra.time == rb.time and ra.order < rb.order)
+
+    cpdef void push(self, double time, int kind, object target, object arg=None, object extra=None):
+        self.insert(time, self.order, kind, target, arg, extra)
+        self.order += 1
+
+    cdef inline void insert(self, double time, long long order, int kind, object target, object arg, object extra) except *:
+        cdef int slot, pos, parent
+        if self.free_count == 0:
+            self.grow(self.capacity * 2)
+        self.free_count -= 1
+        slot = self.free_slots[self.free_count]
+        self.records[slot].time = time
+        self.records[slot].order = order
+        self.records[slot].kind = kind
+        self.targets[slot] = target
+        self.args[slot] = arg
+        self.extras[slot] = extra
+
+        # sift up
+        pos = self.size
+        self.size += 1
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if not self.less(slot, self.heap[parent]):
+                break
+            self.heap[pos] = self.heap[parent]
+            pos = parent
+        self.heap[pos] = slot
+
+    cpdef double pop(self) except? -1:
+        '''
+        Removes the earliest event and makes it the current event. Returns its time.
+        '''
+        cdef int slot, last, pos, child
+        if self.size == 0:
+            raise IndexError("pop from empty event queue")
+        slot = self.heap[0]
+        self.size -= 1
+        last = self.heap[self.size]
+
+        # sift down
+        pos = 0
+        while True:
+            child = 2 * pos + 1
+            if child >= self.size:
+                break
+            if child + 1 < self.size and self.less(self.heap[child + 1], self.heap[child]):
+                child += 1
+            if not self.less(self.heap[child], last):
+                break
+            self.heap[pos] = self.heap[child]
+            pos = child
+        if self.size > 0:
+            self.heap[pos] = last
+
+        self.kind = self.records[slot].kind
+        self.time = self.records[slot].time
+        self.target = self.targets[slot]
+        self.arg = self.args[slot]
+        self.extra = self.extras[slot]
+        self.targets[slot] = None
+        self.args[slot] = None
+        self.extras[slot] = None
+        self.free_slots[self.free_count] = slot
+        self.free_count += 1
+        return self.time
+
+    cpdef dispatch(self):
+        '''
+        Runs the current event.
+        '''
+        cdef int kind = self.kind
+        if kind == EV_TRIGGER:
+            self.target.pull_trigger(self.arg)
+        elif kind == EV_PELLET_HIT or kind == EV_EFFECT_HIT:
+            self.target.pellet_hit(self.arg, self.extra)
+        elif kind == EV_PROC_TICK:
+            self.target.damage_event(self.arg)
+        elif kind == EV_PROC_REMOVE:
+            self.target.remove_expired_proc()
+        elif kind == EV_HEAT_EXPIRY:
+            self.target.expiry_event(self.arg)
+        elif kind == EV_ARMOR_STRIP:
+            self.target.armor_strip_event(self.arg)
+        elif kind == EV_ARMOR_REGEN:
+            self.target.armor_regen_event(self.arg)
+        else:
+            raise Exception(f"Unknown event kind {kind}")
+
+    def get_name(self):
+        if self.kind == EV_PELLET_HIT:
+            return "Pellet hit"
+        if self.kind == EV_EFFECT_HIT:
+            return f"{self.arg.name} hit"
+        if self.kind == EV_PROC_TICK:
+            return self.target.event_name
+        return ""
+
+    def get_info(self):
+        template, a, b = self.get_info_args()
+        return template.format(a, b)
+
+    def get_info_args(self):
+        # format template and its two arguments, so recorders can defer building the string
+        if self.kind == EV_PELLET_HIT or self.kind == EV_EFFECT_HIT:
+            return self.target.get_last_crit_info_args()
+        if self.kind == EV_PROC_TICK:
+            return self.target.get_damage_info_args()
+        if self.kind == EV_ARMOR_STRIP:
+            return "Heat proc armor strip", 0, 0
+        if self.kind == EV_ARMOR_REGEN:
+            return "Heat proc armor regen", 0, 0
+        return "", 0, 0
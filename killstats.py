@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import math
+import numpy as np
+
+MAX_TIME = 20
+KILL_TIME_BINS = 100
+# damage bins are logarithmic up to MAX_DAMAGE so they fit any enemy, no damage is counted as underflow
+DAMAGE_BINS = 100
+MAX_DAMAGE = 1e10
+SKETCH_ACCURACY = 0.01
+
+
+class RunningStats():
+    '''
+    Count, mean, variance (Welford), min and max of a stream of values.
+    '''
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value:float):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values:np.ndarray):
+        if len(values) == 0:
+            return
+        other = RunningStats()
+        other.count = len(values)
+        other.mean = float(np.mean(values))
+        other.m2 = float(np.sum((values - other.mean)**2))
+        other.min = float(np.min(values))
+        other.max = float(np.max(values))
+        self.merge(other)
+
+    def merge(self, other:RunningStats):
+        # pairwise update of Chan et al.
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count > 0 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Histogram():
+    '''
+    Counts over fixed bin edges, values outside the edges are counted as underflow and overflow.
+    '''
+    def __init__(self, edges:np.ndarray) -> None:
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, value:float):
+        index = np.searchsorted(self.edges, value, side='right') - 1
+        if index < 0:
+            self.underflow += 1
+        elif index >= len(self.counts):
+            # the last edge belongs to the last bin
+            if value == self.edges[-1]:
+                self.counts[-1] += 1
+            else:
+                self.overflow += 1
+        else:
+            self.counts[index] += 1
+
+    def add_many(self, values:np.ndarray):
+        counts, _ = np.histogram(values, self.edges)
+        self.counts += counts
+        self.underflow += int(np.sum(values < self.edges[0]))
+        self.overflow += int(np.sum(values > self.edges[-1]))
+
+    def merge(self, other:Histogram):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bin edges cannot be merged")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+
+class QuantileSketch():
+    '''
+    Mergeable quantile sketch with relative accuracy, values are counted in logarithmic buckets (DDSketch).
+    Its size only grows with the log of the value range, not with the number of values.
+    '''
+    def __init__(self, accuracy:float=SKETCH_ACCURACY) -> None:
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        # values <= 0 are not bucketed
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value:float):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def add_many(self, values:np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        self.count += len(values)
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        keys, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other:QuantileSketch):
+        if self.accuracy != other.accuracy:
+            raise ValueError("Sketches with different accuracy cannot be merged")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q:float) -> float:
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # bucket key holds (gamma^(key-1), gamma^key], its midpoint in relative terms
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma**max(self.buckets) / (self.gamma + 1)
+
+
+class TrialStats():
+    '''
+    Online summary of trials: kill time and damage dealt statistics and histograms, and the count of censored trials
+    that hit max time without a kill. Memory does not grow with the number of trials, and accumulators of different workers merge.
+    '''
+    def __init__(self, max_time:float=MAX_TIME, bins:int=KILL_TIME_BINS, accuracy:float=SKETCH_ACCURACY, damage_bins:int=DAMAGE_BINS) -> None:
+        self.max_time = max_time
+        self.trials = 0
+        self.censored = 0
+        self.kill_time = RunningStats()
+        self.kill_time_histogram = Histogram(np.linspace(0, max_time, bins + 1))
+        self.kill_time_sketch = QuantileSketch(accuracy)
+        self.damage = RunningStats()
+        self.damage_histogram = Histogram(np.geomspace(1, MAX_DAMAGE, damage_bins + 1))
+        self.damage_sketch = QuantileSketch(accuracy)
+
+    def add(self, kill_time:float, damage:float=None):
+        '''
+        kill_time is None or inf for a censored trial, damage None if it was not measured.
+        '''
+        self.trials += 1
+        if kill_time is None or not kill_time <= self.max_time:
+            self.censored += 1
+        else:
+            self.kill_time.add(kill_time)
+            self.kill_time_histogram.add(kill_time)
+            self.kill_time_sketch.add(kill_time)
+        if damage is not None:
+            self.damage.add(damage)
+            self.damage_histogram.add(damage)
+            self.damage_sketch.add(damage)
+
+    def add_many(self, kill_times:np.ndarray, damages:np.ndarray=None):
+        kill_times = np.asarray(kill_times, dtype=np.float64)
+        kills = kill_times[kill_times <= self.max_time]
+        self.trials += len(kill_times)
+        self.censored += len(kill_times) - len(kills)
+        self.kill_time.add_many(kills)
+        self.kill_time_histogram.add_many(kills)
+        self.kill_time_sketch.add_many(kills)
+        if damages is not None:
+            damages = np.asarray(damages, dtype=np.float64)
+            self.damage.add_many(damages)
+            self.damage_histogram.add_many(damages)
+            self.damage_sketch.add_many(damages)
+
+    def merge(self, other:TrialStats):
+        if self.max_time != other.max_time:
+            raise ValueError("Trial stats with different max time cannot be merged")
+        self.trials += other.trials
+        self.censored += other.censored
+        self.kill_time.merge(other.kill_time)
+        self.kill_time_histogram.merge(other.kill_time_histogram)
+        self.kill_time_sketch.merge(other.kill_time_sketch)
+        self.damage.merge(other.damage)
+        self.damage_histogram.merge(other.damage_histogram)
+        self.damage_sketch.merge(other.damage_sketch)
+
+    def summary(self) -> dict:
+        '''
+        Same keys as sweep.summarize_kill_times plus the censored count and damage, quantiles are from the sketch.
+        '''
+        kill_time = self.kill_time
+        kills = kill_time.count
+        row = dict(kills=kills, kill_rate=kills/self.trials if self.trials > 0 else 0., censored=self.censored)
+        if kills == 0:
+            row.update(mean=np.nan, std=np.nan, median=np.nan, p10=np.nan, p90=np.nan, min=np.nan, max=np.nan)
+        else:
+            p10, median, p90 = [get_quantile(self.kill_time_sketch, kill_time, q) for q in (0.1, 0.5, 0.9)]
+            row.update(mean=kill_time.mean, std=kill_time.std, median=median, p10=p10, p90=p90, min=kill_time.min, max=kill_time.max)
+        if self.damage.count > 0:
+            row.update(damage_mean=self.damage.mean, damage_std=self.damage.std, damage_median=get_quantile(self.damage_sketch, self.damage, 0.5))
+        return row
+
+
+def get_quantile(sketch:QuantileSketch, stats:RunningStats, q:float) -> float:
+    # sketch values are bucket midpoints, kept inside the observed range
+    return min(max(sketch.quantile(q), stats.min), stats.max)
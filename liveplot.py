@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import time
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from typing import List
+
+from warframe_simulacrum.trace import TraceRecorder
+
+MAX_TIME = 20
+KILL_TIME_BINS = 100
+TIE_CANDIDATES = 16
+PALETTE = {"overguard": "dimgray", "health": "red", "shield": "royalblue", "armor": "gold"}
+
+
+class LivePlot():
+    '''
+    Incrementally updated trace plot and kill time histogram.
+    Each run is appended to one Line2D per stat, the histogram keeps counts over fixed bins, and redraws are capped at fps.
+    '''
+    def __init__(self, ax, ax2, names:List[str], bins:np.ndarray=None, fps:float=20) -> None:
+        self.ax = ax
+        self.ax2 = ax2
+        self.names = names
+        self.bins = bins if bins is not None else np.linspace(0, MAX_TIME, KILL_TIME_BINS + 1)
+        self.counts = np.zeros(len(self.bins) - 1, dtype=np.int64)
+        self.min_interval = 1 / fps if fps > 0 else 0
+        self.last_refresh = -np.inf
+        self.dirty = False
+
+        # pending x/y pieces per stat, merged into one array on refresh
+        self.segments = {name: ([], []) for name in names}
+        self.lines = {}
+        for name in names:
+            self.lines[name], = ax.plot([], [], color=PALETTE.get(name), alpha=0.5, marker='.', markeredgecolor='black',
+                                        drawstyle='steps-post', label=name)
+        self.bars = ax2.bar(self.bins[:-1], self.counts, width=np.diff(self.bins), align='edge')
+        ax2.set_xlabel('kill_times')
+        ax2.set_ylabel('Count')
+
+    def add_run(self, trace:TraceRecorder, kill_time:float=None):
+        time_ = trace.get_column("time")
+        for name in self.names:
+            value = trace.get_column(name)
+            # like plot_continuous, only the points where the stat changed
+            changed = np.empty(len(value), dtype=bool)
+            changed[:1] = True
+            changed[1:] = value[1:] != value[:-1]
+            xs, ys = self.segments[name]
+            # nan ends the previous run's line
+            xs.append(np.append(time_[changed], np.nan))
+            ys.append(np.append(value[changed], np.nan))
+
+        if kill_time is not None:
+            index = np.searchsorted(self.bins, kill_time, side='right') - 1
+            if 0 <= index < len(self.counts):
+                self.counts[index] += 1
+        self.dirty = True
+
+    def refresh(self, force:bool=False):
+        '''
+        Pushes the pending runs into the artists. Returns True if anything changed and the canvas should be drawn.
+        '''
+        now = time.perf_counter()
+        if not self.dirty or (not force and now - self.last_refresh < self.min_interval):
+            return False
+        for name, (xs, ys) in self.segments.items():
+            if len(xs) > 1:
+                xs[:] = [np.concatenate(xs)]
+                ys[:] = [np.concatenate(ys)]
+            if len(xs) == 1:
+                self.lines[name].set_data(xs[0], ys[0])
+        for bar, count in zip(self.bars, self.counts):
+            bar.set_height(count)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax2.set_ylim(0, max(1, self.counts.max()) * 1.05)
+        self.last_refresh = now
+        self.dirty = False
+        return True
+
+
+class PointIndex():
+    '''
+    Nearest point lookup for click-to-inspect over a long format trace frame, built once per plotted frame.
+    Points are held in a KD-tree over time and value normalized to the frame's range, and each point carries
+    the previous point of its (sim_index, variable) series as prev_time and prev_value.
+    '''
+    def __init__(self, df:pd.DataFrame) -> None:
+        from scipy.spatial import cKDTree
+        self.source = df
+        variable, _ = pd.factorize(df["variable"])
+        order = np.lexsort((df["event_index"].to_numpy(), variable, df["sim_index"].to_numpy()))
+        self.df = df.iloc[order].reset_index(drop=True)
+        self.position = order
+        variable = variable[order]
+
+        time_ = self.df["time"].to_numpy(dtype=np.float64)
+        value = self.df["value"].to_numpy(dtype=np.float64)
+        sim_index = self.df["sim_index"].to_numpy()
+        prev_time = np.full(len(time_), np.nan)
+        prev_value = np.full(len(value), np.nan)
+        if len(time_) > 1:
+            same = (sim_index[1:] == sim_index[:-1]) & (variable[1:] == variable[:-1]) & (time_[:-1] <= time_[1:])
+            prev_time[1:] = np.where(same, time_[:-1], np.nan)
+            prev_value[1:] = np.where(same, value[:-1], np.nan)
+        self.df["prev_time"] = prev_time
+        self.df["prev_value"] = prev_value
+
+        self.t_min, self.t_div = get_range(time_)
+        self.v_min, self.v_div = get_range(value)
+        self.tree = cKDTree(np.column_stack(((time_ - self.t_min) / self.t_div, (value - self.v_min) / self.v_div))) if len(time_) > 0 else None
+
+    def query(self, x:float, y:float):
+        '''
+        Row of the point closest to (x, y) in data coordinates, or None if the frame is empty.
+        '''
+        if self.tree is None:
+            return None
+        k = min(TIE_CANDIDATES, len(self.df))
+        distances, indices = self.tree.query([(x - self.t_min) / self.t_div, (y - self.v_min) / self.v_div], k=k)
+        indices = np.atleast_1d(indices)[np.atleast_1d(distances) == np.min(distances)]
+        # points overlapping across runs tie, the one first in the frame wins
+        return self.df.iloc[indices[np.argmin(self.position[indices])]]
+
+
+def get_range(values:np.ndarray):
+    if len(values) == 0:
+        return 0., 1.
+    low, high = np.nanmin(values), np.nanmax(values)
+    return low, (high - low) if high > low else 1.
+
+
+def create_headless_figure(figsize=(8, 8)):
+    '''
+    Figure with the two axes Simulacrum expects, on the Agg canvas so neither pyplot nor a GUI toolkit is needed.
+    '''
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    ax1, ax2 = figure.subplots(2)
+    return figure, ax1, ax2
@@ -3,12 +3,15 @@ from collections import deque
 import numpy as np
 import warframe_simulacrum.constants as const
 from typing import List, TYPE_CHECKING
-import heapq
+import warframe_simulacrum.events as ev
 
-from warframe_simulacrum.weapon import EventTrigger, FireMode
+from warframe_simulacrum.weapon import FireMode
 if TYPE_CHECKING:
     from warframe_simulacrum.unit import Unit
 
+COUNT_INFO = "Count={0:.0f}"
+BIN_COUNT_INFO = "Count in bin = {0:.0f}"
+
 class Proc:
     def __init__(self, enemy: Unit, fire_mode: FireMode, duration: int, damage: float):
         self.fire_mode = fire_mode
@@ -25,6 +28,100 @@ class Proc:
         self.offset = self.simulation.time
         self.next_event = self.offset + 1
 
+class DotClock():
+    '''
+    Schedules the 1s damage ticks of a unit's status procs. Members ticking at the same time form one group with one heap event,
+    and the group moves on to its next tick as a whole.
+    Without a damage controller and once only health is left damage is linear, so ticks of a group with the same fire mode and
+    bodypart are summed into one apply_damage call.
+    '''
+    def __init__(self, enemy:Unit):
+        self.enemy = enemy
+        self.simulation = enemy.simulation
+        # tick time -> [(member, fire mode)], members are proc containers and managers
+        self.groups = {}
+        self.last_group = []
+
+    def reset(self):
+        self.groups.clear()
+        self.last_group = []
+
+    def get_state(self):
+        return {time: list(group) for time, group in self.groups.items()}
+
+    def set_state(self, state):
+        self.groups = {time: list(group) for time, group in state.items()}
+
+    def schedule(self, time:float, member, fire_mode:FireMode):
+        group = self.groups.get(time)
+        if group is None:
+            self.groups[time] = [(member, fire_mode)]
+            self.simulation.event_queue.push(time, ev.EV_PROC_TICK, self, time)
+        else:
+            group.append((member, fire_mode))
+
+    def damage_event(self, time:float):
+        group = self.groups.pop(time, None)
+        if group is None:
+            return
+        self.last_group = group
+        if len(group) == 1:
+            member, fire_mode = group[0]
+            active = group if member.tick(fire_mode) else None
+        elif self.is_linear():
+            active = self.tick_summed(group)
+        else:
+            active = [entry for entry in group if entry[0].tick(entry[1])]
+
+        if active:
+            next_time = time + 1
+            next_group = self.groups.get(next_time)
+            if next_group is None:
+                self.groups[next_time] = active
+                self.simulation.event_queue.push(next_time, ev.EV_PROC_TICK, self, next_time)
+            else:
+                next_group.extend(active)
+
+    def tick_summed(self, group):
+        summed = {}
+        active = []
+        for member, fire_mode in group:
+            tick = member.get_tick(fire_mode)
+            if tick is None:
+                continue
+            damage_fire_mode, damage, bodypart, damage_tag = tick
+            key = (damage_fire_mode, bodypart, damage_tag)
+            entry = summed.get(key)
+            if entry is None:
+                summed[key] = [damage.copy(), [(member, fire_mode)]]
+            else:
+                entry[0] += damage
+                entry[1].append((member, fire_mode))
+            active.append((member, fire_mode))
+        for (damage_fire_mode, bodypart, damage_tag), (damage, members) in summed.items():
+            applied_damage = self.enemy.apply_damage(damage_fire_mode, damage, bodypart=bodypart, damage_tag=damage_tag)
+            for member, _ in members:
+                member.end_tick(applied_damage)
+        return active
+
+    def is_linear(self):
+        enemy = self.enemy
+        return enemy.damage_controller_type == "DC_NONE" and enemy.overguard.current_value <= 0 and enemy.shield.current_value <= 0
+
+    @property
+    def event_name(self):
+        return " + ".join(dict.fromkeys(member.event_name for member, _ in self.last_group))
+
+    def get_damage_info(self):
+        template, a, b = self.get_damage_info_args()
+        return template.format(a, b)
+
+    def get_damage_info_args(self):
+        if len(self.last_group) == 1:
+            return self.last_group[0][0].get_damage_info_args()
+        return COUNT_INFO, sum(member.count for member, _ in self.last_group), 0
+
+
 class DefaultProcManager():
     def __init__(self, enemy:Unit, proc_id:int, count_change_callback=None):
         self.enemy = enemy
@@ -43,14 +140,45 @@ class DefaultProcManager():
         self.max_stacks = self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['max_stacks']
         self.count = 0
 
+    def get_state(self):
+        # procs are never changed after creation and are shared with the snapshot
+        return self.next_event, tuple(self.proc_dq), self.count, self.max_stacks
+
+    def set_state(self, state):
+        self.next_event, procs, self.count, self.max_stacks = state
+        self.proc_dq.clear()
+        self.proc_dq.extend(procs)
+
+    def get_count(self):
+        '''
+        Stack count at the current time. Without a count callback expired procs are only dropped when the count is read.
+        A proc still counts at its expiry time, like it did while its expiry event ran after the events at the same time.
+        '''
+        if self.count > 0 and self.proc_dq[0].expiry < self.simulation.time:
+            self.expire()
+        return self.count
+
+    def expire(self, inclusive=False):
+        # inclusive also drops the procs expiring right now, for the removal event at the expiry time
+        time = self.simulation.time
+        while self.count > 0 and (self.proc_dq[0].expiry < time or (inclusive and self.proc_dq[0].expiry == time)):
+            self.proc_dq.popleft()
+            self.count -= 1
+        if self.count == 0:
+            self.enemy.unique_proc_count -= 1
+
     def add_proc(self, fire_mode: FireMode, damage: float, bodypart:str):
         duration = self.base_duration * (1 + fire_mode.weapon.statusDuration_m["base"])
         new_proc = Proc(self.enemy, fire_mode, duration, damage)
         delta = True
 
+        if self.count_change_callback is None:
+            self.get_count()
         if self.count == 0:
             self.next_event = new_proc.expiry
-            heapq.heappush(self.simulation.event_queue, (self.next_event, self.simulation.consume_call_index(), EventTrigger(self.remove_expired_proc)))
+            # only a count change with a visible effect needs an event, other managers expire lazily
+            if self.count_change_callback is not None:
+                self.simulation.event_queue.push(self.next_event, ev.EV_PROC_REMOVE, self)
             self.enemy.unique_proc_count += 1
         elif self.count == self.max_stacks:
             delta = False
@@ -67,24 +195,57 @@ class DefaultProcManager():
 
         if self.count_change_callback is not None and delta:
             self.count_change_callback(self)
+
+    def add_procs(self, fire_mode: FireMode, damage: float, bodypart:str, count:int):
+        '''
+        Applies count procs of the same pellet. They share one Proc and the count callback runs once at the end.
+        '''
+        if count == 1:
+            return self.add_proc(fire_mode, damage, bodypart)
+        duration = self.base_duration * (1 + fire_mode.weapon.statusDuration_m["base"])
+        new_proc = Proc(self.enemy, fire_mode, duration, damage)
+        delta = False
+
+        if self.count_change_callback is None:
+            self.get_count()
+        for _ in range(count):
+            if self.count == 0:
+                delta = True
+                self.next_event = new_proc.expiry
+                if self.count_change_callback is not None:
+                    self.simulation.event_queue.push(self.next_event, ev.EV_PROC_REMOVE, self)
+                self.enemy.unique_proc_count += 1
+            elif self.count == self.max_stacks:
+                self.proc_dq.popleft()
+                self.count -= 1
+                if self.count > 0:
+                    self.next_event = self.proc_dq[0].expiry
+                else:
+                    self.next_event = new_proc.expiry
+            else:
+                delta = True
+
+            self.proc_dq.append(new_proc)
+            self.count += 1
+
+        if self.count_change_callback is not None and delta:
+            self.count_change_callback(self)
     
     def remove_expired_proc(self):
         if self.count == 0:
             return
         
-        if self.proc_dq[0].expiry <= self.simulation.time:
-            self.proc_dq.popleft()
-            self.count -= 1
+        expired = self.proc_dq[0].expiry <= self.simulation.time
+        if expired:
+            self.expire(inclusive=True)
 
-            if self.count == 0:
-                self.enemy.unique_proc_count -= 1
-            
-            if self.count > 0:
-                self.next_event = self.proc_dq[0].expiry
-                heapq.heappush(self.simulation.event_queue, (self.next_event, self.simulation.consume_call_index(), EventTrigger(self.remove_expired_proc)))
+        # the oldest proc may have been replaced at max stacks, so the next removal is rescheduled either way
+        if self.count > 0:
+            self.next_event = self.proc_dq[0].expiry
+            self.simulation.event_queue.push(self.next_event, ev.EV_PROC_REMOVE, self)
 
-            if self.count_change_callback is not None:
-                self.count_change_callback(self)
+        if expired and self.count_change_callback is not None:
+            self.count_change_callback(self)
 
 class ProcContainer:
     def __init__(self, enemy:Unit, index, manager: ContainerizedProcManager):
@@ -96,14 +257,29 @@ class ProcContainer:
         self.total_damage = np.array([0]*20, dtype=np.single)
         self.proc_dq: deque[Proc] = deque([])
         self.count = 0
+        self.event_name = f"{const.PROC_INFO[const.INDEX_PT[self.manager.proc_id]]['name']} proc"
+
+    def reset(self):
+        self.next_event = const.MAX_TIME_OFFSET
+        self.total_damage.fill(0)
+        self.proc_dq.clear()
+        self.count = 0
+
+    def get_state(self):
+        return self.next_event, self.total_damage.copy(), tuple(self.proc_dq), self.count
+
+    def set_state(self, state):
+        self.next_event, total_damage, procs, self.count = state
+        np.copyto(self.total_damage, total_damage)
+        self.proc_dq.clear()
+        self.proc_dq.extend(procs)
 
     def add_proc(self, proc: Proc):
         # If it is a new container, set the event time to first proc
         if self.count == 0:
             # self.total_damage[const.PROCID_DAMAGETYPE[self.manager.proc_id]] = 1
             self.next_event = proc.next_event
-            heapq.heappush(self.simulation.event_queue, (self.next_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{const.PROC_INFO[const.INDEX_PT[self.manager.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=proc.fire_mode)))
-            heapq.heappush(self.simulation.event_queue, (proc.expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event)))
+            self.enemy.proc_controller.dot_clock.schedule(self.next_event, self, proc.fire_mode)
             if self.manager.count == 0:
                 self.enemy.unique_proc_count += 1
 
@@ -112,28 +288,39 @@ class ProcContainer:
         self.count += 1
         self.manager.count += 1
 
-    def damage_event(self, fire_mode:FireMode):
+    def tick(self, fire_mode:FireMode):
+        # applies one tick, False once the container is empty and stops ticking
+        if self.count > 0 and self.proc_dq[0].expiry < self.simulation.time:
+            self.expire()
         if self.count == 0:
-            return
+            return False
         
         app_dmg = self.enemy.apply_damage(fire_mode, self.total_damage, bodypart='body')
         self.manager.total_applied_damage += app_dmg
+        self.next_event += 1
+        return True
+
+    def get_tick(self, fire_mode:FireMode):
+        # fire mode, damage, bodypart and damage tag of the next tick, for the clock to apply
+        if self.count > 0 and self.proc_dq[0].expiry < self.simulation.time:
+            self.expire()
+        if self.count == 0:
+            return None
+        return fire_mode, self.total_damage, 'body', None
 
+    def end_tick(self, app_dmg):
+        self.manager.total_applied_damage += app_dmg
         self.next_event += 1
-        heapq.heappush(self.simulation.event_queue, (self.next_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{const.PROC_INFO[const.INDEX_PT[self.manager.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=fire_mode)))
 
-    def expiry_event(self):
-        if self.count>0 and self.simulation.time >= self.proc_dq[0].expiry:
-            self.total_damage[const.PROCID_DAMAGETYPE[self.manager.proc_id]] -= self.proc_dq[0].damage
-            self.proc_dq.popleft()
-            self.count -= 1
-            self.manager.count -= 1
-            if self.manager.count == 0:
-                self.enemy.unique_proc_count -= 1
+    def damage_event(self, fire_mode:FireMode):
+        if self.tick(fire_mode):
+            self.enemy.proc_controller.dot_clock.schedule(self.next_event, self, fire_mode)
 
-            if self.count == 0:
-                return
-            heapq.heappush(self.simulation.event_queue, (self.proc_dq[0].expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event)))
+    def expire(self):
+        # drops the procs that expired by now, there are no expiry events
+        time = self.simulation.time
+        while self.count > 0 and self.proc_dq[0].expiry < time:
+            self.remove_oldest()
 
     def remove_oldest(self):
         self.total_damage[const.PROCID_DAMAGETYPE[self.manager.proc_id]] -= self.proc_dq[0].damage
@@ -143,21 +330,20 @@ class ProcContainer:
         if self.manager.count == 0:
             self.enemy.unique_proc_count -= 1
 
-        if self.count == 0:
-            return
-        heapq.heappush(self.simulation.event_queue, (self.proc_dq[0].expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event)))
-
     def get_damage_info(self):
-        return f"Count in bin = {self.count}"
+        return BIN_COUNT_INFO.format(self.count)
+
+    def get_damage_info_args(self):
+        return BIN_COUNT_INFO, self.count, 0
             
 
 class ContainerizedProcManager:
     def __init__(self, enemy:Unit, proc_id:int):
         self.enemy = enemy
         self.simulation = enemy.simulation
+        self.proc_id: str = proc_id
         self.container_list: deque["ProcContainer"] = deque([ProcContainer(self.enemy, i, self) for i in range(10)])
         self.container_index: int = 0 # the next container to add to
-        self.proc_id: str = proc_id
         self.base_duration = self.enemy.proc_info[const.INDEX_PT[proc_id]]['duration']
         self.damage_scaling = self.enemy.proc_info[const.INDEX_PT[proc_id]].get('damage_scaling', 1)
         self.max_stacks = self.enemy.proc_info[const.INDEX_PT[proc_id]]['max_stacks']
@@ -165,12 +351,22 @@ class ContainerizedProcManager:
         self.count = 0
 
     def reset(self):
-        self.container_list = deque([ProcContainer(self.enemy, i, self) for i in range(10)])
+        # containers are reset in place, pending events of the previous trial are dropped with the event queue
+        for container in self.container_list:
+            container.reset()
         self.container_index = 0
         self.total_applied_damage = 0
         self.max_stacks = self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['max_stacks']
         self.count = 0
 
+    def get_state(self):
+        return self.container_index, self.total_applied_damage, self.max_stacks, self.count, tuple(c.get_state() for c in self.container_list)
+
+    def set_state(self, state):
+        self.container_index, self.total_applied_damage, self.max_stacks, self.count, containers = state
+        for container, container_state in zip(self.container_list, containers):
+            container.set_state(container_state)
+
     def add_proc(self, fire_mode:FireMode, damage:float, bodypart:str):
         duration = self.base_duration * (1 + fire_mode.weapon.statusDuration_m["base"])
         if self.proc_id == const.DT_INDEX["DT_SLASH"]:
@@ -181,7 +377,36 @@ class ContainerizedProcManager:
             damage = damage 
         
         new_proc = Proc(self.enemy, fire_mode, duration, damage)
+        self.place_proc(new_proc)
+
+    def add_procs(self, fire_mode:FireMode, damage:float, bodypart:str, count:int):
+        '''
+        Applies count procs of the same pellet, sharing one Proc.
+        '''
+        if count == 1:
+            return self.add_proc(fire_mode, damage, bodypart)
+        duration = self.base_duration * (1 + fire_mode.weapon.statusDuration_m["base"])
+        if self.proc_id == const.DT_INDEX["DT_SLASH"]:
+            damage = self.damage_scaling * damage 
+        elif self.proc_id == const.DT_INDEX["DT_TOXIN"]:
+            damage = self.damage_scaling * damage  * (1 + fire_mode.weapon.toxin_m["base"])
 
+        new_proc = Proc(self.enemy, fire_mode, duration, damage)
+        for _ in range(count):
+            self.place_proc(new_proc)
+
+    def get_count(self):
+        '''
+        Stack count at the current time, expired procs of every container are dropped first.
+        '''
+        time = self.simulation.time
+        for container in self.container_list:
+            if container.count > 0 and container.proc_dq[0].expiry < time:
+                container.expire()
+        return self.count
+
+    def place_proc(self, new_proc:Proc):
+        self.get_count()
         if self.count > self.max_stacks:
             self.container_list[self.container_index-1].remove_oldest()
 
@@ -213,6 +438,7 @@ class AOEProcManager:
         self.max_stacks = self.enemy.proc_info[const.INDEX_PT[proc_id]]['max_stacks']
         self.base_duration = self.enemy.proc_info[const.INDEX_PT[proc_id]]['duration']
         self.damage_scaling = self.enemy.proc_info[const.INDEX_PT[proc_id]].get('damage_scaling', 1)
+        self.event_name = f"{self.enemy.proc_info[const.INDEX_PT[proc_id]]['name']} proc"
 
         self.proc_dq: deque[Proc]= deque([])
         self.init_time: int = const.MAX_TIME_OFFSET
@@ -233,18 +459,24 @@ class AOEProcManager:
         self.max_stacks = self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['max_stacks']
         self.count = 0
 
+    def get_state(self):
+        return tuple(self.proc_dq), self.init_time, self.next_tick_event, self.total_damage.copy(), self.total_applied_damage, self.count, self.max_stacks, self.bodypart
+
+    def set_state(self, state):
+        procs, self.init_time, self.next_tick_event, total_damage, self.total_applied_damage, self.count, self.max_stacks, self.bodypart = state
+        np.copyto(self.total_damage, total_damage)
+        self.proc_dq.clear()
+        self.proc_dq.extend(procs)
+
     def add_proc(self, fire_mode:FireMode, damage: float, bodypart:str):
         duration = self.base_duration * (1 + fire_mode.weapon.statusDuration_m["base"])
         min_dmg = 0
-        if self.count == 0:
+        if self.get_count() == 0:
             self.bodypart = bodypart
             min_dmg = 0
             self.init_time = self.simulation.time
             self.next_tick_event = self.init_time
-            heapq.heappush(self.simulation.event_queue, (self.next_tick_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=fire_mode)))
-
-            expiry = self.simulation.time + duration
-            heapq.heappush(self.simulation.event_queue, (expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event)))
+            self.enemy.proc_controller.dot_clock.schedule(self.next_tick_event, self, fire_mode)
             self.enemy.unique_proc_count += 1
         elif self.count >= self.max_stacks:
             # remove oldest proc
@@ -265,34 +497,56 @@ class AOEProcManager:
         self.proc_dq.append(new_proc)
         self.count += 1
 
-    def damage_event(self, fire_mode):
-        self.expiry_event()
-        if self.count == 0:
-            return
+    def add_procs(self, fire_mode:FireMode, damage: float, bodypart:str, count:int):
+        # the first proc starts the tick events, the rest only stack
+        for _ in range(count):
+            self.add_proc(fire_mode, damage, bodypart)
+
+    def tick(self, fire_mode):
+        if self.get_count() == 0:
+            return False
         
         applied_dmg = self.enemy.apply_damage(fire_mode, self.total_damage, bodypart=self.bodypart, damage_tag='radial')
         self.total_applied_damage += applied_dmg
+        # keeps ticking even if expiry is imminent, another refresher proc can happen before then
         self.next_tick_event += 1
-        # always put on event queue because even if expiry is imminent, another refresher proc can happen before then
-        heapq.heappush(self.simulation.event_queue, (self.next_tick_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=fire_mode)))
+        return True
 
-    def expiry_event(self):
-        if self.count == 0:
-            return
-        
-        if self.proc_dq[0].expiry <= self.simulation.time:
+    def get_tick(self, fire_mode):
+        if self.get_count() == 0:
+            return None
+        return fire_mode, self.total_damage, self.bodypart, 'radial'
+
+    def end_tick(self, applied_dmg):
+        self.total_applied_damage += applied_dmg
+        self.next_tick_event += 1
+
+    def damage_event(self, fire_mode):
+        if self.tick(fire_mode):
+            self.enemy.proc_controller.dot_clock.schedule(self.next_tick_event, self, fire_mode)
+
+    def get_count(self):
+        '''
+        Stack count at the current time, expired procs are dropped first.
+        '''
+        if self.count > 0 and self.proc_dq[0].expiry < self.simulation.time:
+            self.expire()
+        return self.count
+
+    def expire(self):
+        time = self.simulation.time
+        while self.count > 0 and self.proc_dq[0].expiry < time:
             old_proc = self.proc_dq.popleft()
             self.total_damage[const.PROCID_DAMAGETYPE[self.proc_id]] -= old_proc.damage
             self.count -= 1
-
-            if self.count == 0:
-                self.enemy.unique_proc_count -= 1
-
-            if self.count > 0:
-                heapq.heappush(self.simulation.event_queue, (self.proc_dq[0].expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event)))
+        if self.count == 0:
+            self.enemy.unique_proc_count -= 1
     
     def get_damage_info(self):
-        return f"Count={self.count}"
+        return COUNT_INFO.format(self.count)
+
+    def get_damage_info_args(self):
+        return COUNT_INFO, self.count, 0
 
     
 class HeatProcManager:
@@ -305,6 +559,7 @@ class HeatProcManager:
         self.base_duration = self.enemy.proc_info[const.INDEX_PT[proc_id]]['duration']
         self.refresh = self.enemy.proc_info[const.INDEX_PT[proc_id]]['refresh']
         self.damage_scaling = self.enemy.proc_info[const.INDEX_PT[proc_id]].get('damage_scaling', 1)
+        self.event_name = f"{self.enemy.proc_info[const.INDEX_PT[proc_id]]['name']} proc"
         self.base_armor_strip_delay = 0.5
         self.base_armor_regen_delay = 1.5
         self.strip_index = 0
@@ -333,6 +588,16 @@ class HeatProcManager:
         self.total_damage *= 0
         self.count = 0
 
+    def get_state(self):
+        return (tuple(self.proc_dq), self.total_applied_damage, self.init_time, self.next_tick_event, self.expiry, self.strip_index,
+                self.max_stacks, self.total_damage.copy(), self.count)
+
+    def set_state(self, state):
+        procs, self.total_applied_damage, self.init_time, self.next_tick_event, self.expiry, self.strip_index, self.max_stacks, total_damage, self.count = state
+        np.copyto(self.total_damage, total_damage)
+        self.proc_dq.clear()
+        self.proc_dq.extend(procs)
+
     def clear_proc(self):
         # do not reset strip index
         self.proc_dq.clear()
@@ -353,9 +618,9 @@ class HeatProcManager:
 
             armor_strip_delay = self.base_armor_strip_delay * (1 + fire_mode.weapon.statusDuration_m["base"])
             # schedule heat strip
-            heapq.heappush(self.simulation.event_queue, (self.simulation.time + armor_strip_delay, self.simulation.consume_call_index(), EventTrigger(self.armor_strip_event, fire_mode=fire_mode, info_callback=lambda: "Heat proc armor strip")))
-            heapq.heappush(self.simulation.event_queue, (self.next_tick_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=fire_mode)))
-            heapq.heappush(self.simulation.event_queue, (expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event, fire_mode=fire_mode)))
+            self.simulation.event_queue.push(self.simulation.time + armor_strip_delay, ev.EV_ARMOR_STRIP, self, fire_mode)
+            self.enemy.proc_controller.dot_clock.schedule(self.next_tick_event, self, fire_mode)
+            self.simulation.event_queue.push(expiry, ev.EV_HEAT_EXPIRY, self, fire_mode)
             self.enemy.unique_proc_count += 1
         elif self.count >= self.max_stacks:
             damage = self.damage_scaling * damage * (1 + self.proc_dq[0].fire_mode.weapon.heat_m["base"])
@@ -377,15 +642,37 @@ class HeatProcManager:
         self.proc_dq.append(new_proc)
         self.count += 1
 
+    def add_procs(self, fire_mode:FireMode, damage: np.array, bodypart:str, count:int):
+        # later procs of a batch scale with the first proc's fire mode, so they go through add_proc one by one
+        for _ in range(count):
+            self.add_proc(fire_mode, damage, bodypart)
 
-    def damage_event(self, fire_mode):
+
+    def get_count(self):
+        # heat expiry restores armor, so it keeps its expiry events and the count is always current
+        return self.count
+
+    def tick(self, fire_mode):
         if self.count == 0:
-            return 
+            return False
         applied_dmg = self.enemy.apply_damage(self.proc_dq[0].fire_mode, self.total_damage, bodypart='body')
         self.total_applied_damage += applied_dmg
+        # keeps ticking even if expiry is imminent, another refresher proc can happen before then
         self.next_tick_event += 1
-        # always put on event queue because even if expiry is imminent, another refresher proc can happen before then
-        heapq.heappush(self.simulation.event_queue, (self.next_tick_event, self.simulation.consume_call_index(), EventTrigger(self.damage_event, name=f"{self.enemy.proc_info[const.INDEX_PT[self.proc_id]]['name']} proc", info_callback=self.get_damage_info, fire_mode=fire_mode)))
+        return True
+
+    def get_tick(self, fire_mode):
+        if self.count == 0:
+            return None
+        return self.proc_dq[0].fire_mode, self.total_damage, 'body', None
+
+    def end_tick(self, applied_dmg):
+        self.total_applied_damage += applied_dmg
+        self.next_tick_event += 1
+
+    def damage_event(self, fire_mode):
+        if self.tick(fire_mode):
+            self.enemy.proc_controller.dot_clock.schedule(self.next_tick_event, self, fire_mode)
 
     def expiry_event(self, fire_mode):
         if self.count == 0:
@@ -394,12 +681,12 @@ class HeatProcManager:
             if self.expiry <= self.simulation.time:
                 armor_regen_delay = self.base_armor_regen_delay * (1 + self.proc_dq[0].fire_mode.weapon.statusDuration_m["base"])
                 # before reset, pass the fire_mode from the original proc so the status duration is preserved
-                heapq.heappush(self.simulation.event_queue, (self.simulation.time + armor_regen_delay, self.simulation.consume_call_index(), EventTrigger(self.armor_regen_event, fire_mode=fire_mode, info_callback=lambda: "Heat proc armor regen")))
+                self.simulation.event_queue.push(self.simulation.time + armor_regen_delay, ev.EV_ARMOR_REGEN, self, fire_mode)
                 self.count = 0
                 self.clear_proc()
                 self.enemy.unique_proc_count -= 1
             else:
-                heapq.heappush(self.simulation.event_queue, (self.expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event, fire_mode=fire_mode)))  
+                self.simulation.event_queue.push(self.expiry, ev.EV_HEAT_EXPIRY, self, fire_mode)
         else:
             if self.proc_dq[0].expiry <= self.simulation.time:
                 old_proc = self.proc_dq.popleft()
@@ -407,11 +694,11 @@ class HeatProcManager:
                 self.count -= 1
                 if len(self.proc_dq) > 0:
                     # schedule next expiry
-                    heapq.heappush(self.simulation.event_queue, (self.proc_dq[0].expiry, self.simulation.consume_call_index(), EventTrigger(self.expiry_event, fire_mode=fire_mode)))
+                    self.simulation.event_queue.push(self.proc_dq[0].expiry, ev.EV_HEAT_EXPIRY, self, fire_mode)
                 else:
                     armor_regen_delay = self.base_armor_regen_delay * (1 + self.proc_dq[0].fire_mode.weapon.statusDuration_m["base"])
                     # before reset, pass the fire_mode from the original proc so the status duration is preserved
-                    heapq.heappush(self.simulation.event_queue, (self.simulation.time + armor_regen_delay, self.simulation.consume_call_index(), EventTrigger(self.armor_regen_event, fire_mode=fire_mode, info_callback=lambda: "Heat proc armor regen")))
+                    self.simulation.event_queue.push(self.simulation.time + armor_regen_delay, ev.EV_ARMOR_REGEN, self, fire_mode)
                     self.count = 0
                     self.clear_proc()
                     self.enemy.unique_proc_count -= 1
@@ -428,7 +715,7 @@ class HeatProcManager:
 
         if self.strip_index < 4:
             armor_strip_delay = self.base_armor_strip_delay * (1 + self.proc_dq[0].fire_mode.weapon.statusDuration_m["base"])
-            heapq.heappush(self.simulation.event_queue, (self.simulation.time + armor_strip_delay, self.simulation.consume_call_index(), EventTrigger(self.armor_strip_event, fire_mode=fire_mode, info_callback=lambda: "Heat proc armor strip")))
+            self.simulation.event_queue.push(self.simulation.time + armor_strip_delay, ev.EV_ARMOR_STRIP, self, fire_mode)
 
     def armor_regen_event(self, fire_mode: FireMode):
         if self.count > 0:
@@ -443,7 +730,10 @@ class HeatProcManager:
         self.enemy.armor.set_value_multiplier("Heat armor strip", strip_value)
         if self.strip_index > 0:
             armor_regen_delay = self.base_armor_regen_delay * (1 + fire_mode.weapon.statusDuration_m["base"])
-            heapq.heappush(self.simulation.event_queue, (self.simulation.time + armor_regen_delay, self.simulation.consume_call_index(), EventTrigger(self.armor_regen_event, fire_mode=fire_mode, info_callback=lambda: "Heat proc armor regen")))
+            self.simulation.event_queue.push(self.simulation.time + armor_regen_delay, ev.EV_ARMOR_REGEN, self, fire_mode)
 
     def get_damage_info(self):
-        return f"Count={self.count}"
+        return COUNT_INFO.format(self.count)
+
+    def get_damage_info_args(self):
+        return COUNT_INFO, self.count, 0
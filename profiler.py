@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+import numpy as np
+import warframe_simulacrum.constants as const
+import warframe_simulacrum.events as ev
+from warframe_simulacrum.procs import DotClock
+
+KIND_NAMES = {ev.EV_TRIGGER: "trigger", ev.EV_PELLET_HIT: "pellet hit", ev.EV_EFFECT_HIT: "effect hit", ev.EV_PROC_TICK: "proc tick",
+              ev.EV_PROC_REMOVE: "proc remove", ev.EV_HEAT_EXPIRY: "heat expiry",
+              ev.EV_ARMOR_STRIP: "armor strip", ev.EV_ARMOR_REGEN: "armor regen"}
+
+
+class EventProfiler():
+    '''
+    Opt-in instrumentation for the event loops of Simulation.run and Simulacrum.fast_run.
+    Counts events and wall time per handler, where a handler is the event kind, target class and proc type, and samples the queue depth.
+    A DoT clock tick is counted once per member of its group, each with an even share of the group's time.
+    The loops only call through the profiler while one is set, so there is no cost when profiling is off.
+    '''
+    def __init__(self, depth_every:int=1) -> None:
+        self.depth_every = depth_every
+        self.event_queue = None
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.seconds = {}
+        self.pop_count = 0
+        self.pop_seconds = 0.
+        self.depth_times = []
+        self.depths = []
+
+    def attach(self, event_queue):
+        self.event_queue = event_queue
+
+    def pop(self):
+        start = time.perf_counter()
+        event_time = self.event_queue.pop()
+        self.pop_seconds += time.perf_counter() - start
+        self.pop_count += 1
+        if self.pop_count % self.depth_every == 0:
+            self.depth_times.append(event_time)
+            self.depths.append(len(self.event_queue))
+        return event_time
+
+    def dispatch(self):
+        event_queue = self.event_queue
+        keys = get_handler_keys(event_queue.kind, event_queue.target, event_queue.arg)
+        start = time.perf_counter()
+        event_queue.dispatch()
+        elapsed = (time.perf_counter() - start) / len(keys)
+        for key in keys:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.seconds[key] = self.seconds.get(key, 0.) + elapsed
+
+    def get_depths(self):
+        '''
+        (event time, queue length after the pop) samples.
+        '''
+        return np.array(self.depth_times), np.array(self.depths, dtype=np.int64)
+
+    def get_summary(self) -> list:
+        '''
+        One row per handler, slowest in total first, plus a row for the queue pops.
+        '''
+        total = sum(self.seconds.values()) + self.pop_seconds
+        rows = []
+        for key, seconds in self.seconds.items():
+            count = self.counts[key]
+            rows.append(dict(handler=get_handler_name(key), count=count, seconds=seconds, mean_us=seconds/count*1e6, share=seconds/total if total > 0 else 0.))
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        if self.pop_count > 0:
+            rows.append(dict(handler="queue pop", count=self.pop_count, seconds=self.pop_seconds, mean_us=self.pop_seconds/self.pop_count*1e6,
+                             share=self.pop_seconds/total if total > 0 else 0.))
+        return rows
+
+    def format_summary(self) -> str:
+        rows = self.get_summary()
+        width = max([len(row['handler']) for row in rows] + [len("handler")])
+        lines = [f"{'handler':<{width}} {'count':>10} {'total ms':>10} {'mean us':>9} {'share':>7}"]
+        for row in rows:
+            lines.append(f"{row['handler']:<{width}} {row['count']:>10,} {row['seconds']*1e3:>10.2f} {row['mean_us']:>9.2f} {row['share']*100:>6.1f}%")
+        if len(self.depths) > 0:
+            lines.append(f"queue depth: mean {np.mean(self.depths):.1f}, max {np.max(self.depths)}")
+        return "\n".join(lines)
+
+    def print_summary(self):
+        print(self.format_summary())
+
+
+def get_handler_keys(kind:int, target, arg) -> list:
+    # a DoT clock event ticks the group of members due at its time, read before the dispatch pops it
+    if isinstance(target, DotClock):
+        group = target.groups.get(arg)
+        if group:
+            return [get_handler_key(kind, member) for member, _ in group]
+    return [get_handler_key(kind, target)]
+
+
+def get_handler_key(kind:int, target):
+    # proc containers report the proc type of their manager
+    proc_id = getattr(target, 'proc_id', None)
+    if proc_id is None and hasattr(target, 'manager'):
+        proc_id = target.manager.proc_id
+    return kind, type(target).__name__, proc_id
+
+
+def get_handler_name(key) -> str:
+    kind, target_name, proc_id = key
+    name = f"{KIND_NAMES.get(kind, kind)} / {target_name}"
+    if proc_id is not None:
+        name += f" / {const.INDEX_PT[proc_id]}"
+    return name
@@ -0,0 +1,12 @@
+cdef class RandomStream:
+    cdef object seed_sequence
+    cdef object generator
+    cdef object block
+    cdef double[::1] buffer
+    cdef Py_ssize_t position
+    cdef Py_ssize_t size
+
+    cdef int refill(self) except -1
+    cpdef double random(self) except? -1
+    cpdef int randint(self, int a, int b) except? -1
+    cpdef int get_tier(self, double chance) except? -1
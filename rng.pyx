@@ -0,0 +1,75 @@
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 4096
+
+cdef class RandomStream:
+    '''
+    Uniform random numbers drawn in blocks from a numpy Generator.
+    Every trial of a simulation can be given its own substream of the root seed so runs are reproducible
+    regardless of the order or the worker they run in.
+    '''
+    def __init__(self, seed=None, int block_size=DEFAULT_BLOCK_SIZE):
+        self.block = np.empty(block_size, dtype=np.float64)
+        self.buffer = self.block
+        self.size = block_size
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        '''
+        Reseeds the stream in place. seed can be None (fresh entropy), an int or a numpy SeedSequence.
+        '''
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.set_generator(self.seed_sequence)
+
+    def set_trial(self, index:int):
+        '''
+        Switches to the substream of trial `index`, independent of every other trial of the same root seed.
+        '''
+        root = self.seed_sequence
+        self.set_generator(np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (index,), pool_size=root.pool_size))
+
+    def spawn(self, int n):
+        '''
+        Returns n independent streams, ex. one per worker process.
+        '''
+        return [RandomStream(seed_sequence, self.size) for seed_sequence in self.seed_sequence.spawn(n)]
+
+    def get_seed_sequence(self):
+        return self.seed_sequence
+
+    def set_generator(self, seed_sequence):
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        # the next draw refills the buffer
+        self.position = self.size
+
+    def get_state(self):
+        '''
+        Position in the current substream, including the numbers already drawn into the buffer.
+        '''
+        return self.seed_sequence, self.generator, self.generator.bit_generator.state, self.block.copy(), self.position
+
+    def set_state(self, state):
+        seed_sequence, generator, bit_generator_state, block, position = state
+        self.seed_sequence = seed_sequence
+        self.generator = generator
+        self.generator.bit_generator.state = bit_generator_state
+        self.block[:] = block
+        self.position = position
+
+    cdef int refill(self) except -1:
+        self.generator.random(out=self.block)
+        self.position = 0
+        return 0
+
+    cpdef double random(self) except? -1:
+        if self.position >= self.size:
+            self.refill()
+        self.position += 1
+        return self.buffer[self.position - 1]
+
+    cpdef int randint(self, int a, int b) except? -1:
+        # inclusive on both ends like random.randint
+        return a + <int>(self.random() * (b - a + 1))
+
+    cpdef int get_tier(self, double chance) except? -1:
+        return <int>chance + (self.random() < chance % 1)
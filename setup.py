@@ -1,10 +1,15 @@
+import os
 from setuptools import setup, Extension
 from Cython.Build import cythonize
 # python setup.py build_ext --inplace
 
-extensions = [Extension("unit", ["unit.pyx"]), Extension("weapon", ["weapon.pyx"])]
+# the extensions cimport each other as warframe_simulacrum.<module>, which resolves from the package's parent folder
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+extensions = [Extension("unit", ["unit.pyx"]), Extension("weapon", ["weapon.pyx"]), Extension("events", ["events.pyx"]), Extension("rng", ["rng.pyx"]), Extension("trace", ["trace.pyx"])]
 setup(
     ext_modules=cythonize(
         extensions,  
+        include_path=[PACKAGE_PARENT],
         ),                 
-)
\ No newline at end of file
+)
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+from warframe_simulacrum.weapon import FireMode
+from warframe_simulacrum.events import EventQueue, EV_TRIGGER
+from warframe_simulacrum.rng import RandomStream
+from warframe_simulacrum.trace import TraceRecorder, format_info
+from warframe_simulacrum.unit import Unit
+from warframe_simulacrum.liveplot import LivePlot, PointIndex
+from warframe_simulacrum.adaptive import run_adaptive
+from warframe_simulacrum.killstats import TrialStats
+from typing import List
+import pandas as pd
+import numpy as np
+import queue
+import threading
+from matplotlib.offsetbox import (AnchoredOffsetbox, DrawingArea, HPacker,
+                                  TextArea)
+
+
+class Simulacrum:
+    def __init__(self, figure, ax1, ax2, seed=None) -> None:
+        self.event_queue = EventQueue()
+        self.rng = RandomStream(seed)
+        self.time = 0
+        self.event_index = 0
+        self.plot_text = None
+        self.anchored_box = None
+        self.fig = figure
+        self.ax = ax1
+        self.ax2 = ax2
+        self.static = True
+        self.df:pd.DataFrame = pd.DataFrame([])
+        # per run frames of plot_continuous, concatenated into df only when it is needed
+        self.df_parts = []
+        self.point_index = None
+        self.profiler = None
+        cid1 = self.fig.canvas.mpl_connect('button_press_event', lambda event: self.onclick(event, self.get_frame()))
+        self.sim_index = 0
+        self.stats = TrialStats()
+
+    def reset(self):
+        self.time = 0
+        self.event_queue.clear()
+
+    def set_profiler(self, profiler):
+        '''
+        Routes the fast_run event loop through profiler (a profiler.EventProfiler), None turns profiling off.
+        '''
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self.event_queue)
+
+    def seed(self, seed=None):
+        self.rng.seed(seed)
+
+    def run_simulation(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None):
+        self.reset()
+        self.rng.set_trial(self.sim_index)
+        fire_mode.reset()
+        for enemy in enemies:
+            enemy.reset()
+        
+        data = TraceRecorder()
+        data.record(self.time - 1e-6, -1, self.sim_index, enemies[0])
+        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded
+        self.event_queue.push(event_time, EV_TRIGGER, fire_mode, enemies[0])
+        for enemy in enemies:
+            if primer and len(primer.forcedProc)>0:
+                enemy.pellet_hit(primer, fire_mode.target_bodypart)
+
+            prev_time = 0
+            prev_time_adj = 0
+            while enemy.overguard.current_value > 0 or enemy.health.current_value > 0:
+                self.time = self.event_queue.pop()
+                
+                self.event_queue.dispatch()
+
+                if data.changed(enemy):
+                    adj_time = self.time
+                    # if current time is equal to previous time, we should adjust it for it to display properly
+                    if self.time == prev_time:
+                        # adjust current time by the accumulated offset plus another small offset
+                        adj_time = self.time + abs(prev_time_adj - prev_time) + 1e-6
+                    # current time is new previous time
+                    prev_time = self.time
+                    # save
+                    prev_time_adj = adj_time
+
+                    data.record(adj_time, self.event_index, self.sim_index, enemy, self.event_queue)
+                
+                self.event_index += 1
+                
+                if self.time > 20 :
+                    break
+        self.stats.add(self.time if self.time < 20 else None)
+        return data
+    
+    def run_single_simulation(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None):
+        self.stats = TrialStats()
+        self.df = pd.DataFrame([])
+        self.df_parts = []
+        data = self.run_simulation(enemies, fire_mode, primer)
+        self.plot_simulation(data, enemies[0])
+
+    def run_multi_simulation(self, plot_window, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None, runs=10):
+        from PySide6.QtWidgets import QApplication
+        self.stats = TrialStats()
+
+        self.df = pd.DataFrame([])
+        self.df_parts = []
+
+        self.ax.cla()
+        box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
+        self.anchored_box = AnchoredOffsetbox(loc='lower right',
+                                child=box1, pad=0.4,
+                                frameon=True,
+                                bbox_to_anchor=(1., 1.02),
+                                bbox_transform=self.ax.transAxes,
+                                borderpad=0.,)
+        self.ax.add_artist(self.anchored_box) 
+
+        for run in range(runs):
+            data = self.run_simulation(enemies, fire_mode, primer)
+            self.plot_continuous(data, enemies[0])
+            plot_window.canvas.draw()
+            self.fig.canvas.draw()
+            plot_window.show()
+            QApplication.processEvents()
+            self.sim_index += 1
+        self.ax.legend(self.get_frame()['variable'].unique(), loc='center left', bbox_to_anchor=(1, 0.5))
+        # self.ax.legend([key for key,value in enemies[0].get_stats().items() if value > 0 ], loc='center left', bbox_to_anchor=(1, 0.5))
+        # self.ax.legend(handles=[self.artist], loc='center left', bbox_to_anchor=(1, 0.5))
+        # self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+            
+        # handles, labels = self.ax.get_legend_handles_labels()
+        # unique_labels = list(set(labels))
+        # self.ax.legend(handles, unique_labels, loc='center left', bbox_to_anchor=(1, 0.5))
+
+        # self.ax.set_ylim(bottom=0)
+        # self.fig.tight_layout()
+    
+    def start_live_plot(self, enemy:Unit, fps:float):
+        self.stats = TrialStats()
+        self.df = pd.DataFrame([])
+        self.df_parts = []
+        self.ax.cla()
+        self.ax2.cla()
+        stats = enemy.get_stats()
+        names = [key for key,value in stats.items() if value > 0 ]
+        return LivePlot(self.ax, self.ax2, names, fps=fps)
+
+    def add_live_run(self, live:LivePlot, data:TraceRecorder, enemy:Unit, kill_time):
+        live.add_run(data, kill_time)
+        self.df_parts.append((data, enemy))
+
+    def run_multi_simulation_live(self, plot_window, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None, runs=10, fps=20):
+        '''
+        Like run_multi_simulation, but the runs execute on a worker thread while the UI thread appends them to the plot, redrawing at most fps times per second.
+        '''
+        from PySide6.QtWidgets import QApplication
+        live = self.start_live_plot(enemies[0], fps)
+        results = queue.Queue()
+
+        def work():
+            try:
+                for run in range(runs):
+                    data = self.run_simulation(enemies, fire_mode, primer)
+                    results.put((data, self.time if self.time < 20 else None))
+                    self.sim_index += 1
+            finally:
+                results.put(None)
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        plot_window.show()
+        done = False
+        while not done:
+            try:
+                item = results.get(timeout=live.min_interval or 0.05)
+                while item is not None:
+                    data, kill_time = item
+                    self.add_live_run(live, data, enemies[0], kill_time)
+                    item = results.get_nowait()
+                done = True
+            except queue.Empty:
+                pass
+            if live.refresh(force=done):
+                self.fig.canvas.draw_idle()
+            QApplication.processEvents()
+        worker.join()
+        self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+        self.fig.canvas.draw_idle()
+
+    def run_multi_simulation_headless(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None, runs=10, path:str=None):
+        '''
+        Runs and plots without a GUI, for use with liveplot.create_headless_figure. The figure is drawn once at the end and saved to path if given.
+        '''
+        live = self.start_live_plot(enemies[0], 0)
+        for run in range(runs):
+            data = self.run_simulation(enemies, fire_mode, primer)
+            self.add_live_run(live, data, enemies[0], self.time if self.time < 20 else None)
+            self.sim_index += 1
+        live.refresh(force=True)
+        self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+        self.fig.tight_layout()
+        if path is not None:
+            self.fig.savefig(path)
+        return live
+
+    def plot_simulation(self, data:TraceRecorder, enemy, clear=True):
+        import seaborn as sns
+        self.static = True
+        self.ax.cla()
+        self.ax2.cla()
+            
+        df = data.to_dataframe(info=False)
+        df_melt = pd.melt(df, id_vars=["time", "event_index", "name", "info_code", "info_a", "info_b", "sim_index"], var_name="variable", value_name="value")
+        df_melt = df_melt.drop_duplicates(subset=["variable", "value"])
+
+        stats = enemy.get_stats()
+        names = [key for key,value in stats.items() if value > 0 ]
+        self.df = df_melt[(df_melt["variable"].isin(names))].copy()
+
+        # plot the data using seaborn
+        sns.lineplot(data=self.df, x="time", y="value", hue="variable", marker="x", estimator=None, errorbar=None, markeredgecolor='black', drawstyle='steps-post', ax=self.ax)
+
+        self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+
+        box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
+        self.anchored_box = AnchoredOffsetbox(loc='lower right',
+                                child=box1, pad=0.4,
+                                frameon=True,
+                                bbox_to_anchor=(1., 1.02),
+                                bbox_transform=self.ax.transAxes,
+                                borderpad=0.,)
+        self.ax.add_artist(self.anchored_box) 
+
+        self.plot_kill_time_histogram()
+
+        self.fig.tight_layout()
+    
+    def plot_continuous(self, data:TraceRecorder, enemy):
+        import seaborn as sns
+        # cleared = False
+        # if self.static:
+        #     self.static = False
+        #     cleared = True
+        #     self.ax.cla()
+
+        #     box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
+        #     self.anchored_box = AnchoredOffsetbox(loc='lower right',
+        #                             child=box1, pad=0.4,
+        #                             frameon=True,
+        #                             bbox_to_anchor=(1., 1.02),
+        #                             bbox_transform=self.ax.transAxes,
+        #                             borderpad=0.,)
+        #     self.ax.add_artist(self.anchored_box) 
+            
+        # df = pd.DataFrame(data)
+        # print(df)
+        # df_melt = pd.melt(df, id_vars=["time", "event_index", "name"], var_name="variable", value_name="value")
+        # print(df_melt)
+        # input()
+        # df_melt = df_melt.drop_duplicates(subset=["variable", "value"])
+        # sns.set_theme()
+        df = melt_trace(data, enemy)
+        # self.df = df.copy()
+        self.df_parts.append(df)
+
+        # plot the data using seaborn
+        palette ={"overguard": "dimgray", "health": "red", "shield": "royalblue", "armor": "gold"}
+        sns.lineplot(data=df, x="time", y="value", hue="variable", alpha=0.5, estimator=None, errorbar=None, marker='.', markeredgecolor='black', drawstyle='steps-post', ax=self.ax, legend=False, palette=palette)
+        self.ax2.cla()
+        self.plot_kill_time_histogram()
+
+        self.fig.tight_layout()
+        
+        
+    def get_frame(self):
+        if len(self.df_parts) > 0:
+            # live runs are kept as (trace, enemy) and only melted here
+            parts = [part if isinstance(part, pd.DataFrame) else melt_trace(*part) for part in self.df_parts]
+            self.df = pd.concat([self.df] + parts if len(self.df) > 0 else parts)
+            self.df_parts = []
+        return self.df
+
+    def get_point_index(self, df:pd.DataFrame):
+        # rebuilt only when a new frame is plotted
+        if self.point_index is None or self.point_index.source is not df:
+            self.point_index = PointIndex(df)
+        return self.point_index
+
+    def onclick(self, event, df:pd.DataFrame):
+        # display_str = ''
+        if self.plot_text is not None:
+            self.plot_text.remove()
+            self.plot_text = None
+
+        if self.anchored_box is not None:
+            self.anchored_box.remove()
+            self.anchored_box = None
+        
+        if event.xdata is None or event.ydata is None or event.button == 3:
+            box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
+            self.anchored_box = AnchoredOffsetbox(loc='lower left',
+                                    child=box1, pad=0.4,
+                                    frameon=True,
+                                    bbox_to_anchor=(0., 1.02),
+                                    bbox_transform=self.ax.transAxes,
+                                    borderpad=0.,)
+            self.ax.add_artist(self.anchored_box) 
+            self.fig.canvas.draw()
+            return
+
+        x, y = (event.xdata, event.ydata)
+
+        row = self.get_point_index(df).query(x, y)
+        if row is None:
+            return
+        t = row['time']
+        vb = row['variable']
+        v = row['value']
+        name = row['name']
+        # info strings are only resolved for the clicked point
+        info = format_info(row['info_code'], row['info_a'], row['info_b'])
+
+        if np.isnan(row['prev_value']):
+            delta = 0
+            tdelta = 1
+        else:
+            delta = row['prev_value'] - v
+            tdelta = t - row['prev_time']
+
+        txt = f"t={t:.1}s, {vb}={v:.1}\ndelta={(delta):.2f}\n{name}"
+        left,right = self.ax.get_xlim()
+        bot, top = self.ax.get_ylim()
+        vspan = abs(top-bot)
+        span = right-left
+        if t > left+span/2:
+            text_xoffset = (t-left)*(-0.1)
+            text_yoffset = -delta/2
+            ha = 'right'
+            va='top'
+        else:
+            text_xoffset = (right-t)*(0.1)
+            text_yoffset = delta/2
+            ha = 'left'
+            va='bottom'
+
+        if v > bot+vspan/2:
+            text_yoffset = (v-bot)*(-0.25)
+        else:
+            text_yoffset = (top-v)*(0.25)
+            
+        self.plot_text = self.ax.annotate("",
+                            xy=(t,v), xycoords='data',
+                            xytext=(t+text_xoffset, v+text_yoffset), textcoords='data',
+                            arrowprops=dict(arrowstyle="simple", connectionstyle="arc3,rad=-0.2"),
+                            ha=ha, va=va)
+        
+        bbox_text = f"Time: {t:.1f}s, {vb.capitalize()}: {v:.1f}\nDamage: {(delta):.2f}\nInfo: {name} {info}"
+        box1 = TextArea(bbox_text, textprops=dict(color="k"))
+        self.anchored_box = AnchoredOffsetbox(loc='lower left',
+                                 child=box1, pad=0.4,
+                                 frameon=True,
+                                 bbox_to_anchor=(0., 1.02),
+                                 bbox_transform=self.ax.transAxes,
+                                 borderpad=0.,)
+        self.ax.add_artist(self.anchored_box) 
+        
+        self.fig.canvas.draw()
+
+    def offclick(self, event):
+        self.fig.canvas.draw()
+
+    def fast_run(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode):
+        self.reset()
+        fire_mode.reset()
+        for enemy in enemies:
+            enemy.reset()
+        
+
+        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded
+        self.event_queue.push(event_time, EV_TRIGGER, fire_mode, enemies[0])
+
+        profiler = self.profiler
+        pop = self.event_queue.pop if profiler is None else profiler.pop
+        dispatch = self.event_queue.dispatch if profiler is None else profiler.dispatch
+        for enemy in enemies:
+            if primer and len(primer.forcedProc)>0:
+                enemy.pellet_hit(primer, fire_mode.target_bodypart)
+
+            while enemy.overguard.current_value > 0 or enemy.health.current_value > 0:
+                self.time = pop()
+                dispatch()
+                
+                if self.time > 20 :
+                    break
+        self.stats.add(self.time if self.time < 20 else None)
+    
+    def run_reapeated(self, enemy:Unit, fire_mode:FireMode, primer:FireMode, count=20):
+        self.stats = TrialStats()
+        for _ in range(count):
+            self.reset()
+            enemy.reset()
+            fire_mode.reset()
+
+            self.fast_run([enemy], fire_mode, primer)
+
+    def run_adaptive(self, enemy:Unit, fire_mode:FireMode, primer:FireMode=None, **kwargs) -> dict:
+        '''
+        Like run_reapeated, but adds trials until the kill time statistic is precise enough, see adaptive.run_adaptive for kwargs.
+        Returns the achieved precision.
+        '''
+        def run_trials(start, count):
+            kill_times = np.full(count, np.inf)
+            for i in range(count):
+                censored = self.stats.censored
+                self.rng.set_trial(start + i)
+                self.fast_run([enemy], fire_mode, primer)
+                if self.stats.censored == censored:
+                    kill_times[i] = self.time
+            return kill_times
+
+        self.stats = TrialStats()
+        return run_adaptive(run_trials, **kwargs)
+
+    def plot_hist(self):
+        self.ax2.cla()
+        self.plot_kill_time_histogram()
+        self.fig.tight_layout()
+
+    def plot_kill_time_histogram(self):
+        # drawn from the fixed bins of the running stats instead of rebinning every kill time on each refresh
+        histogram = self.stats.kill_time_histogram
+        width = np.diff(histogram.edges)
+        self.ax2.bar(histogram.edges[:-1], histogram.counts, width=width, align='edge')
+        if self.stats.kill_time.count > 0:
+            self.ax2.set_xlim(self.stats.kill_time.min - width[0], self.stats.kill_time.max + width[0])
+        self.ax2.set_xlabel('kill_times')
+        self.ax2.set_ylabel('Count')
+
+
+def melt_trace(data:TraceRecorder, enemy:Unit):
+    '''
+    Long format frame of one run with only the points where a stat changed, as plotted by plot_continuous and searched by onclick.
+    '''
+    df = data.to_dataframe(info=False, copy=False)
+    # unchanged points are masked into new columns, the frame's own columns are views of the recorder
+    for name in ('overguard', 'health', 'shield', 'armor'):
+        values = df[name].to_numpy()
+        df[f'{name}_diff'] = np.diff(values, prepend=np.nan)
+        df[name] = np.where(df[f'{name}_diff'] == 0, np.nan, values)
+
+    df_melt = pd.melt(df, id_vars=["time", "event_index", "name", "info_code", "info_a", "info_b", "sim_index"], var_name="variable", value_name="value").dropna()
+
+    stats = enemy.get_stats()
+    names = [key for key,value in stats.items() if value > 0 ]
+    df = df_melt[(df_melt["variable"].isin(names))].copy()
+    return df
+
+
+def run_once(simulation:Simulacrum, enemy:Unit, fire_mode:FireMode):
+    simulation.run_simulation([enemy], fire_mode)
@@ -1,21 +1,26 @@
-from warframe_simulacrum.weapon import Weapon, FireMode, FireModeEffect, EventTrigger
+from __future__ import annotations
+
+from warframe_simulacrum.weapon import Weapon, FireMode, FireModeEffect
+from warframe_simulacrum.events import EventQueue, EV_TRIGGER
+from warframe_simulacrum.rng import RandomStream
+from warframe_simulacrum.trace import TraceRecorder
 from warframe_simulacrum.unit import Unit, Protection
+from warframe_simulacrum.killstats import TrialStats
 from typing import List, Tuple
-from queue import PriorityQueue
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pandas as pd
-import time
-import heapq
 import numpy as np
-from scipy.optimize import curve_fit
 import os
 import warframe_simulacrum.constants
 import warframe_simulacrum.procs
-from matplotlib.offsetbox import (AnchoredOffsetbox, DrawingArea, HPacker,
-                                  TextArea)
-from matplotlib import colors
-from PySide6.QtWidgets import QApplication
+
+# the plotting layer lives in simulacrum.py and is only imported when one of these is first used
+PLOTTING_NAMES = ("Simulacrum", "melt_trace", "run_once")
+
+
+def __getattr__(name):
+    if name in PLOTTING_NAMES:
+        import warframe_simulacrum.simulacrum as simulacrum
+        return getattr(simulacrum, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Simulacrums():
     def __init__(self) -> None:
@@ -24,36 +29,81 @@ class Simulacrums():
 
 
 
+class SimulationSnapshot():
+    '''
+    Mid-fight state of a simulation and the enemy and fire mode it runs, taken by Simulation.snapshot.
+    '''
+    def __init__(self, simulation:Simulation, enemy:Unit, fire_mode:FireMode) -> None:
+        self.enemy = enemy
+        self.fire_mode = fire_mode
+        self.time = simulation.time
+        self.event_index = simulation.event_index
+        self.prev_time = simulation.prev_time
+        self.prev_time_adj = simulation.prev_time_adj
+        self.events = simulation.event_queue.get_state()
+        self.rng = simulation.rng.get_state()
+        self.enemy_state = enemy.snapshot()
+        self.fire_mode_state = fire_mode.get_state()
+        self.start_pool = simulation.start_pool
+
+
 class Simulation():
-    def __init__(self) -> None:
-        self.event_queue:"heapq[Tuple[int, int, EventTrigger]]" = []
+    def __init__(self, seed=None) -> None:
+        self.event_queue = EventQueue()
+        self.rng = RandomStream(seed)
         self.time = 0
-        self.call_index = 0
         self.event_index = 0
-        self.records = []
+        self.trace = TraceRecorder()
+        self.sink = None
+        self.profiler = None
         self.kill_times = []
+        # stats holds the kill time summary in constant memory, the kill time list is opt-in since it grows with every trial
+        self.keep_kill_times = False
+        self.stats = TrialStats()
+        self.start_pool = 0
 
         self.prev_time = 0
         self.prev_time_adj = 0
     
     def reset(self):
-        self.event_queue = []
+        self.event_queue.clear()
         self.time = 0
-        self.call_index = 0
         self.event_index = 0
 
         self.prev_time = 0
         self.prev_time_adj = 0
 
     def clear_records(self):
-        self.records = []
+        self.trace.clear()
         self.kill_times = []
+        self.stats = TrialStats()
+
+    @property
+    def records(self):
+        return self.trace.to_records()
+
+    def set_sink(self, sink):
+        '''
+        Streams the recorded runs to sink (a tracestore.TraceSink) instead of keeping them all in memory.
+        '''
+        self.sink = sink
+
+    def set_profiler(self, profiler):
+        '''
+        Routes the event loop through profiler (a profiler.EventProfiler), None turns profiling off.
+        '''
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self.event_queue)
+
+    def close_sink(self):
+        if self.sink is not None:
+            self.sink.close(self.trace)
+
+    def seed(self, seed=None):
+        # reseeds in place, units and weapons hold a reference to the stream
+        self.rng.seed(seed)
 
-    def consume_call_index(self):
-        idx = self.call_index
-        self.call_index += 1
-        return idx
-    
     def adjust_event_time(self):
         adj_time = self.time
         # if current time is equal to previous time, we should adjust it so that it displays properly
@@ -66,407 +116,91 @@ class Simulation():
         self.prev_time_adj = adj_time
         return adj_time
     
-    def run(self, enemy, fire_mode, primer, sim_index, keep_records=True):
+    def snapshot(self, enemy:Unit, fire_mode:FireMode) -> SimulationSnapshot:
+        '''
+        Captures the current state of a fight, including pending events and the random stream, so runs can branch from it.
+        '''
+        return SimulationSnapshot(self, enemy, fire_mode)
+
+    def restore(self, snapshot:SimulationSnapshot):
+        # the enemy and fire mode are restored in place, pending events refer to their objects
+        self.time = snapshot.time
+        self.event_index = snapshot.event_index
+        self.prev_time = snapshot.prev_time
+        self.prev_time_adj = snapshot.prev_time_adj
+        self.event_queue.set_state(snapshot.events)
+        self.rng.set_state(snapshot.rng)
+        self.start_pool = snapshot.start_pool
+        snapshot.enemy.restore(snapshot.enemy_state)
+        snapshot.fire_mode.set_state(snapshot.fire_mode_state)
+
+    def prepare(self, enemy, fire_mode, primer, sim_index, keep_records=False):
+        '''
+        Resets everything for trial sim_index and schedules the first trigger, the state a run starts from.
+        '''
         self.reset()
+        self.rng.set_trial(sim_index)
         fire_mode.reset()
         enemy.reset()
+        self.start_pool = get_pool(enemy)
         
         # initial state
         if keep_records:
-            stats = enemy.get_current_stats()
-            stats.update(dict(time=0, name='', info='', event_index=-1, sim_index=sim_index))
-            self.records.append(stats)
+            self.trace.record(0, -1, sim_index, enemy)
         # set up first event
         event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded + 1e-6
-        heapq.heappush(self.event_queue, (event_time, self.consume_call_index(), EventTrigger(fire_mode.pull_trigger, event_time, enemy=enemy)))
+        self.event_queue.push(event_time, EV_TRIGGER, fire_mode, enemy)
 
         if primer and len(primer.forcedProc)>0:
             enemy.pellet_hit(primer, fire_mode.target_bodypart)
 
+    def run(self, enemy, fire_mode, primer, sim_index, keep_records=True, start:SimulationSnapshot=None):
+        '''
+        Runs trial sim_index until the enemy dies or 20s pass. With start, the trial branches from that snapshot instead of
+        a fresh fight, drawing its own random numbers for sim_index, and primer is not applied. Damage dealt before the
+        snapshot still counts towards the trial's damage.
+        '''
+        trace = self.trace
+        if start is None:
+            self.prepare(enemy, fire_mode, primer, sim_index, keep_records)
+        else:
+            if start.enemy is not enemy or start.fire_mode is not fire_mode:
+                raise ValueError("Snapshot was taken with a different enemy or fire mode")
+            self.restore(start)
+            self.rng.set_trial(sim_index)
+            if keep_records:
+                trace.record(self.time, -1, sim_index, enemy)
+
+        # the profiler wraps pop and dispatch only when set
+        profiler = self.profiler
+        pop = self.event_queue.pop if profiler is None else profiler.pop
+        dispatch = self.event_queue.dispatch if profiler is None else profiler.dispatch
         while enemy.overguard.current_value > 0 or enemy.health.current_value > 0:
-            self.time, call_index, event = heapq.heappop(self.event_queue)
-            event.func(**event.kwargs)
-
-            if keep_records and stats_changed(self.records[-1], enemy):
-                stats = enemy.get_current_stats()
-                stats.update(dict(time=self.adjust_event_time(), name=event.name, info='', event_index=self.event_index, sim_index=sim_index))
-                if event.info_callback is not None:
-                    stats["info"] = f"{event.info_callback()}"
+            self.time = pop()
+            dispatch()
 
-                self.records.append(stats)
+            if keep_records and trace.changed(enemy):
+                trace.record(self.adjust_event_time(), self.event_index, sim_index, enemy, self.event_queue)
             
             self.event_index += 1
             
             if self.time > 20 :
-                return
-        self.kill_times.append(self.time)
-
-class Simulacrum:
-    def __init__(self, figure, ax1, ax2) -> None:
-        self.event_queue:"heapq[Tuple[int, int, EventTrigger]]" = []
-        self.time = 0
-        self.call_index = 0
-        self.event_index = 0
-        self.plot_text = None
-        self.anchored_box = None
-        self.fig = figure
-        self.ax = ax1
-        self.ax2 = ax2
-        self.static = True
-        self.df:pd.DataFrame = pd.DataFrame([])
-        cid1 = self.fig.canvas.mpl_connect('button_press_event', lambda event: self.onclick(event, self.df))
-        self.sim_index = 0
-        self.kill_times = []
-
-    def reset(self):
-        self.time = 0
-        self.call_index = 0
-        self.event_queue = []
-
-    def consume_call_index(self):
-        idx = self.call_index
-        self.call_index += 1
-        return idx
-        
-    def run_simulation(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None):
-        self.reset()
-        fire_mode.reset()
-        for enemy in enemies:
-            enemy.reset()
-        
-        stats = enemies[0].get_current_stats()
-
-        stats['time'] = stats['time'] - 1e-6
-        stats['name'] = ""
-        stats['info'] = ""
-        stats['event_index'] = -1
-        data = [stats]
-        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded
-        heapq.heappush(self.event_queue, (event_time, self.consume_call_index(), EventTrigger(fire_mode.pull_trigger, event_time, enemy=enemies[0])))
-        for enemy in enemies:
-            if primer and len(primer.forcedProc)>0:
-                enemy.pellet_hit(primer, fire_mode.target_bodypart)
-
-            prev_time = 0
-            prev_time_adj = 0
-            while enemy.overguard.current_value > 0 or enemy.health.current_value > 0:
-                self.time, call_index, event = heapq.heappop(self.event_queue)
-                
-                event.func(**event.kwargs)
-
-                if stats_changed(data[-1], enemy):
-                    sts = enemy.get_current_stats()
-                    sts['event_index'] = self.event_index
-                    sts["name"] = event.name
-                    sts["sim_index"] = self.sim_index
-
-                    # reset
-                    adj_time = sts["time"]
-                    # if current time is equal to previous time, we should adjust it for it to display properly
-                    if sts["time"] == prev_time:
-                        # adjust current time by the accumulated offset plus another small offset
-                        adj_time = sts["time"] + abs(prev_time_adj - prev_time) + 1e-6
-                    # current time is new previous time
-                    prev_time = sts["time"]
-
-                    # set this point to new time value
-                    sts["time"] = adj_time
-                    # save
-                    prev_time_adj = adj_time
-
-                    if event.info_callback is not None:
-                        sts["info"] = f"{event.info_callback()}"
-                    data.append(sts)
-                
-                self.event_index += 1
-                
-                if self.time > 20 :
-                    break
-        if self.time < 20:
+                break
+        killed = self.time <= 20
+        if killed and self.keep_kill_times:
             self.kill_times.append(self.time)
-        return data
-    
-    def run_single_simulation(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None):
-        self.kill_times = []
-        self.df = pd.DataFrame([])
-        data = self.run_simulation(enemies, fire_mode, primer)
-        self.plot_simulation(data, enemies[0])
-
-    def run_multi_simulation(self, plot_window, enemies:List[Unit], fire_mode:FireMode, primer:FireMode=None, runs=10):
-        self.kill_times = []
-
-        self.df = pd.DataFrame([])
-
-        self.ax.cla()
-        box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
-        self.anchored_box = AnchoredOffsetbox(loc='lower right',
-                                child=box1, pad=0.4,
-                                frameon=True,
-                                bbox_to_anchor=(1., 1.02),
-                                bbox_transform=self.ax.transAxes,
-                                borderpad=0.,)
-        self.ax.add_artist(self.anchored_box) 
-
-        for run in range(runs):
-            data = self.run_simulation(enemies, fire_mode, primer)
-            self.plot_continuous(data, enemies[0])
-            plot_window.canvas.draw()
-            self.fig.canvas.draw()
-            plot_window.show()
-            QApplication.processEvents()
-            self.sim_index += 1
-        self.ax.legend(self.df['variable'].unique(), loc='center left', bbox_to_anchor=(1, 0.5))
-        # self.ax.legend([key for key,value in enemies[0].get_stats().items() if value > 0 ], loc='center left', bbox_to_anchor=(1, 0.5))
-        # self.ax.legend(handles=[self.artist], loc='center left', bbox_to_anchor=(1, 0.5))
-        # self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-            
-        # handles, labels = self.ax.get_legend_handles_labels()
-        # unique_labels = list(set(labels))
-        # self.ax.legend(handles, unique_labels, loc='center left', bbox_to_anchor=(1, 0.5))
-
-        # self.ax.set_ylim(bottom=0)
-        # self.fig.tight_layout()
-    
-    def plot_simulation(self, data, enemy, clear=True):
-        self.static = True
-        self.ax.cla()
-        self.ax2.cla()
-            
-        df = pd.DataFrame(data)
-        df_melt = pd.melt(df, id_vars=["time", "event_index", "name"], var_name="variable", value_name="value")
-        df_melt = df_melt.drop_duplicates(subset=["variable", "value"])
-
-        stats = enemy.get_stats()
-        names = [key for key,value in stats.items() if value > 0 ]
-        self.df = df_melt[(df_melt["variable"].isin(names))].copy()
-
-        # plot the data using seaborn
-        sns.lineplot(data=self.df, x="time", y="value", hue="variable", marker="x", estimator=None, errorbar=None, markeredgecolor='black', drawstyle='steps-post', ax=self.ax)
-
-        self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-
-        box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
-        self.anchored_box = AnchoredOffsetbox(loc='lower right',
-                                child=box1, pad=0.4,
-                                frameon=True,
-                                bbox_to_anchor=(1., 1.02),
-                                bbox_transform=self.ax.transAxes,
-                                borderpad=0.,)
-        self.ax.add_artist(self.anchored_box) 
-
-        sns.histplot(data=dict(kill_times=self.kill_times), x='kill_times', ax=self.ax2)
-
-        self.fig.tight_layout()
-    
-    def plot_continuous(self, data, enemy):
-        # cleared = False
-        # if self.static:
-        #     self.static = False
-        #     cleared = True
-        #     self.ax.cla()
-
-        #     box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
-        #     self.anchored_box = AnchoredOffsetbox(loc='lower right',
-        #                             child=box1, pad=0.4,
-        #                             frameon=True,
-        #                             bbox_to_anchor=(1., 1.02),
-        #                             bbox_transform=self.ax.transAxes,
-        #                             borderpad=0.,)
-        #     self.ax.add_artist(self.anchored_box) 
-            
-        # df = pd.DataFrame(data)
-        # print(df)
-        # df_melt = pd.melt(df, id_vars=["time", "event_index", "name"], var_name="variable", value_name="value")
-        # print(df_melt)
-        # input()
-        # df_melt = df_melt.drop_duplicates(subset=["variable", "value"])
-        # sns.set_theme()
-        df = pd.DataFrame(data)
-        df['overguard_diff'] = df['overguard'].diff()
-        df['health_diff'] = df['health'].diff()
-        df['shield_diff'] = df['shield'].diff()
-        df['armor_diff'] = df['armor'].diff()
-
-        df.loc[df['overguard_diff']==0, 'overguard'] = np.nan
-        df.loc[df['health_diff']==0, 'health'] = np.nan
-        df.loc[df['shield_diff']==0, 'shield'] = np.nan
-        df.loc[df['armor_diff']==0, 'armor'] = np.nan
-        # print(df)
-        # sns.lineplot(data=df, x="time", y=['overguard', 'health', 'shield', 'armor'], alpha=0.5, estimator=None, errorbar=None, marker='.', markeredgecolor='black', drawstyle='steps-post', ax=self.ax, legend=False)
-        # df.plot.line(x="time", y=['overguard', 'health', 'shield', 'armor'], color={"overguard": "darkgray", "health": "red", "shield": "royalblue", "armor": "gold"}, alpha=0.5, marker='.', markeredgecolor='black', drawstyle='steps-post', ax=self.ax, legend=False)
-        # if self.legend:
-        #     self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-        
-        df_melt = pd.melt(df, id_vars=["time", "event_index", "name", "info", "sim_index"], var_name="variable", value_name="value").dropna()
-        # df_melt = df_melt.drop_duplicates(subset=["variable", "value"])
-
-        stats = enemy.get_stats()
-        names = [key for key,value in stats.items() if value > 0 ]
-        df = df_melt[(df_melt["variable"].isin(names))].copy()
-        # self.df = df.copy()
-        self.df = pd.concat([self.df, df.copy()])
-
-        # plot the data using seaborn
-        palette ={"overguard": "dimgray", "health": "red", "shield": "royalblue", "armor": "gold"}
-        sns.lineplot(data=df, x="time", y="value", hue="variable", alpha=0.5, estimator=None, errorbar=None, marker='.', markeredgecolor='black', drawstyle='steps-post', ax=self.ax, legend=False, palette=palette)
-        self.ax2.cla()
-        sns.histplot(data=dict(kill_times=self.kill_times), x='kill_times', ax=self.ax2)
-
-        self.fig.tight_layout()
-        
-        
-    def onclick(self, event, df:pd.DataFrame):
-        # display_str = ''
-        if self.plot_text is not None:
-            self.plot_text.remove()
-            self.plot_text = None
-
-        if self.anchored_box is not None:
-            self.anchored_box.remove()
-            self.anchored_box = None
-        
-        if event.xdata is None or event.ydata is None or event.button == 3:
-            box1 = TextArea("\nClick on point to see more info.\n", textprops=dict(color="k"))
-            self.anchored_box = AnchoredOffsetbox(loc='lower left',
-                                    child=box1, pad=0.4,
-                                    frameon=True,
-                                    bbox_to_anchor=(0., 1.02),
-                                    bbox_transform=self.ax.transAxes,
-                                    borderpad=0.,)
-            self.ax.add_artist(self.anchored_box) 
-            self.fig.canvas.draw()
-            return
-
-        x, y = (event.xdata, event.ydata)
-
-        ### new
-        t_min = df["time"].min()
-        t_div = df["time"].max() - t_min
-        df["time_norm"] = (df["time"] - t_min)/t_div
-        v_min = df["value"].min()
-        v_div = df["value"].max() - v_min
-        df["value_norm"] = (df["value"] - v_min)/v_div
-
-        df["time_"] = abs(df["time_norm"] - (x-t_min)/t_div)
-        df["value_"] = abs(df["value_norm"] - (y-v_min)/v_div)
-        df["dist_"] = np.sqrt(df["time_"]**2 + df["value_"]**2)
-        df1 = df[(df['dist_'] == df['dist_'].min())]
-        if len(df1.index)==0:
-            return
-        t = df1['time'].iloc[0]
-        vb = df1['variable'].iloc[0]
-        v = df1['value'].iloc[0]
-        ci = df1['event_index'].iloc[0]
-        name = df1['name'].iloc[0]
-        info = df1['info'].iloc[0]
-        sim_index = df1['sim_index'].iloc[0]
-        
-        df2 = df[(df["time"] <= t) & (df["variable"] == vb) & (df["event_index"] < ci) & (df["sim_index"] == sim_index)]
-        
-        if len(df2.index) == 0 :
-            delta = 0
-            tdelta = 1
-        else:
-            df2 = df2[(df2["time"] == df2["time"].max()) ]
-            s2 = df2.iloc[-1]
-            delta = s2['value'] - v
-            tdelta = t - s2['time']
-
-        txt = f"t={t:.1}s, {vb}={v:.1}\ndelta={(delta):.2f}\n{name}"
-        left,right = self.ax.get_xlim()
-        bot, top = self.ax.get_ylim()
-        vspan = abs(top-bot)
-        span = right-left
-        if t > left+span/2:
-            text_xoffset = (t-left)*(-0.1)
-            text_yoffset = -delta/2
-            ha = 'right'
-            va='top'
-        else:
-            text_xoffset = (right-t)*(0.1)
-            text_yoffset = delta/2
-            ha = 'left'
-            va='bottom'
-
-        if v > bot+vspan/2:
-            text_yoffset = (v-bot)*(-0.25)
-        else:
-            text_yoffset = (top-v)*(0.25)
-            
-        self.plot_text = self.ax.annotate("",
-                            xy=(t,v), xycoords='data',
-                            xytext=(t+text_xoffset, v+text_yoffset), textcoords='data',
-                            arrowprops=dict(arrowstyle="simple", connectionstyle="arc3,rad=-0.2"),
-                            ha=ha, va=va)
-        
-        bbox_text = f"Time: {t:.1f}s, {vb.capitalize()}: {v:.1f}\nDamage: {(delta):.2f}\nInfo: {name} {info}"
-        box1 = TextArea(bbox_text, textprops=dict(color="k"))
-        self.anchored_box = AnchoredOffsetbox(loc='lower left',
-                                 child=box1, pad=0.4,
-                                 frameon=True,
-                                 bbox_to_anchor=(0., 1.02),
-                                 bbox_transform=self.ax.transAxes,
-                                 borderpad=0.,)
-        self.ax.add_artist(self.anchored_box) 
-        
-        self.fig.canvas.draw()
-
-    def offclick(self, event):
-        self.fig.canvas.draw()
-
-    def fast_run(self, enemies:List[Unit], fire_mode:FireMode, primer:FireMode):
-        self.reset()
-        fire_mode.reset()
-        for enemy in enemies:
-            enemy.reset()
-        
-
-        event_time = fire_mode.chargeTime.modded + fire_mode.embedDelay.modded
-        heapq.heappush(self.event_queue, (event_time, self.consume_call_index(), EventTrigger(fire_mode.pull_trigger, event_time, enemy=enemies[0])))
-
-        for enemy in enemies:
-            if primer and len(primer.forcedProc)>0:
-                enemy.pellet_hit(primer, fire_mode.target_bodypart)
-
-            while enemy.overguard.current_value > 0 or enemy.health.current_value > 0:
-                self.time, _, event = heapq.heappop(self.event_queue)
-                event.func(**event.kwargs)
-                
-                if self.time > 20 :
-                    break
-        if self.time < 20:
-            self.kill_times.append(self.time)
-    
-    def run_reapeated(self, enemy:Unit, fire_mode:FireMode, primer:FireMode, count=20):
-        self.kill_times = []
-        for _ in range(count):
-            self.reset()
-            enemy.reset()
-            fire_mode.reset()
-
-            self.fast_run([enemy], fire_mode, primer)
-    
-    def plot_hist(self):
-        self.ax2.cla()
-        sns.histplot(data=dict(kill_times=self.kill_times), x='kill_times', ax=self.ax2)
-        self.fig.tight_layout()
-
-
-def stats_changed(prev_data:dict, enemy:Unit):
-    if prev_data["overguard"] != enemy.overguard.current_value or \
-        prev_data["shield"] != enemy.shield.current_value or \
-            prev_data["health"] != enemy.health.current_value or \
-                prev_data["armor"] != enemy.armor.current_value:
-        return True
-    return False
-
+        self.stats.add(self.time if killed else None, self.start_pool - get_pool(enemy))
+        if keep_records and self.sink is not None:
+            self.sink.collect(trace)
 
 
-def run_once(simulation:Simulacrum, enemy:Unit, fire_mode:FireMode):
-    simulation.run_simulation([enemy], fire_mode)
+def get_pool(enemy:Unit) -> float:
+    # overguard, shield and health left, what a trial's damage is measured against
+    return max(0, enemy.overguard.current_value) + max(0, enemy.shield.current_value) + max(0, enemy.health.current_value)
 
 
 def damage_test(enemy:Unit, fire_mode:FireMode, game_dmg, crit_tier, bodypart='body'):
+    import pandas as pd
     tier_name = {0:"White", 1:"Yellow", 2:"Orange", 3:"Red", 4:"Red!", 5:"Red!!", 6:"Red!!!"}
     enemy.reset()
     fire_mode.reset()
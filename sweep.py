@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import os
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Iterator, List
+
+from warframe_simulacrum.simulation import Simulation
+from warframe_simulacrum.weapon import Weapon
+from warframe_simulacrum.unit import Unit
+from warframe_simulacrum.batch import BatchSimulation
+import warframe_simulacrum.analytic as analytic
+import warframe_simulacrum.adaptive as adaptive
+
+ENGINE_BATCH = 'batch'
+ENGINE_SCALAR = 'scalar'
+ENGINE_ANALYTIC = 'analytic'
+
+# per-process caches of constructed objects, reused across the tasks a worker receives
+# build_sweep varies weapon and mod config slowest, so a few recent weapons are enough while
+# every enemy and level of the grid comes round again for each weapon
+WEAPON_CACHE_SIZE = 8
+UNIT_CACHE_SIZE = 256
+_worker_cache = {}
+_worker_weapons = OrderedDict()
+_worker_units = OrderedDict()
+
+
+class SweepTask():
+    def __init__(self, index:int, weapon:str, enemy:str, level:int, mod_config_name:str='', mod_config:dict=None, fire_mode:str=None, seed:int=0) -> None:
+        self.index = index
+        self.weapon = weapon
+        self.fire_mode = fire_mode # None runs every fire mode of the weapon
+        self.mod_config_name = mod_config_name
+        self.mod_config = mod_config if mod_config is not None else {}
+        self.enemy = enemy
+        self.level = level
+        self.seed = seed
+
+    def get_seed_sequence(self):
+        # independent of scheduling order and worker count
+        return np.random.SeedSequence(self.seed, spawn_key=(self.index,))
+
+
+def build_sweep(weapons:List[str], enemies:List[str], levels:List[int], mod_configs:dict=None, fire_modes:List[str]=None, seed:int=0) -> List[SweepTask]:
+    '''
+    Expands the weapon x fire mode x mod config x enemy x level grid into tasks.
+    mod_configs maps a config name to the dict passed to Weapon.load_mod_config.
+    '''
+    mod_configs = mod_configs if mod_configs is not None else {'': {}}
+    fire_modes = fire_modes if fire_modes is not None else [None]
+    tasks = []
+    # weapon and mod config vary slowest so consecutive tasks reuse the same constructed weapon
+    for weapon, (config_name, config), fire_mode, enemy, level in product(weapons, mod_configs.items(), fire_modes, enemies, levels):
+        tasks.append(SweepTask(len(tasks), weapon, enemy, level, config_name, config, fire_mode, seed))
+    return tasks
+
+
+def run_sweep(tasks:List[SweepTask], trials:int=1000, max_workers:int=None, chunksize:int=None, max_time:float=20, engine:str=ENGINE_BATCH,
+              target_width:float=None, statistic:str=adaptive.STAT_MEAN) -> Iterator[dict]:
+    '''
+    Runs the tasks over a process pool and yields one result row per (task, fire mode) as chunks complete.
+    With target_width, each row runs trials in batches until the relative confidence interval of statistic is that narrow,
+    and trials is the budget.
+    '''
+    max_workers = max_workers if max_workers is not None else os.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+    chunks = [tasks[i:i+chunksize] for i in range(0, len(tasks), chunksize)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_chunk, chunk, trials, max_time, engine, target_width, statistic) for chunk in chunks]
+        for future in as_completed(futures):
+            for row in future.result():
+                yield row
+
+
+def run_chunk(tasks:List[SweepTask], trials:int, max_time:float, engine:str, target_width:float=None, statistic:str=adaptive.STAT_MEAN) -> List[dict]:
+    rows = []
+    for task in tasks:
+        rows += run_task(task, trials, max_time, engine, target_width, statistic)
+    return rows
+
+
+def run_task(task:SweepTask, trials:int, max_time:float=20, engine:str=ENGINE_BATCH, target_width:float=None, statistic:str=adaptive.STAT_MEAN) -> List[dict]:
+    weapon = get_worker_weapon(task.weapon, task.mod_config_name, task.mod_config)
+    enemy = get_worker_unit(task.enemy, task.level)
+    fire_mode_names = list(weapon.fire_modes) if task.fire_mode is None else [task.fire_mode]
+    seed_sequences = task.get_seed_sequence().spawn(len(fire_mode_names))
+
+    rows = []
+    for fire_mode_name, seed_sequence in zip(fire_mode_names, seed_sequences):
+        fire_mode = weapon.fire_modes[fire_mode_name]
+        row = dict(index=task.index, weapon=task.weapon, fire_mode=fire_mode_name, mod_config=task.mod_config_name,
+                   enemy=task.enemy, level=task.level, seed=task.seed, trials=trials)
+        if engine == ENGINE_ANALYTIC:
+            row.update(analytic.evaluate(enemy, fire_mode))
+            rows.append(row)
+            continue
+
+        if target_width is not None:
+            row.update(run_task_adaptive(enemy, fire_mode, seed_sequence, trials, max_time, engine, target_width, statistic))
+            rows.append(row)
+            continue
+
+        if engine == ENGINE_BATCH:
+            batch = BatchSimulation(trials, max_time=max_time, seed=seed_sequence)
+            kill_times = batch.run(enemy, fire_mode)
+            kill_times = kill_times[np.isfinite(kill_times)]
+        elif engine == ENGINE_SCALAR:
+            simulation = get_worker_simulation()
+            # trial i runs on substream i of the fire mode's seed sequence
+            simulation.seed(seed_sequence)
+            simulation.clear_records()
+            for i in range(trials):
+                simulation.run(enemy, fire_mode, None, i, keep_records=False)
+            # quantiles come from the running stats' sketch
+            row.update(simulation.stats.summary())
+            rows.append(row)
+            continue
+        else:
+            raise Exception(f"Unknown sweep engine {engine}")
+
+        row.update(summarize_kill_times(kill_times, trials))
+        rows.append(row)
+    return rows
+
+
+def run_task_adaptive(enemy:Unit, fire_mode, seed_sequence, trials:int, max_time:float, engine:str, target_width:float, statistic:str) -> dict:
+    if engine == ENGINE_BATCH:
+        batch_size = min(trials, 1000)
+        run_trials = adaptive.get_batch_trials(enemy, fire_mode, max_time=max_time, seed_sequence=seed_sequence, block_size=batch_size)
+    elif engine == ENGINE_SCALAR:
+        simulation = get_worker_simulation()
+        simulation.seed(seed_sequence)
+        simulation.clear_records()
+        run_trials = adaptive.get_simulation_trials(simulation, enemy, fire_mode)
+        batch_size = min(trials, 100)
+    else:
+        raise Exception(f"Unknown sweep engine {engine}")
+
+    result = adaptive.run_adaptive(run_trials, statistic, target_width=target_width, batch_size=batch_size, min_trials=batch_size, max_trials=trials)
+    kill_times = result.pop('kill_times')
+    row = summarize_kill_times(kill_times[np.isfinite(kill_times)], result['trials'])
+    row.update(trials=result['trials'], ci_low=result['ci_low'], ci_high=result['ci_high'], ci_width=result['ci_width'],
+               ci_relative_width=result['ci_relative_width'], converged=result['converged'])
+    return row
+
+
+def prune_tasks(tasks:List[SweepTask], keep:int, key:str='ttk') -> List[SweepTask]:
+    '''
+    Ranks the tasks with the analytic engine in this process and returns the best `keep` of them, to be run with a Monte Carlo engine.
+    A task is scored by its best fire mode.
+    '''
+    scores = []
+    for task in tasks:
+        rows = run_task(task, 0, engine=ENGINE_ANALYTIC)
+        values = [row[key] for row in rows]
+        scores.append(min(values) if key == 'ttk' else -max(values))
+    order = np.argsort(scores, kind='stable')
+    return [tasks[i] for i in order[:keep]]
+
+
+def summarize_kill_times(kill_times:np.ndarray, trials:int) -> dict:
+    if len(kill_times) == 0:
+        return dict(kills=0, kill_rate=0., mean=np.nan, std=np.nan, median=np.nan, p10=np.nan, p90=np.nan, min=np.nan, max=np.nan)
+    p10, median, p90 = np.percentile(kill_times, [10, 50, 90])
+    return dict(kills=len(kill_times), kill_rate=len(kill_times)/trials, mean=float(np.mean(kill_times)), std=float(np.std(kill_times)),
+                median=float(median), p10=float(p10), p90=float(p90), min=float(np.min(kill_times)), max=float(np.max(kill_times)))
+
+
+def get_worker_simulation() -> Simulation:
+    if 'simulation' not in _worker_cache:
+        _worker_cache['simulation'] = Simulation()
+    return _worker_cache['simulation']
+
+
+def get_worker_weapon(name:str, mod_config_name:str, mod_config:dict) -> Weapon:
+    key = (name, mod_config_name, json.dumps(mod_config, sort_keys=True))
+    def build():
+        weapon = Weapon(name, None, get_worker_simulation())
+        weapon.load_mod_config(mod_config)
+        return weapon
+    return get_cached(_worker_weapons, key, build, WEAPON_CACHE_SIZE)
+
+
+def get_worker_unit(name:str, level:int) -> Unit:
+    return get_cached(_worker_units, (name, level), lambda: Unit(name, level, get_worker_simulation()), UNIT_CACHE_SIZE)
+
+
+def get_cached(cache:OrderedDict, key, build, maxsize:int):
+    # least recently used entries are dropped once the cache is full
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    value = cache[key] = build()
+    if len(cache) > maxsize:
+        cache.popitem(last=False)
+    return value
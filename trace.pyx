@@ -0,0 +1,194 @@
+import numpy as np
+
+FLOAT_COLUMNS = ("time", "overguard", "shield", "health", "armor", "info_a", "info_b")
+INT_COLUMNS = ("event_index", "sim_index")
+CODE_COLUMNS = ("name", "info")
+STATE_COLUMNS = ("overguard", "shield", "health", "armor")
+
+# process wide string table shared by every recorder so codes stay comparable across runs
+_strings = []
+_codes = {}
+
+cpdef int intern(str value):
+    code = _codes.get(value)
+    if code is None:
+        code = len(_strings)
+        _strings.append(value)
+        _codes[value] = code
+    return code
+
+def get_string(int code):
+    return _strings[code]
+
+def get_strings():
+    return list(_strings)
+
+def format_info(int code, double a, double b):
+    '''
+    Resolves an info template code and its two arguments into the displayed string.
+    '''
+    return _strings[code].format(a, b)
+
+cdef int EMPTY = intern("")
+
+
+cdef class TraceRecorder:
+    '''
+    Enemy state after every event that changed it, stored in growable numpy columns.
+    Event names are interned codes and info strings are kept as a template code plus two numbers, formatted only on export.
+    '''
+    cdef readonly Py_ssize_t size
+    cdef readonly Py_ssize_t capacity
+    cdef readonly dict columns
+
+    cdef double[::1] time
+    cdef double[::1] overguard
+    cdef double[::1] shield
+    cdef double[::1] health
+    cdef double[::1] armor
+    cdef double[::1] info_a
+    cdef double[::1] info_b
+    cdef long long[::1] event_index
+    cdef long long[::1] sim_index
+    cdef int[::1] name
+    cdef int[::1] info
+
+    def __init__(self, Py_ssize_t capacity=1024):
+        self.size = 0
+        self.capacity = 0
+        self.columns = {}
+        self.grow(max(1, capacity))
+
+    cdef int grow(self, Py_ssize_t capacity) except -1:
+        columns = {}
+        for key in FLOAT_COLUMNS:
+            columns[key] = np.empty(capacity, dtype=np.float64)
+        for key in INT_COLUMNS:
+            columns[key] = np.empty(capacity, dtype=np.int64)
+        for key in CODE_COLUMNS:
+            columns[key] = np.empty(capacity, dtype=np.int32)
+        for key, column in self.columns.items():
+            columns[key][:self.size] = column[:self.size]
+        self.columns = columns
+        self.capacity = capacity
+
+        self.time = columns["time"]
+        self.overguard = columns["overguard"]
+        self.shield = columns["shield"]
+        self.health = columns["health"]
+        self.armor = columns["armor"]
+        self.info_a = columns["info_a"]
+        self.info_b = columns["info_b"]
+        self.event_index = columns["event_index"]
+        self.sim_index = columns["sim_index"]
+        self.name = columns["name"]
+        self.info = columns["info"]
+        return 0
+
+    def clear(self):
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    cpdef bint changed(self, enemy):
+        '''
+        True if the enemy state differs from the last recorded row.
+        '''
+        cdef Py_ssize_t i = self.size - 1
+        if i < 0:
+            return True
+        return self.overguard[i] != enemy.overguard.current_value or self.shield[i] != enemy.shield.current_value or \
+                self.health[i] != enemy.health.current_value or self.armor[i] != enemy.armor.current_value
+
+    cpdef void append(self, double time, long long event_index, long long sim_index, enemy, int name, int info, double info_a, double info_b) except *:
+        cdef Py_ssize_t i = self.size
+        if i == self.capacity:
+            self.grow(self.capacity * 2)
+        self.time[i] = time
+        self.event_index[i] = event_index
+        self.sim_index[i] = sim_index
+        self.overguard[i] = enemy.overguard.current_value
+        self.shield[i] = enemy.shield.current_value
+        self.health[i] = enemy.health.current_value
+        self.armor[i] = enemy.armor.current_value
+        self.name[i] = name
+        self.info[i] = info
+        self.info_a[i] = info_a
+        self.info_b[i] = info_b
+        self.size += 1
+
+    cpdef void record(self, double time, long long event_index, long long sim_index, enemy, event_queue=None) except *:
+        '''
+        Appends the enemy state, with the name and info of the current event of event_queue if given.
+        '''
+        if event_queue is None:
+            self.append(time, event_index, sim_index, enemy, EMPTY, EMPTY, 0, 0)
+            return
+        template, a, b = event_queue.get_info_args()
+        self.append(time, event_index, sim_index, enemy, intern(event_queue.get_name()), intern(template), a, b)
+
+    def get_column(self, str key):
+        # a view, valid until the next append grows the recorder
+        return self.columns[key][:self.size]
+
+    def get_info(self, Py_ssize_t row):
+        return format_info(self.info[row], self.info_a[row], self.info_b[row])
+
+    def get_infos(self):
+        # each distinct (template, a, b) is formatted once
+        keys = np.stack([self.get_column("info").astype(np.float64), self.get_column("info_a"), self.get_column("info_b")], axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        strings = np.array([format_info(int(code), a, b) for code, a, b in unique], dtype=object)
+        return strings[inverse.reshape(-1)]
+
+    def get_readonly_column(self, str key):
+        view = self.get_column(key)
+        view.flags.writeable = False
+        return view
+
+    def to_dataframe(self, bint info=True, bint copy=True):
+        '''
+        DataFrame over the recorded columns. name is categorical.
+        info resolves the info strings, otherwise the info template code and arguments are returned as columns.
+        Without copy the numeric columns are read-only views of the recorder, valid until the next append.
+        '''
+        import pandas as pd
+        strings = get_strings()
+        get_column = self.get_column if copy else self.get_readonly_column
+        data = {key: get_column(key) for key in ("time", "event_index", "sim_index") + STATE_COLUMNS}
+        data["name"] = pd.Categorical.from_codes(self.get_column("name"), categories=pd.Index(strings, dtype=object).drop_duplicates()) \
+                            if len(set(strings)) == len(strings) else [strings[c] for c in self.get_column("name")]
+        if info:
+            data["info"] = self.get_infos()
+        else:
+            data["info_code"] = get_column("info")
+            data["info_a"] = get_column("info_a")
+            data["info_b"] = get_column("info_b")
+        return pd.DataFrame(data, copy=copy)
+
+    def to_arrow(self, bint info=True):
+        '''
+        pyarrow Table over the recorded columns with name (and info) as dictionary arrays.
+        '''
+        import pyarrow as pa
+        dictionary = pa.array(get_strings(), type=pa.string())
+        data = {key: pa.array(self.get_column(key)) for key in ("time", "event_index", "sim_index") + STATE_COLUMNS}
+        data["name"] = pa.DictionaryArray.from_arrays(pa.array(self.get_column("name")), dictionary)
+        if info:
+            data["info"] = pa.array(self.get_infos().tolist(), type=pa.string())
+        else:
+            data["info_code"] = pa.DictionaryArray.from_arrays(pa.array(self.get_column("info")), dictionary)
+            data["info_a"] = pa.array(self.get_column("info_a"))
+            data["info_b"] = pa.array(self.get_column("info_b"))
+        return pa.table(data)
+
+    def to_records(self):
+        '''
+        The recorded rows as a list of dicts, the layout Simulation.records used to have.
+        '''
+        rows = []
+        for i in range(self.size):
+            rows.append(dict(overguard=self.overguard[i], shield=self.shield[i], health=self.health[i], armor=self.armor[i], time=self.time[i],
+                             name=_strings[self.name[i]], info=self.get_info(i), event_index=self.event_index[i], sim_index=self.sim_index[i]))
+        return rows
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from typing import Iterable, Iterator, List
+
+from warframe_simulacrum.trace import TraceRecorder
+
+FORMAT_PARQUET = 'parquet'
+FORMAT_ARROW = 'arrow'
+EXTENSIONS = {FORMAT_PARQUET: '.parquet', FORMAT_ARROW: '.arrow'}
+DATASET_FORMATS = {FORMAT_PARQUET: 'parquet', FORMAT_ARROW: 'ipc'}
+
+# part files hold whole runs, the sim_index range is in the name so readers can skip files without opening them
+# callers restart sim_index for each batch, so a sequence number keeps parts of later batches from replacing earlier ones
+PART_PATTERN = re.compile(r"^part-(\d+)-(\d+)(?:-(\d+))?\.(parquet|arrow)$")
+
+
+class TraceSink():
+    '''
+    Streams the runs collected in a TraceRecorder to Parquet or Arrow IPC part files, so memory stays flat over long batches.
+    The recorder is flushed and cleared every flush_runs runs or once it holds flush_rows rows.
+    '''
+    def __init__(self, path:str, format:str=FORMAT_PARQUET, flush_runs:int=100, flush_rows:int=1000000) -> None:
+        if format not in EXTENSIONS:
+            raise Exception(f"Unknown trace format {format}")
+        self.path = path
+        self.format = format
+        self.flush_runs = flush_runs
+        self.flush_rows = flush_rows
+        self.pending_runs = 0
+        self.files = []
+        os.makedirs(path, exist_ok=True)
+        self.sequence = get_next_sequence(path)
+
+    def collect(self, trace:TraceRecorder):
+        '''
+        Called after each run appended to trace.
+        '''
+        self.pending_runs += 1
+        if self.pending_runs >= self.flush_runs or len(trace) >= self.flush_rows:
+            self.flush(trace)
+
+    def flush(self, trace:TraceRecorder):
+        if len(trace) == 0:
+            self.pending_runs = 0
+            return
+        sim_index = trace.get_column("sim_index")
+        first, last = int(sim_index.min()), int(sim_index.max())
+        filename = self.get_filename(first, last)
+        # another sink may have written to the same path since this one was opened
+        while os.path.exists(filename):
+            self.sequence += 1
+            filename = self.get_filename(first, last)
+        self.sequence += 1
+        # info stays as template + arguments, resolved by the reader
+        table = trace.to_arrow(info=False)
+        if self.format == FORMAT_PARQUET:
+            pq.write_table(table, filename)
+        else:
+            with ipc.new_file(filename, table.schema) as writer:
+                writer.write_table(table)
+        self.files.append(filename)
+        trace.clear()
+        self.pending_runs = 0
+
+    def close(self, trace:TraceRecorder):
+        self.flush(trace)
+
+    def get_filename(self, first:int, last:int):
+        return os.path.join(self.path, f"part-{first:08d}-{last:08d}-{self.sequence:06d}{EXTENSIONS[self.format]}")
+
+
+def get_next_sequence(path:str) -> int:
+    sequence = -1
+    for filename in os.listdir(path):
+        match = PART_PATTERN.match(filename)
+        if match is not None and match.group(3) is not None:
+            sequence = max(sequence, int(match.group(3)))
+    return sequence + 1
+
+
+class TraceReader():
+    '''
+    Lazy view over the part files written by a TraceSink. Only the files holding the requested runs are opened.
+    '''
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self.parts = []
+        for filename in sorted(os.listdir(path)):
+            match = PART_PATTERN.match(filename)
+            if match is None:
+                continue
+            first, last, _, extension = match.groups()
+            self.parts.append((int(first), int(last), extension, os.path.join(path, filename)))
+
+    def get_sim_range(self):
+        if len(self.parts) == 0:
+            return None
+        return min(p[0] for p in self.parts), max(p[1] for p in self.parts)
+
+    def get_parts(self, sim_indices:Iterable[int]=None):
+        if sim_indices is None:
+            return self.parts
+        sim_indices = np.unique(np.asarray(list(sim_indices), dtype=np.int64))
+        parts = []
+        for part in self.parts:
+            # first requested index at or after the part's first run
+            i = np.searchsorted(sim_indices, part[0])
+            if i < len(sim_indices) and sim_indices[i] <= part[1]:
+                parts.append(part)
+        return parts
+
+    def get_dataset(self, sim_indices:Iterable[int]=None):
+        parts = self.get_parts(sim_indices)
+        if len(parts) == 0:
+            return None
+        extension = parts[0][2]
+        return ds.dataset([p[3] for p in parts], format=DATASET_FORMATS[extension])
+
+    def get_filter(self, sim_indices:Iterable[int]=None):
+        if sim_indices is None:
+            return None
+        return pc.field("sim_index").isin(pa.array(list(sim_indices), type=pa.int64()))
+
+    def read(self, sim_indices:Iterable[int]=None, columns:List[str]=None) -> pa.Table:
+        dataset = self.get_dataset(sim_indices)
+        if dataset is None:
+            return None
+        return dataset.to_table(columns=columns, filter=self.get_filter(sim_indices))
+
+    def iter_batches(self, sim_indices:Iterable[int]=None, columns:List[str]=None) -> Iterator[pa.RecordBatch]:
+        dataset = self.get_dataset(sim_indices)
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(columns=columns, filter=self.get_filter(sim_indices)):
+            yield batch
+
+    def to_dataframe(self, sim_indices:Iterable[int]=None, info:bool=True) -> pd.DataFrame:
+        '''
+        Loads the requested runs, in the layout of TraceRecorder.to_dataframe.
+        '''
+        table = self.read(sim_indices)
+        if table is None:
+            return pd.DataFrame([])
+        df = table.to_pandas()
+        if info:
+            df["info"] = resolve_info(df.pop("info_code"), df.pop("info_a"), df.pop("info_b"))
+        return df
+
+
+def resolve_info(templates:pd.Series, a:pd.Series, b:pd.Series) -> np.ndarray:
+    # each distinct (template, a, b) is formatted once
+    keys = pd.DataFrame(dict(template=templates.astype(str), a=a, b=b))
+    codes, unique = pd.MultiIndex.from_frame(keys).factorize()
+    strings = np.array([template.format(x, y) for template, x, y in unique], dtype=object)
+    return strings[codes]
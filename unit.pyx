@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-from random import random, randint
 import numpy as np
 from pathlib import Path
 import os
@@ -9,20 +8,212 @@ import math
 import copy
 import collections.abc
 import warframe_simulacrum.procs as pm
+import warframe_simulacrum.catalog as catalog
 
 import warframe_simulacrum.constants as const
+from warframe_simulacrum.rng cimport RandomStream
 from typing import List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from warframe_simulacrum.simulation import Simulacrum
     from warframe_simulacrum.weapon import FireMode
 
-class Unit:
+cdef enum:
+    DC_NONE
+    DC_STATIC_DPS_DEMOLISHER
+    DC_STATIC_DPS_ACOLYTE
+    DC_DYNAMIC_DPS_ARCHON
+    DC_DYNAMIC_DPS_FRAGMENTED
+    DC_DYNAMIC_DPS_NECRAMITE
+
+cdef enum:
+    CC_NONE
+    CC_ACOLYTE
+
+DAMAGE_CONTROLLERS = {"DC_NONE":DC_NONE, "DC_STATIC_DPS_DEMOLISHER":DC_STATIC_DPS_DEMOLISHER, "DC_STATIC_DPS_ACOLYTE":DC_STATIC_DPS_ACOLYTE,
+                      "DC_DYNAMIC_DPS_ARCHON":DC_DYNAMIC_DPS_ARCHON, "DC_DYNAMIC_DPS_FRAGMENTED":DC_DYNAMIC_DPS_FRAGMENTED, "DC_DYNAMIC_DPS_NECRAMITE":DC_DYNAMIC_DPS_NECRAMITE}
+CRITICAL_CONTROLLERS = {"CC_NONE":CC_NONE, "CC_ACOLYTE":CC_ACOLYTE}
+
+CRIT_INFO = "Crit Tier {0:.0f}, Crit Mult = {1:.3f}"
+
+cdef enum:
+    DAMAGE_LANES = 20
+
+cdef inline int check_lanes(const float[:] damage) except -1:
+    if damage.shape[0] != DAMAGE_LANES:
+        raise ValueError(f"Damage vectors must have {DAMAGE_LANES} lanes, got {damage.shape[0]}")
+    return 0
+
+cdef inline void scale_lanes(const float* damage, float scale, float* out) noexcept:
+    cdef int i
+    for i in range(DAMAGE_LANES):
+        out[i] = damage[i] * scale
+
+cdef inline float pairwise_sum(const float* a, int n) noexcept:
+    # same accumulation order as numpy's float32 add.reduce for n <= 128 so sums stay bit-identical
+    cdef float res = 0
+    cdef float r[8]
+    cdef int i, j
+    if n < 8:
+        for i in range(n):
+            res += a[i]
+        return res
+    for j in range(8):
+        r[j] = a[j]
+    i = 8
+    while i < n - (n % 8):
+        for j in range(8):
+            r[j] += a[i + j]
+        i += 8
+    res = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+    while i < n:
+        res += a[i]
+        i += 1
+    return res
+
+cdef inline float reduced_sum(const float* damage, float dr, float critical_multiplier, float* out) noexcept:
+    cdef int i
+    for i in range(DAMAGE_LANES):
+        out[i] = (damage[i] * dr) * critical_multiplier
+    return pairwise_sum(out, DAMAGE_LANES)
+
+cdef class DamageTable:
+    '''
+    Per (fire mode, bodypart, damage tag) damage factors of a unit.
+    Holds the enemy multiplier and, for pellet hits, the scaled damage and the damage landing on each protection layer before damage reduction and crits.
+    '''
+    cdef long long state_version
+    cdef long long damage_version
+    cdef str animation
+    cdef double multishot_multiplier
+    cdef double multishot_damage
+    cdef float multiplier
+    cdef bint has_lanes
+    cdef float scaled[DAMAGE_LANES]
+    cdef float overguard[DAMAGE_LANES]
+    cdef float shield[DAMAGE_LANES]
+    cdef float health[DAMAGE_LANES]
+
+cdef class ProcTable:
+    '''
+    Walker alias table over the proc probabilities of a fire mode, so one uniform draw picks a proc type in constant time.
+    Probability left over when they sum to less than one is an extra outcome that applies no proc.
+    '''
+    cdef object probabilities
+    cdef int size
+    cdef int proc_types
+    cdef double threshold[DAMAGE_LANES + 1]
+    cdef int alias[DAMAGE_LANES + 1]
+
+    def __init__(self, probabilities) -> None:
+        cdef double weights[DAMAGE_LANES + 1]
+        cdef int small[DAMAGE_LANES + 1]
+        cdef int large[DAMAGE_LANES + 1]
+        cdef int i, s, l, n_small = 0, n_large = 0
+        cdef int n = min(len(probabilities), DAMAGE_LANES)
+        cdef double total = 0
+        self.probabilities = probabilities
+        for i in range(n):
+            weights[i] = max(0., <double>probabilities[i])
+            total += weights[i]
+        self.proc_types = n
+        if total <= 0:
+            self.size = 0
+            return
+        # the no proc outcome gets index n
+        if total < 1:
+            weights[n] = 1 - total
+            total = 1
+            n += 1
+        self.size = n
+        for i in range(n):
+            weights[i] = weights[i] * n / total
+            self.alias[i] = i
+            if weights[i] < 1:
+                small[n_small] = i
+                n_small += 1
+            else:
+                large[n_large] = i
+                n_large += 1
+        while n_small > 0 and n_large > 0:
+            n_small -= 1
+            s = small[n_small]
+            l = large[n_large - 1]
+            self.threshold[s] = weights[s]
+            self.alias[s] = l
+            weights[l] = (weights[l] + weights[s]) - 1
+            if weights[l] < 1:
+                n_large -= 1
+                small[n_small] = l
+                n_small += 1
+        for i in range(n_small):
+            self.threshold[small[i]] = 1
+        for i in range(n_large):
+            self.threshold[large[i]] = 1
+
+    cdef inline int sample(self, double roll) noexcept:
+        # returns the proc index, DAMAGE_LANES or more for no proc
+        cdef double x = roll * self.size
+        cdef int i = <int>x
+        if i >= self.size:
+            i = self.size - 1
+        if x - i >= self.threshold[i]:
+            i = self.alias[i]
+        return i if i < self.proc_types else DAMAGE_LANES
+
+cdef class Unit:
+    cdef public str name
+    cdef public object level
+    cdef public object base_level
+    cdef public object protection_scaling
+    cdef public object simulation
+    # the simulation's random stream
+    cdef public RandomStream rng
+    cdef public str faction
+    cdef public bint is_eximus
+    cdef public object procImmunities
+    cdef public str damage_controller_type
+    cdef public str critical_controller_type
+    cdef public double base_dr
+    cdef public double health_vulnerability
+    cdef public double shield_vulnerability
+    cdef public double controller_value
+    cdef public dict proc_info
+    cdef public Protection health
+    cdef public Protection armor
+    cdef public Protection shield
+    cdef public Protection overguard
+    cdef public object bodypart_multipliers
+    cdef public object animation_multipliers
+    cdef public ProcController proc_controller
+    cdef public DamageController damage_controller
+
+    # state
+    cdef public str current_animation
+    cdef public int unique_proc_count
+    cdef public bint unique_proc_delta
+    cdef object _armor_dr
+    cdef float[:] armor_dr_lanes
+    cdef public double last_damage
+    cdef public double last_t0_damage
+    # bumped whenever armor dr or a protection damage multiplier changes
+    cdef public long long table_version
+    cdef dict damage_tables
+    # per fire mode, kept across resets and rebuilt when its proc probabilities are replaced
+    cdef dict proc_tables
+
+    # damage kernel buffers
+    cdef float scaled_damage[DAMAGE_LANES]
+    cdef float overflow_damage[DAMAGE_LANES]
+    cdef float layer_damage[DAMAGE_LANES]
+    cdef double removed[3]
+
     def __init__(self, name: str, level: int, simulation:Simulacrum, protection_scaling=const.NEW_PROTECTION_SCALING):
         self.name = name
         self.level = level
         self.protection_scaling = protection_scaling
         self.simulation = simulation
+        self.rng = simulation.rng
 
         self.update_data()
 
@@ -37,16 +228,27 @@ class Unit:
         self.current_animation = 'normal'
         self.unique_proc_count = 0
         self.unique_proc_delta = False
+        self.table_version = 0
+        self.damage_tables = {}
+        self.proc_tables = {}
         self.armor_dr = np.array([1]*20, dtype=np.single)
         self.set_armor_dr()
 
         self.last_damage = 0
         self.last_t0_damage = 0
 
+    @property
+    def armor_dr(self):
+        return self._armor_dr
+
+    @armor_dr.setter
+    def armor_dr(self, value):
+        self._armor_dr = value
+        self.armor_dr_lanes = value
+        self.table_version += 1
+
     def update_data(self):
-        data = self.get_unit_data()
-        default_data = copy.deepcopy(const.DEFAULT_ENEMY_CONFIG)
-        unit_data = update(default_data, data)
+        unit_data = catalog.get_unit_config(self.name, const.DEFAULT_ENEMY_CONFIG)
 
         self.base_level = unit_data.get("base_level", 1)
         self.level = max(self.base_level, self.level)
@@ -106,10 +308,8 @@ class Unit:
 
         return info
 
-    def get_unit_data(self) -> dict:
-        with open(os.path.join(Path(__file__).parent.resolve(),"data", "unit_data.json")) as f:
-            data = json.load(f)
-        return data.get(self.name, {})
+    def get_unit_data(self):
+        return catalog.get_unit_data(self.name)
     
     def reset(self):
         self.health.reset()
@@ -125,14 +325,47 @@ class Unit:
         self.current_animation = 'normal'
         self.unique_proc_count = 0
         self.unique_proc_delta = False
-        self.armor_dr = np.array([1]*20, dtype=np.single)
+        self.damage_tables.clear()
+        # recomputed in place, every lane is overwritten
         self.set_armor_dr()
 
         self.last_damage = 0
         self.last_t0_damage = 0
+
+    def snapshot(self):
+        '''
+        Captures the full mutable state of the unit: protections, status procs, armor damage reduction and the damage controller.
+        Procs are not changed after they are created, so they are shared with the snapshot rather than copied.
+        '''
+        return (self.health.get_state(), self.armor.get_state(), self.shield.get_state(), self.overguard.get_state(),
+                self.proc_controller.get_state(), self.damage_controller.get_state(), self.current_animation,
+                self.unique_proc_count, self.unique_proc_delta, self._armor_dr.copy(), self.procImmunities.copy(),
+                self.last_damage, self.last_t0_damage)
+
+    def restore(self, state):
+        '''
+        Restores a snapshot in place. Proc managers and containers stay the same objects, so events referring to them remain valid.
+        '''
+        health, armor, shield, overguard, procs, controller, animation, unique_proc_count, unique_proc_delta, armor_dr, immunities, \
+            last_damage, last_t0_damage = state
+        self.health.set_state(health)
+        self.armor.set_state(armor)
+        self.shield.set_state(shield)
+        self.overguard.set_state(overguard)
+        self.proc_controller.set_state(procs)
+        self.damage_controller.set_state(controller)
+        self.current_animation = animation
+        self.unique_proc_count = unique_proc_count
+        self.unique_proc_delta = unique_proc_delta
+        np.copyto(self._armor_dr, armor_dr)
+        np.copyto(self.procImmunities, immunities)
+        self.last_damage = last_damage
+        self.last_t0_damage = last_t0_damage
+        self.damage_tables.clear()
+        self.table_version += 1
     
     def set_armor_dr(self):
-        cdef int current_armor = self.armor.current_value
+        cdef int current_armor = <int>self.armor.current_value
 
         if current_armor >= 1:
             np.reciprocal((self.armor.modifier*(<float>-1) + <float>2)*(current_armor * const.ARMOR_RATIO)+1, out=self.armor_dr)
@@ -143,27 +376,74 @@ class Unit:
         else:
             self.armor_dr *= <float>0
             self.armor_dr += <float>1
-            
+        self.table_version += 1
+
 
-    def pellet_hit(self, fire_mode:FireMode, bodypart='body'):
+    cpdef pellet_hit(self, fire_mode:FireMode, str bodypart='body'):
         cdef float multiplier = 1
+        cdef float enemy_multiplier
+        cdef DamageTable table
+        cdef const float[:] damage
+        cdef int i
         # calculate conditional multiplier
-        if fire_mode.unique_proc_count != self.unique_proc_count and fire_mode.condition_overloaded:
-            fire_mode.unique_proc_count = self.unique_proc_count
-            fire_mode.calc_modded_damage()
+        if fire_mode.condition_overloaded:
+            # lazily expiring procs only update the unique proc count when read
+            self.proc_controller.expire_procs()
+            if fire_mode.unique_proc_count != self.unique_proc_count:
+                fire_mode.unique_proc_count = self.unique_proc_count
+                fire_mode.calc_modded_damage()
 
         cdef float cd = self.get_critical_multiplier(fire_mode, bodypart) 
 
         if fire_mode.weapon.special_m['attrition_chance'] > 0 :
-            if self.damage_controller.critical_tier==0 and random() > fire_mode.weapon.special_m['attrition_chance']:
+            if self.damage_controller.critical_tier==0 and self.rng.random() > fire_mode.weapon.special_m['attrition_chance']:
                 multiplier *= 21
 
-        enemy_multiplier = self.apply_damage(fire_mode, fire_mode.damagePerShot.modded * multiplier, critical_multiplier=cd, bodypart=bodypart)
+        table = self.get_damage_table(fire_mode, bodypart, None)
+        if multiplier == 1:
+            if not table.has_lanes:
+                self.fill_table_lanes(table, fire_mode.damagePerShot.modded)
+            enemy_multiplier = self.apply_damage_lanes(fire_mode, table, table.scaled, cd, True)
+        else:
+            damage = fire_mode.damagePerShot.modded
+            check_lanes(damage)
+            for i in range(DAMAGE_LANES):
+                self.scaled_damage[i] = (damage[i] * multiplier) * table.multiplier
+            enemy_multiplier = self.apply_damage_lanes(fire_mode, table, self.scaled_damage, cd, False)
 
         cdef float status_damage_base = fire_mode.totalDamage.modded * enemy_multiplier * self.damage_controller.unmodified_tiered_critical_multiplier
         self.apply_status(fire_mode, status_damage_base, bodypart)
 
-    def apply_damage(self, fire_mode:FireMode, damage:np.array, critical_multiplier=1, bodypart='body', damage_tag=None):
+    cpdef float apply_damage(self, fire_mode:FireMode, const float[:] damage, float critical_multiplier=1, str bodypart='body', damage_tag=None) except? -1:
+        cdef DamageTable table = self.get_damage_table(fire_mode, bodypart, damage_tag)
+        cdef int i
+        check_lanes(damage)
+        for i in range(DAMAGE_LANES):
+            self.scaled_damage[i] = damage[i] * table.multiplier
+        return self.apply_damage_lanes(fire_mode, table, self.scaled_damage, critical_multiplier, False)
+
+    cdef DamageTable get_damage_table(self, fire_mode:FireMode, str bodypart, damage_tag):
+        '''
+        Returns the damage table of a fire mode and bodypart, rebuilt when the fire mode damage, armor, protection damage multipliers, animation or multishot state changed since it was built.
+        '''
+        cdef DamageTable table
+        cdef double multishot_multiplier = fire_mode.weapon.damagePerShot_m["multishot_multiplier"]
+        cdef double multishot_damage = fire_mode.multishot_damage
+        cdef long long damage_version = fire_mode.damage_version
+        key = (fire_mode, bodypart, damage_tag)
+        table = self.damage_tables.get(key)
+        if table is not None and table.state_version == self.table_version and table.damage_version == damage_version and \
+                table.multishot_multiplier == multishot_multiplier and table.multishot_damage == multishot_damage and table.animation == self.current_animation:
+            return table
+
+        table = DamageTable()
+        table.state_version = self.table_version
+        table.damage_version = damage_version
+        table.animation = self.current_animation
+        table.multishot_multiplier = multishot_multiplier
+        table.multishot_damage = multishot_damage
+        table.has_lanes = False
+
         cdef float multiplier = 1
         cdef float bodypart_multiplier = <float>self.bodypart_multipliers.get(bodypart, {}).get('multiplier', 1)
         if damage_tag == 'radial' and bodypart == 'head':
@@ -181,40 +461,103 @@ class Unit:
         cdef float faction_bonus = (1 + <float>fire_mode.weapon.factionDamage_m["base"])
         multiplier *= faction_bonus
 
-        og, sg, hg = self.remove_protection(fire_mode, damage * multiplier, critical_multiplier)
+        table.multiplier = multiplier
+        self.damage_tables[key] = table
+        return table
+
+    cdef int fill_table_lanes(self, DamageTable table, const float[:] damage) except -1:
+        cdef int i
+        cdef const float[:] modifier
+        cdef float total_damage_multiplier, vulnerability
+        check_lanes(damage)
+        for i in range(DAMAGE_LANES):
+            table.scaled[i] = damage[i] * table.multiplier
+
+        modifier = self.overguard.modifier_lanes
+        total_damage_multiplier = <float>self.overguard.total_damage_multiplier
+        for i in range(DAMAGE_LANES):
+            table.overguard[i] = (table.scaled[i] * modifier[i]) * total_damage_multiplier
+
+        modifier = self.shield.modifier_lanes
+        total_damage_multiplier = <float>self.shield.total_damage_multiplier
+        vulnerability = <float>self.shield_vulnerability
+        for i in range(DAMAGE_LANES):
+            table.shield[i] = ((table.scaled[i] * modifier[i]) * total_damage_multiplier) * vulnerability
+
+        modifier = self.health.modifier_lanes
+        total_damage_multiplier = <float>self.health.total_damage_multiplier
+        vulnerability = <float>self.health_vulnerability
+        for i in range(DAMAGE_LANES):
+            table.health[i] = (((table.scaled[i] * self.armor_dr_lanes[i]) * modifier[i]) * total_damage_multiplier) * vulnerability
+
+        table.has_lanes = True
+        return 0
+
+    cdef float apply_damage_lanes(self, fire_mode:FireMode, DamageTable table, const float* scaled, float critical_multiplier, bint use_table) except? -1:
+        # scaled is the damage after the table multiplier, use_table when it is table.scaled and the layer lanes can be reused
+        cdef double ratio
+        self.remove_protection_lanes(fire_mode, scaled, critical_multiplier, table if use_table else None)
 
         if self.health.current_value <= 0 and self.overguard.current_value <= 0:
-            return multiplier
+            return table.multiplier
         
         if self.overguard.current_value < 0:
-            ratio = abs(self.overguard.current_value/og)
+            ratio = abs(self.overguard.current_value/self.removed[0])
             self.overguard.current_value = 0
-            og, sg, hg = self.remove_protection(fire_mode, damage * multiplier * ratio, 1)
+            scale_lanes(scaled, <float>ratio, self.overflow_damage)
+            self.remove_protection_lanes(fire_mode, self.overflow_damage, 1, None)
 
             if self.shield.current_value < 0:
-                ratio = abs(self.shield.current_value/sg)
+                ratio = abs(self.shield.current_value/self.removed[1])
                 self.shield.current_value = 0
-                self.remove_protection(fire_mode, damage * multiplier * ratio, 1) 
+                scale_lanes(scaled, <float>ratio, self.overflow_damage)
+                self.remove_protection_lanes(fire_mode, self.overflow_damage, 1, None)
 
         elif self.shield.current_value < 0:
-            ratio = abs(self.shield.current_value/sg)
+            ratio = abs(self.shield.current_value/self.removed[1])
             self.shield.current_value = 0
-            self.remove_protection(fire_mode, damage * multiplier * ratio, 1)
+            scale_lanes(scaled, <float>ratio, self.overflow_damage)
+            self.remove_protection_lanes(fire_mode, self.overflow_damage, 1, None)
         
-        return multiplier
+        return table.multiplier
     
-    def remove_protection(self, fire_mode: FireMode, damage:np.array, critical_multiplier):
-        overguard = self.overguard.current_value
-        shield = self.shield.current_value
-        health = self.health.current_value
+    cpdef tuple remove_protection(self, fire_mode: FireMode, const float[:] damage, float critical_multiplier):
+        cdef int i
+        check_lanes(damage)
+        for i in range(DAMAGE_LANES):
+            self.overflow_damage[i] = damage[i]
+        self.remove_protection_lanes(fire_mode, self.overflow_damage, critical_multiplier, None)
+        return self.removed[0], self.removed[1], self.removed[2]
+
+    cdef int remove_protection_lanes(self, fire_mode: FireMode, const float* damage, float critical_multiplier, DamageTable table) except -1:
+        '''
+        Removes the damage from the top protection layer and stores the removed overguard, shield and health in self.removed.
+        Each lane is scaled, reduced and summed in one pass in the same float32 order as the equivalent numpy expressions.
+        When a damage table is given its precomputed layer lanes are used instead of scaling damage.
+        '''
+        cdef double overguard = self.overguard.current_value
+        cdef double shield = self.shield.current_value
+        cdef double health = self.health.current_value
         cdef float dr = 1
         cdef float applied_damage = 0
         cdef float accumulated_applied_damage = 0
+        cdef float health_damage
+        cdef float total_damage_multiplier, vulnerability
+        cdef const float[:] modifier
+        cdef const float* layer
+        cdef int i
 
         if self.overguard.current_value > 0:
-            tot_damage = damage * self.overguard.modifier * self.overguard.total_damage_multiplier
-            dr = self.damage_controller.func(fire_mode, tot_damage, critical_multiplier) 
-            applied_damage = np.sum(tot_damage * dr * critical_multiplier)
+            if table is not None:
+                layer = table.overguard
+            else:
+                modifier = self.overguard.modifier_lanes
+                total_damage_multiplier = <float>self.overguard.total_damage_multiplier
+                for i in range(DAMAGE_LANES):
+                    self.layer_damage[i] = (damage[i] * modifier[i]) * total_damage_multiplier
+                layer = self.layer_damage
+            dr = self.damage_controller.damage_reduction_lanes(fire_mode, layer, DAMAGE_LANES, critical_multiplier)
+            applied_damage = reduced_sum(layer, dr, critical_multiplier, self.layer_damage)
             self.overguard.current_value -= applied_damage
             if self.overguard.current_value <= 0:
                 self.proc_controller.cold_proc_manager.max_stacks = self.proc_info['PT_COLD']['max_stacks']
@@ -222,78 +565,120 @@ class Unit:
             accumulated_applied_damage += applied_damage
         elif self.shield.current_value > 0: # TODO
             if damage[6] > 0:
-                health_damage = damage[6] * self.armor_dr[6] * self.health.modifier[6] * self.health.total_damage_multiplier * self.health_vulnerability
-                dr = self.damage_controller.func(fire_mode, health_damage, critical_multiplier) * critical_multiplier
-                applied_damage = health_damage * dr * critical_multiplier
+                if table is not None:
+                    health_damage = table.health[6]
+                else:
+                    health_damage = (((damage[6] * self.armor_dr_lanes[6]) * self.health.modifier_lanes[6]) * <float>self.health.total_damage_multiplier) * <float>self.health_vulnerability
+                dr = self.damage_controller.damage_reduction_lanes(fire_mode, &health_damage, 1, critical_multiplier) * critical_multiplier
+                applied_damage = (health_damage * dr) * critical_multiplier
                 self.health.current_value -= applied_damage
                 accumulated_applied_damage += applied_damage
 
-            shield_damage = damage * self.shield.modifier * self.shield.total_damage_multiplier * self.shield_vulnerability
-            dr = self.damage_controller.func(fire_mode, shield_damage, critical_multiplier) 
-            applied_damage = np.sum(shield_damage * dr * critical_multiplier)
+            if table is not None:
+                layer = table.shield
+            else:
+                modifier = self.shield.modifier_lanes
+                total_damage_multiplier = <float>self.shield.total_damage_multiplier
+                vulnerability = <float>self.shield_vulnerability
+                for i in range(DAMAGE_LANES):
+                    self.layer_damage[i] = ((damage[i] * modifier[i]) * total_damage_multiplier) * vulnerability
+                layer = self.layer_damage
+            dr = self.damage_controller.damage_reduction_lanes(fire_mode, layer, DAMAGE_LANES, critical_multiplier)
+            applied_damage = reduced_sum(layer, dr, critical_multiplier, self.layer_damage)
             self.shield.current_value -= applied_damage
             accumulated_applied_damage += applied_damage
         else:
-            health_damage = damage * self.armor_dr * self.health.modifier * self.health.total_damage_multiplier * self.health_vulnerability
-            dr = self.damage_controller.func(fire_mode, health_damage, critical_multiplier)
-            applied_damage = np.sum(health_damage * dr * critical_multiplier) 
+            if table is not None:
+                layer = table.health
+            else:
+                modifier = self.health.modifier_lanes
+                total_damage_multiplier = <float>self.health.total_damage_multiplier
+                vulnerability = <float>self.health_vulnerability
+                for i in range(DAMAGE_LANES):
+                    self.layer_damage[i] = (((damage[i] * self.armor_dr_lanes[i]) * modifier[i]) * total_damage_multiplier) * vulnerability
+                layer = self.layer_damage
+            dr = self.damage_controller.damage_reduction_lanes(fire_mode, layer, DAMAGE_LANES, critical_multiplier)
+            applied_damage = reduced_sum(layer, dr, critical_multiplier, self.layer_damage)
             accumulated_applied_damage += applied_damage
             self.health.current_value -= applied_damage
 
         self.last_damage = accumulated_applied_damage
-        # return applied damage
-        return overguard - self.overguard.current_value, shield - self.shield.current_value, health - self.health.current_value
+        self.removed[0] = overguard - self.overguard.current_value
+        self.removed[1] = shield - self.shield.current_value
+        self.removed[2] = health - self.health.current_value
+        return 0
     
-    def get_critical_multiplier(self, fire_mode:FireMode, bodypart:str):
+    cpdef float get_critical_multiplier(self, fire_mode:FireMode, str bodypart) except? -1:
         cdef float bodypart_crit_bonus = <float>1
         cdef float animation_crit_bonus = <float>1
         cdef float criticalMultiplier_cold = <float>0
         cdef float base_critical_multiplier = <float>1
         cdef float effective_critical_multiplier = <float>1
         
-        puncture_count = self.proc_controller.puncture_proc_manager.count
+        puncture_count = self.proc_controller.puncture_proc_manager.get_count()
         criticalChance_puncture = 0 if fire_mode.radial else puncture_count * 0.05
         critical_chance = fire_mode.criticalChance.modded + criticalChance_puncture
-        critical_tier = int(critical_chance) + int(random() < critical_chance % 1)
+        critical_tier = self.rng.get_tier(critical_chance)
         # self.damage_controller.critical_tier = critical_tier
 
         if critical_tier > 0:
             bodypart_crit_bonus = <float>1 if fire_mode.radial else self.bodypart_multipliers.get(bodypart, {}).get('critical_damage_multiplier', 1)
             animation_crit_bonus = <float>1 if fire_mode.radial else self.animation_multipliers.get(self.current_animation, {}).get('critical_damage_multiplier', 1)
 
-            cold_count = self.proc_controller.cold_proc_manager.count
+            cold_count = self.proc_controller.cold_proc_manager.get_count()
             criticalMultiplier_cold = 0 if fire_mode.radial else <float>min(1, cold_count) * <float>0.1 + <float>max(0, cold_count-1) * <float>0.05
             base_critical_multiplier = (fire_mode.criticalMultiplier.modded + criticalMultiplier_cold) * bodypart_crit_bonus * <float>fire_mode.weapon.criticalMultiplier_m["final_multiplier"]
-            effective_critical_multiplier = self.damage_controller.cc_func(base_critical_multiplier, critical_tier)
+            effective_critical_multiplier = self.damage_controller.tier_critical_multiplier(base_critical_multiplier, critical_tier)
             return effective_critical_multiplier
         else:
-            effective_critical_multiplier = self.damage_controller.cc_func(fire_mode.criticalMultiplier.modded, critical_tier)
+            effective_critical_multiplier = self.damage_controller.tier_critical_multiplier(fire_mode.criticalMultiplier.modded, critical_tier)
             return effective_critical_multiplier
 
-    def apply_status(self, fire_mode:FireMode, status_damage: float, bodypart:str):
+    cdef ProcTable get_proc_table(self, fire_mode:FireMode):
+        cdef ProcTable table = self.proc_tables.get(fire_mode)
+        probabilities = fire_mode.procProbabilities
+        if table is None or table.probabilities is not probabilities:
+            table = ProcTable(probabilities)
+            self.proc_tables[fire_mode] = table
+        return table
+
+    cpdef apply_status(self, fire_mode:FireMode, float status_damage, str bodypart):
+        '''
+        Rolls the status procs of a pellet, then applies each proc type once with its count.
+        '''
+        cdef ProcTable table
+        cdef int counts[DAMAGE_LANES + 1]
+        cdef int i, status_tier
+        cdef int status_procced = 0
+        cdef double roll
         total_status_chance = fire_mode.procChance.modded * fire_mode.weapon.procChance_m['multishot_multiplier']
-        status_tier = int(total_status_chance) + int(random() < (total_status_chance) % 1)
-        status_procced = 0
-
-        for _ in range(status_tier):
-            roll = random()
-            for i, effect_chance in enumerate(fire_mode.procProbabilities):
-                if roll < effect_chance:
-                    self.proc_controller.add_proc(i, fire_mode, status_damage, bodypart)
-                    status_procced += 1
-                    break
-                else:
-                    roll -= effect_chance
-        
-        for proc_index in fire_mode.forcedProc:
-            self.proc_controller.add_proc(proc_index, fire_mode, status_damage, bodypart)
-            status_procced += 1
+        status_tier = self.rng.get_tier(total_status_chance)
+        forced_procs = fire_mode.forcedProc
+
+        if status_tier > 0 or len(forced_procs) > 0:
+            for i in range(DAMAGE_LANES + 1):
+                counts[i] = 0
+            if status_tier > 0:
+                table = self.get_proc_table(fire_mode)
+                for _ in range(status_tier):
+                    # one draw per roll even when nothing can proc
+                    roll = self.rng.random()
+                    if table.size > 0:
+                        counts[table.sample(roll)] += 1
+            for proc_index in forced_procs:
+                if proc_index < 0 or proc_index >= DAMAGE_LANES:
+                    raise IndexError(f"Forced proc index {proc_index} out of range")
+                counts[proc_index] += 1
+            for i in range(DAMAGE_LANES):
+                if counts[i] > 0:
+                    self.proc_controller.add_procs(i, fire_mode, status_damage, bodypart, counts[i])
+                    status_procced += counts[i]
 
         encumber_chance = fire_mode.weapon.special_m['encumber_chance']
         if status_procced>0 and fire_mode.weapon.last_encumber_time != self.simulation.time and encumber_chance > 0:
-            encumber_tier = int(encumber_chance) + int(random() < (encumber_chance) % 1)
+            encumber_tier = self.rng.get_tier(encumber_chance)
             for _ in range(encumber_tier):
-                self.proc_controller.add_proc(randint(3, 12), fire_mode, 1, bodypart)
+                self.proc_controller.add_proc(self.rng.randint(3, 12), fire_mode, 1, bodypart)
                 fire_mode.weapon.last_encumber_time = self.simulation.time
     
     def get_current_stats(self):
@@ -313,7 +698,10 @@ class Unit:
         return vals
     
     def get_last_crit_info(self):
-        return f"Crit Tier {self.damage_controller.critical_tier}, Crit Mult = {self.damage_controller.tiered_critical_multiplier:.3f}"
+        return CRIT_INFO.format(self.damage_controller.critical_tier, self.damage_controller.tiered_critical_multiplier)
+
+    def get_last_crit_info_args(self):
+        return CRIT_INFO, self.damage_controller.critical_tier, self.damage_controller.tiered_critical_multiplier
     
     def apply_corrosive_armor_strip(self, proc_manager:pm.DefaultProcManager):
         armor_strip = const.CORROSIVE_ARMOR_STRIP[proc_manager.count]
@@ -327,7 +715,23 @@ class Unit:
         debuff = const.MAGNETIC_DEBUFF[proc_manager.count]
         self.shield.set_damage_multiplier("Magnetic debuff", debuff)
 
-class Protection:
+cdef class Protection:
+    cdef public Unit unit
+    cdef public double base
+    cdef public double modified_base
+    cdef public str protection_type
+    cdef public str protection_type_variant
+    cdef public object modifier
+    cdef const float[:] modifier_lanes
+    cdef public double level_multiplier
+    cdef public double max_value
+    cdef public double current_value
+    cdef public double bonus
+    cdef public dict mission_multipliers
+    cdef public dict value_multipliers
+    cdef public dict damage_multipliers
+    cdef public double total_damage_multiplier
+
     def __init__(self, unit: Unit, base, protection_type: str, protection_type_variant: str) -> None:
         self.unit = unit
 
@@ -337,6 +741,7 @@ class Protection:
         self.protection_type = protection_type
         self.protection_type_variant = protection_type_variant
         self.modifier = const.modifiers[self.protection_type_variant]
+        self.modifier_lanes = self.modifier
         self.level_multiplier = self.get_level_multiplier()
 
         self.max_value =(self.base * self.level_multiplier)
@@ -351,13 +756,25 @@ class Protection:
     def reset(self):
         self.modified_base = self.base
         self.max_value = (self.base * self.level_multiplier * self.bonus)
-        self.current_value = self.max_value * math.prod([<float>f for f in self.mission_multipliers.values()])
-        self.value_multipliers = {}
-        self.damage_multipliers = {}
+        self.current_value = self.max_value * math.prod([<float>f for f in self.mission_multipliers.values()]) if self.mission_multipliers else self.max_value
+        self.value_multipliers.clear()
+        self.damage_multipliers.clear()
         self.total_damage_multiplier = <float>1
+        self.unit.table_version += 1
         if self.protection_type == 'armor':
             self.unit.set_armor_dr()
 
+    def get_state(self):
+        return (self.modified_base, self.max_value, self.current_value, self.bonus, dict(self.mission_multipliers),
+                dict(self.value_multipliers), dict(self.damage_multipliers), self.total_damage_multiplier)
+
+    def set_state(self, state):
+        self.modified_base, self.max_value, self.current_value, self.bonus, mission_multipliers, value_multipliers, damage_multipliers, \
+            self.total_damage_multiplier = state
+        self.mission_multipliers = dict(mission_multipliers)
+        self.value_multipliers = dict(value_multipliers)
+        self.damage_multipliers = dict(damage_multipliers)
+
     # ex. shattering impact, mag's 3
     def remove_base_value(self, value):
         pct = self.current_value/self.max_value
@@ -442,10 +859,32 @@ class Protection:
     def set_damage_multiplier(self, name, value):
         self.damage_multipliers[name] = value
         self.total_damage_multiplier = <float>math.prod([<float>f for f in self.damage_multipliers.values()])
+        self.unit.table_version += 1
+
+cdef class ProcController():
+    cdef public Unit enemy
+    cdef public object impact_proc_manager
+    cdef public object puncture_proc_manager
+    cdef public object slash_proc_manager
+    cdef public object heat_proc_manager
+    cdef public object cold_proc_manager
+    cdef public object electric_proc_manager
+    cdef public object toxin_proc_manager
+    cdef public object blast_proc_manager
+    cdef public object radiation_proc_manager
+    cdef public object gas_proc_manager
+    cdef public object magnetic_proc_manager
+    cdef public object viral_proc_manager
+    cdef public object corrosive_proc_manager
+    cdef public object void_proc_manager
+    cdef public object knockdown_proc_manager
+    cdef public object microwave_proc_manager
+    cdef public list proc_managers
+    cdef public object dot_clock
 
-class ProcController():
     def __init__(self, enemy: Unit) -> None:
         self.enemy = enemy
+        self.dot_clock = pm.DotClock(enemy)
         self.impact_proc_manager = pm.DefaultProcManager(enemy, const.PT_INDEX['PT_IMPACT'])
         self.puncture_proc_manager = pm.DefaultProcManager(enemy, const.PT_INDEX['PT_PUNCTURE'])
         self.slash_proc_manager = pm.ContainerizedProcManager(enemy, const.PT_INDEX['PT_SLASH'])
@@ -463,38 +902,98 @@ class ProcController():
         self.knockdown_proc_manager = pm.DefaultProcManager(enemy, const.PT_INDEX['PT_KNOCKDOWN'])
         self.microwave_proc_manager = pm.DefaultProcManager(enemy, const.PT_INDEX['PT_MICROWAVE'])
 
-        self.proc_managers: List[pm.DefaultProcManager] = [self.impact_proc_manager, self.puncture_proc_manager, self.slash_proc_manager,
+        self.proc_managers = [self.impact_proc_manager, self.puncture_proc_manager, self.slash_proc_manager,
                                 self.heat_proc_manager, self.cold_proc_manager, self.electric_proc_manager,
                                 self.toxin_proc_manager, self.blast_proc_manager, self.radiation_proc_manager,
                                 self.gas_proc_manager, self.magnetic_proc_manager, self.viral_proc_manager,
                                 self.corrosive_proc_manager, self.void_proc_manager, self.knockdown_proc_manager, self.microwave_proc_manager]
 
-    def add_proc(self, proc_index:int, fire_mode:FireMode, status_damage: float, bodypart:str):
+    cpdef add_proc(self, int proc_index, fire_mode:FireMode, status_damage, bodypart):
         self.proc_managers[proc_index].add_proc(fire_mode, status_damage, bodypart)
 
+    cpdef add_procs(self, int proc_index, fire_mode:FireMode, status_damage, bodypart, int count):
+        self.proc_managers[proc_index].add_procs(fire_mode, status_damage, bodypart, count)
+
+    def expire_procs(self):
+        for pm in self.proc_managers:
+            pm.get_count()
+
     def reset(self):
+        self.dot_clock.reset()
         for pm in self.proc_managers:
             pm.reset()
 
-class DamageController():
+    def get_state(self):
+        return self.dot_clock.get_state(), tuple(pm.get_state() for pm in self.proc_managers)
+
+    def set_state(self, state):
+        clock_state, pm_states = state
+        self.dot_clock.set_state(clock_state)
+        for pm, pm_state in zip(self.proc_managers, pm_states):
+            pm.set_state(pm_state)
+
+cdef class DamageController():
+    cdef public Unit enemy
+    cdef public int controller
+    cdef public int critical_controller
+    cdef public double critical_multiplier
+    cdef public double tiered_critical_multiplier
+    cdef public double unmodified_tiered_critical_multiplier
+    cdef public int critical_tier
+    cdef float scaled_damage[DAMAGE_LANES]
+
     def __init__(self, enemy: Unit) -> None:
         self.enemy = enemy
-        self.name_controller = {"DC_NONE":self.normal, "DC_STATIC_DPS_DEMOLISHER":self.static_dps_demolisher, "DC_STATIC_DPS_ACOLYTE":self.static_dps_acolyte, "DC_DYNAMIC_DPS_ARCHON":self.dynamic_dps_archon, "DC_DYNAMIC_DPS_FRAGMENTED":self.dynamic_dps_fragmented, "DC_DYNAMIC_DPS_NECRAMITE":self.dynamic_dps_necramite}
-        self.name_crit_controller = {"CC_NONE":self.crit_controller_none, "CC_ACOLYTE":self.crit_controller_acolyte}
-        self.func = self.name_controller[enemy.damage_controller_type]
-        self.cc_func = self.name_crit_controller[enemy.critical_controller_type]
+        self.controller = DAMAGE_CONTROLLERS[enemy.damage_controller_type]
+        self.critical_controller = CRITICAL_CONTROLLERS[enemy.critical_controller_type]
         self.critical_multiplier = <float>1
         self.tiered_critical_multiplier = <float>1
         self.unmodified_tiered_critical_multiplier = <float>1
         self.critical_tier = 0
-        
 
-    def normal(self, fire_mode: FireMode, damage: np.array, *args):
-        self.enemy.last_t0_damage = np.sum(damage)
+    def get_state(self):
+        return self.critical_multiplier, self.tiered_critical_multiplier, self.unmodified_tiered_critical_multiplier, self.critical_tier
+
+    def set_state(self, state):
+        self.critical_multiplier, self.tiered_critical_multiplier, self.unmodified_tiered_critical_multiplier, self.critical_tier = state
+
+    cpdef float damage_reduction(self, fire_mode: FireMode, const float[:] damage, float critical_multiplier) except? -1:
+        cdef float lanes[DAMAGE_LANES]
+        cdef int i, n = min(damage.shape[0], DAMAGE_LANES)
+        for i in range(n):
+            lanes[i] = damage[i]
+        return self.damage_reduction_lanes(fire_mode, lanes, n, critical_multiplier)
+
+    cdef float damage_reduction_lanes(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        if self.controller == DC_NONE:
+            return self.normal(fire_mode, damage, n, critical_multiplier)
+        elif self.controller == DC_STATIC_DPS_DEMOLISHER:
+            return self.static_dps_demolisher(fire_mode, damage, n, critical_multiplier)
+        elif self.controller == DC_STATIC_DPS_ACOLYTE:
+            return self.static_dps_acolyte(fire_mode, damage, n, critical_multiplier)
+        elif self.controller == DC_DYNAMIC_DPS_ARCHON:
+            return self.dynamic_dps_archon(fire_mode, damage, n, critical_multiplier)
+        elif self.controller == DC_DYNAMIC_DPS_FRAGMENTED:
+            return self.dynamic_dps_fragmented(fire_mode, damage, n, critical_multiplier)
+        return self.dynamic_dps_necramite(fire_mode, damage, n, critical_multiplier)
+
+    cdef float scaled_sum(self, const float* damage, int n, float scale_1, float scale_2) noexcept:
+        cdef int i
+        for i in range(n):
+            self.scaled_damage[i] = (damage[i] * scale_1) * scale_2
+        return pairwise_sum(self.scaled_damage, n)
+
+    cpdef float tier_critical_multiplier(self, double critical_multiplier, int critical_tier) except? -1:
+        if self.critical_controller == CC_ACOLYTE:
+            return self.crit_controller_acolyte(critical_multiplier, critical_tier)
+        return self.crit_controller_none(critical_multiplier, critical_tier)
+
+    cdef float normal(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
         return <float>1
 
-    def static_dps_demolisher(self, fire_mode: FireMode, damage: np.array, critical_multiplier:float):
-        cdef float tier_min = (<float>1-<float>1/max(1,self.critical_tier))
+    cdef float static_dps_demolisher(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        cdef float tier_min = (<float>1-<float>1/<double>max(1,self.critical_tier))
         cdef float dps_reducer = (tier_min/(self.critical_multiplier-tier_min) + <float>1)
 
         # Weird shotgun mechanic
@@ -502,9 +1001,9 @@ class DamageController():
         dps_multiplier = <float>1 if dps_multiplier==0 else dps_multiplier # lanka shenans
         dps_multiplier = dps_multiplier/<float>2 if fire_mode.multishot.base > 1 else dps_multiplier
         dps_multiplier = dps_multiplier / dps_reducer
-        cdef float tier0_dps = np.sum(damage * dps_multiplier)
+        cdef float tier0_dps = self.scaled_sum(damage, n, dps_multiplier, 1)
 
-        self.enemy.last_t0_damage = np.sum(damage)
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
 
         cdef float dr = 1
         if tier0_dps >= 1000 and tier0_dps <= 2500:
@@ -519,8 +1018,8 @@ class DamageController():
             dr = <float>0.1+<float>5950/tier0_dps
         return dr
     
-    def static_dps_acolyte(self, fire_mode: FireMode, damage: np.array, critical_multiplier:float):
-        cdef float tier_min = (<float>1-<float>1/max(1,self.critical_tier))
+    cdef float static_dps_acolyte(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        cdef float tier_min = (<float>1-<float>1/<double>max(1,self.critical_tier))
         cdef float dps_reducer = (tier_min/(self.critical_multiplier-tier_min) + <float>1)
 
         cdef float dps_multiplier = fire_mode.fireRate.modded * fire_mode.multishot.modded
@@ -528,9 +1027,9 @@ class DamageController():
         dps_multiplier = dps_multiplier/<float>2 if fire_mode.multishot.base > 1 else dps_multiplier
 
         dps_multiplier = dps_multiplier / dps_reducer
-        cdef float tier0_dps = np.sum(damage * dps_multiplier)
+        cdef float tier0_dps = self.scaled_sum(damage, n, dps_multiplier, 1)
 
-        self.enemy.last_t0_damage = np.sum(damage)
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
 
         cdef float dr = 1
         if tier0_dps >= 3000 and tier0_dps <= 7500:
@@ -541,31 +1040,31 @@ class DamageController():
             dr = <float>14600/tier0_dps
         return dr
     
-    def dynamic_dps_archon(self, fire_mode: FireMode, damage: np.array, critical_multiplier:float):
-        cdef float dpt = np.sum(damage) * critical_multiplier * <float>fire_mode.multishot.modded
-        self.enemy.last_t0_damage = np.sum(damage)
+    cdef float dynamic_dps_archon(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        cdef float dpt = pairwise_sum(damage, n) * critical_multiplier * <float>fire_mode.multishot.modded
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
 
         cdef float cap = 460e3
         cdef float dr = <float>1/(<float>1 + <float>(dpt/cap))
         return dr
     
-    def dynamic_dps_fragmented(self, fire_mode: FireMode, damage: np.array, critical_multiplier:float):
-        cdef float dpt = np.sum(damage * <float>fire_mode.multishot.modded * critical_multiplier)
-        self.enemy.last_t0_damage = np.sum(damage)
+    cdef float dynamic_dps_fragmented(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        cdef float dpt = self.scaled_sum(damage, n, <float>fire_mode.multishot.modded, critical_multiplier)
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
 
         cdef float cap = 175e3
         cdef float dr = <float>1/(<float>1+(dpt)/cap)
         return dr
     
-    def dynamic_dps_necramite(self, fire_mode: FireMode, damage: np.array, critical_multiplier:float):
-        cdef float dpt = np.sum(damage * <float>fire_mode.multishot.modded * critical_multiplier)
-        self.enemy.last_t0_damage = np.sum(damage)
+    cdef float dynamic_dps_necramite(self, fire_mode: FireMode, const float* damage, int n, float critical_multiplier) except? -1:
+        cdef float dpt = self.scaled_sum(damage, n, <float>fire_mode.multishot.modded, critical_multiplier)
+        self.enemy.last_t0_damage = pairwise_sum(damage, n)
 
         cdef float cap = self.enemy.controller_value
         cdef float dr = <float>1/(<float>1+(dpt)/cap)
         return dr
     
-    def crit_controller_none(self, critical_multiplier, critical_tier):
+    cdef float crit_controller_none(self, double critical_multiplier, int critical_tier) except? -1:
         self.critical_tier = critical_tier
         self.critical_multiplier = critical_multiplier
 
@@ -580,7 +1079,7 @@ class DamageController():
         self.unmodified_tiered_critical_multiplier = self.tiered_critical_multiplier
         return self.tiered_critical_multiplier
     
-    def crit_controller_acolyte(self, critical_multiplier, critical_tier):
+    cdef float crit_controller_acolyte(self, double critical_multiplier, int critical_tier) except? -1:
         self.critical_tier = critical_tier
         self.critical_multiplier = critical_multiplier
 
@@ -592,7 +1091,7 @@ class DamageController():
         cdef float tier_1 = (critical_multiplier - <float>1) * <float>0.5 + <float>1
         cdef float tier_increase = tier_1/(<float>1 + <float>1/(critical_multiplier - <float>1))
 
-        cdef float tiered_critical_multiplier = tier_1 + (critical_tier-<float>1) * tier_increase
+        cdef float tiered_critical_multiplier = tier_1 + (<double>critical_tier-<float>1) * tier_increase
         self.tiered_critical_multiplier = tiered_critical_multiplier
 
         cdef float unmodified_tiered_critical_multiplier = (critical_multiplier-<float>1)*critical_tier + <float>1
@@ -6,17 +6,99 @@ from pathlib import Path
 import json
 import re
 import warframe_simulacrum.constants as const
-import heapq
+import warframe_simulacrum.catalog as catalog
+import warframe_simulacrum.events as ev
 import copy
 import collections.abc
+import itertools
 
-from random import random
 from typing import List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from warframe_simulacrum.simulation import Simulacrum
     from warframe_simulacrum.unit import Unit
 
+# stat group -> weapon mod dicts it is computed from
+MOD_GROUPS = {
+    "damage": ("damagePerShot_m", "impact_m", "puncture_m", "slash_m", "heat_m", "cold_m", "electric_m", "toxin_m",
+               "blast_m", "radiation_m", "gas_m", "magnetic_m", "viral_m", "corrosive_m", "combineElemental_m"),
+    "crit": ("criticalChance_m", "criticalMultiplier_m"),
+    "multishot": ("multishot_m", "damagePerShot_m"),
+    "status": ("procChance_m",),
+    "fire_rate": ("fireRate_m", "reloadTime_m", "ammoCost_m"),
+    "magazine": ("magazineSize_m",),
+}
+# Parameters each group writes
+GROUP_PARAMETERS = {
+    "damage": ("damagePerShot", "totalDamage"),
+    "crit": ("criticalChance", "criticalMultiplier"),
+    "multishot": ("multishot",),
+    "status": ("procChance",),
+    "fire_rate": ("fireRate", "fireTime", "reloadTime", "chargeTime", "embedDelay", "ammoCost"),
+    "magazine": ("magazineSize",),
+}
+PARAMETER_STATE = ("base_modified", "modded")
+DAMAGE_PARAMETER_STATE = ("base_modified", "base_total", "base_proportions", "proportions", "quantized", "modded")
+MODIFY_PARAMETER_STATE = ("modded",)
+# written on every trigger of HELD weapons, not read by apply_mods
+RUNTIME_MOD_KEYS = frozenset(("multishot_multiplier",))
+
+_mod_versions = itertools.count(1)
+
+
+class ModDict(dict):
+    '''
+    Mod values of one stat, stamped with a new version whenever a value changes so fire modes can tell which stat groups are stale.
+    Versions come from one counter, so replacing a ModDict also reads as a change.
+    '''
+    def __init__(self, *args, **kwargs) -> None:
+        dict.__init__(self, *args, **kwargs)
+        self.version = next(_mod_versions)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        if key not in RUNTIME_MOD_KEYS:
+            self.version = next(_mod_versions)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.version = next(_mod_versions)
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.version = next(_mod_versions)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.version = next(_mod_versions)
+        return dict.setdefault(self, key, default)
+
+    def pop(self, *args):
+        self.version = next(_mod_versions)
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.version = next(_mod_versions)
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self.version = next(_mod_versions)
+
+    def __reduce__(self):
+        return (ModDict, (dict(self),))
+
+
+def get_mod_key(weapon:Weapon, names):
+    # None when a mod dict was replaced by a plain dict, whose changes cannot be seen
+    key = []
+    for name in names:
+        mods = getattr(weapon, name)
+        if not isinstance(mods, ModDict):
+            return None
+        key.append(mods.version)
+    return tuple(key)
+
 
 class Weapon():
     def __init__(self, name:str, ui, simulation:Simulacrum) -> None:
@@ -63,21 +145,18 @@ class Weapon():
 
         self.special_m = {"encumber_chance":0, "attrition_chance":0}
 
+        for attr, value in list(vars(self).items()):
+            if attr.endswith('_m') and isinstance(value, dict):
+                setattr(self, attr, ModDict(value))
+
         self.last_encumber_time = 0
 
     
     def get_weapon_data(self):
-        current_folder = Path(__file__).parent.resolve()
-        with open(os.path.join(current_folder, "data", "ExportWeapons.json"), 'r') as f:
-            weapon_data = json.load(f)
-
-        return weapon_data.get(self.name, {})
+        return catalog.get_weapon_data(self.name)
     
     def update_data(self):
-        current_folder = Path(__file__).parent.resolve()
-        with open(os.path.join(current_folder, "data", "ExportWeapons.json"), 'r') as f:
-            weapon_data = json.load(f)
-        self.data = weapon_data.get(self.name, {})
+        self.data = catalog.get_weapon_data(self.name)
         # default_data = copy.deepcopy(const.DEFAULT_WEAPON_CONFIG)
         # self.data = update(default_data, data)
 
@@ -106,7 +185,7 @@ class Weapon():
             if isinstance(getattr(self, attr), dict):
                 getattr(self, attr).update( mods.get(attr, {}) )
 
-        self.combineElemental_m = mods.get("combineElemental_m", {"indices":[]})
+        self.combineElemental_m = ModDict(mods.get("combineElemental_m", {"indices":[]}))
         self.apply_mods()
     
     def apply_mods(self):
@@ -150,11 +229,16 @@ class FireMode():
         self.unique_proc_count = 0
         self.condition_overloaded = False
         self.multishot_damage = <float>0
+        # bumped whenever damagePerShot.modded is recomputed, units cache damage tables against it
+        self.damage_version = 0
 
         # self.fire_mode_effects:List[FireModeEffect] = [FireModeEffect(self, name) for name in self.data.get("secondaryEffects", {})]
         self.fire_mode_effects:dict = {f'{name}':FireModeEffect(self, name) for name in self.data.get("secondaryEffects", {})}
 
         self.target_bodypart = 'body'
+        # stat group -> mod dict versions and saved Parameter state from the last recompute
+        self.mod_keys = {}
+        self.mod_state = {}
 
 
     def get_preview_info(self):
@@ -184,31 +268,99 @@ class FireMode():
         return info
 
     def reset(self):
+        '''
+        Restores the runtime counters and brings the modded stats up to date, recomputing only the stat groups whose mods changed.
+        '''
         self.attack_index = 1
         self.unique_proc_count = 0
         self.multishot_damage = <float>0
-        self.damagePerShot.reset()
-        self.criticalChance.reset()
-        self.criticalMultiplier.reset()
-        self.procChance.reset()
-        self.magazineSize.reset()
-        self.fireRate.reset()
-        self.fireTime.reset()
-        self.reloadTime.reset()
-        self.multishot.reset()
-        self.ammoCost.reset()
-        self.chargeTime.reset()
-        self.embedDelay.reset()
         self.forcedProc = self.data.get("forcedProc", [])
+        self.update_mods()
+        self.magazineSize.current = self.magazineSize.base
+
+    def update_mods(self):
+        for group, names in MOD_GROUPS.items():
+            key = get_mod_key(self.weapon, names)
+            if key is None or key != self.mod_keys.get(group):
+                self.apply_mod_group(group)
+                self.mod_keys[group] = key
+                self.mod_state[group] = [self.save_group(fire_mode, group) for fire_mode in self.get_group_fire_modes()]
+            else:
+                for fire_mode, state in zip(self.get_group_fire_modes(), self.mod_state[group]):
+                    self.restore_group(fire_mode, group, state)
+
+    def invalidate_mods(self):
+        '''
+        Forces a full recompute on the next reset, for changes the mod dicts do not see such as edited base stats.
+        '''
+        self.mod_keys = {}
+        self.mod_state = {}
 
-        self.apply_mods()
+    def get_state(self):
+        '''
+        Runtime state changed while firing, the modded stats are left to reset and update_mods.
+        '''
+        return (self.attack_index, self.magazineSize.current, self.unique_proc_count, self.multishot_damage, list(self.forcedProc),
+                self.weapon.damagePerShot_m["multishot_multiplier"], self.weapon.procChance_m["multishot_multiplier"], self.weapon.last_encumber_time)
+
+    def set_state(self, state):
+        attack_index, magazine, unique_proc_count, multishot_damage, forced_proc, damage_multishot, proc_multishot, last_encumber_time = state
+        self.attack_index = attack_index
+        self.magazineSize.current = magazine
+        self.multishot_damage = multishot_damage
+        self.forcedProc = list(forced_proc)
+        self.weapon.damagePerShot_m["multishot_multiplier"] = damage_multishot
+        self.weapon.procChance_m["multishot_multiplier"] = proc_multishot
+        self.weapon.last_encumber_time = last_encumber_time
+        if unique_proc_count != self.unique_proc_count:
+            self.unique_proc_count = unique_proc_count
+            self.calc_modded_damage()
+
+    def get_group_fire_modes(self):
+        return [self] + list(self.fire_mode_effects.values())
+
+    def apply_mod_group(self, group:str):
+        for name in GROUP_PARAMETERS[group]:
+            getattr(self, name).reset()
+        for fire_mode in self.get_group_fire_modes():
+            getattr(fire_mode, f"apply_{group}_mods")()
+
+    def save_group(self, fire_mode:FireMode, group:str):
+        state = []
+        for name in GROUP_PARAMETERS[group]:
+            parameter = getattr(fire_mode, name)
+            state.append(tuple(getattr(parameter, attr) for attr in get_state_attrs(parameter)))
+        if group == "damage":
+            state.append((fire_mode.procProbabilities, fire_mode.condition_overloaded))
+        return state
+
+    def restore_group(self, fire_mode:FireMode, group:str, state):
+        if group == "damage":
+            # units cache damage tables against damage_version
+            if fire_mode.damagePerShot.modded is not state[0][-1]:
+                fire_mode.damage_version += 1
+            fire_mode.procProbabilities, fire_mode.condition_overloaded = state[-1]
+        for name, values in zip(GROUP_PARAMETERS[group], state):
+            parameter = getattr(fire_mode, name)
+            for attr, value in zip(get_state_attrs(parameter), values):
+                setattr(parameter, attr, value)
 
     def apply_mods(self):
-        self.condition_overloaded = (self.weapon.damagePerShot_m["condition_overload_base"] > 0) or (self.weapon.damagePerShot_m["multiplicative_condition_overload"] > 0)
+        self.apply_damage_mods()
+        self.apply_crit_mods()
+        self.apply_multishot_mods()
+        self.apply_status_mods()
+        self.apply_fire_rate_mods()
+        self.apply_magazine_mods()
+
+        for fire_mode_effect in self.fire_mode_effects:
+            self.fire_mode_effects[fire_mode_effect].apply_mods()
 
-        ## Damage
+    def apply_damage_mods(self):
+        self.condition_overloaded = (self.weapon.damagePerShot_m["condition_overload_base"] > 0) or (self.weapon.damagePerShot_m["multiplicative_condition_overload"] > 0)
         self.calc_full_damage_stack()
-        
+
+    def apply_crit_mods(self):
         ## Critical Chance
         self.criticalChance.modded = ((self.criticalChance.base + self.weapon.criticalChance_m["additive_base"]) * \
                                                 (1 + self.weapon.criticalChance_m["base"]) + self.weapon.criticalChance_m["additive_final"] ) * \
@@ -227,28 +379,26 @@ class FireMode():
         cm_modded = self.criticalMultiplier.base_modified * (<float>1 + <float>self.weapon.criticalMultiplier_m["base"]) + <float>self.weapon.criticalMultiplier_m["additive_final"] 
         self.criticalMultiplier.modded = cm_modded
 
-
-        ## Multishot
+    def apply_multishot_mods(self):
         self.multishot.modded = <float>self.multishot.base * (<float>1 + <float>self.weapon.multishot_m["base"]) if self.primary_effect else <float>self.multishot.base
         if self.trigger == "HELD":
             self.multishot.modded = min(1, self.multishot.modded) + max(0, self.multishot.modded-1) * <float>self.weapon.damagePerShot_m["multishot_damage"]
 
-        ## Status chance
+    def apply_status_mods(self):
         self.procChance.modded = ((self.procChance.base + self.weapon.procChance_m["additive_base"]) * (1 + self.weapon.procChance_m["base"]) \
                                     + self.weapon.procChance_m["additive_final"]) *\
                                         self.weapon.procChance_m["final_multiplier"]
 
-        ## Other
+    def apply_fire_rate_mods(self):
         self.fireRate.modded = <float>self.fireRate.base * (<float>1 + <float>self.weapon.fireRate_m["base"])
         self.fireTime.modded = <float>20 if self.fireRate.modded<=0.05 else <float>(1 / self.fireRate.modded)
         self.reloadTime.modded = self.reloadTime.base / (1 + self.weapon.reloadTime_m["base"])
-        self.magazineSize.modded = self.magazineSize.base * (1 + self.weapon.magazineSize_m["base"])
         self.chargeTime.modded = self.chargeTime.base / (1 + self.weapon.fireRate_m["base"])
         self.embedDelay.modded = self.embedDelay.base
         self.ammoCost.modded = self.ammoCost.base * max(0, 1 - self.weapon.ammoCost_m["base"]) * max(0, 1 - self.weapon.ammoCost_m["energized_munitions"])
 
-        for fire_mode_effect in self.fire_mode_effects:
-            self.fire_mode_effects[fire_mode_effect].apply_mods()
+    def apply_magazine_mods(self):
+        self.magazineSize.modded = self.magazineSize.base * (1 + self.weapon.magazineSize_m["base"])
 
     def calc_full_damage_stack(self):
         np.copyto( self.damagePerShot.proportions, self.damagePerShot.base_proportions )
@@ -318,12 +468,14 @@ class FireMode():
 
         self.damagePerShot.modded = ((self.damagePerShot.quantized * self.damagePerShot.base_total) * damage_multiplier).astype(np.single)
         self.totalDamage.modded = self.totalDamage.base_modified * damage_multiplier
+        self.damage_version += 1
 
         for fire_mode_effect in self.fire_mode_effects:
             self.fire_mode_effects[fire_mode_effect].calc_modded_damage()
 
     def pull_trigger(self, enemy:Unit):
-        multishot_roll = get_tier(self.multishot.modded)
+        rng = self.simulation.rng
+        multishot_roll = rng.get_tier(self.multishot.modded)
         multishot = multishot_roll
 
         self.magazineSize.current -= self.ammoCost.modded
@@ -339,12 +491,12 @@ class FireMode():
                 self.multishot_damage = <float>0 if i == 0 else <float>self.weapon.damagePerShot_m["multishot_damage"]
 
             fm_time = self.simulation.time + self.embedDelay.modded
-            heapq.heappush(self.simulation.event_queue, (fm_time, self.simulation.consume_call_index(), EventTrigger(enemy.pellet_hit, name="Pellet hit", fire_mode=self, info_callback=enemy.get_last_crit_info, bodypart=self.target_bodypart)))
+            self.simulation.event_queue.push(fm_time, ev.EV_PELLET_HIT, enemy, self, self.target_bodypart)
 
             for fme in self.fire_mode_effects.values():
                 fme_time = fme.embedDelay.modded + fm_time + 1e-4
-                for _ in range(get_tier(fme.multishot.modded)):
-                    heapq.heappush(self.simulation.event_queue, (fme_time, self.simulation.consume_call_index(), EventTrigger(enemy.pellet_hit, name=f"{fme.name} hit", fire_mode=fme, info_callback=enemy.get_last_crit_info, bodypart=self.target_bodypart)))
+                for _ in range(rng.get_tier(fme.multishot.modded)):
+                    self.simulation.event_queue.push(fme_time, ev.EV_EFFECT_HIT, enemy, fme, self.target_bodypart)
 
 
         if self.magazineSize.current > 0:
@@ -353,7 +505,7 @@ class FireMode():
             self.magazineSize.current = self.magazineSize.modded
             next_event = self.simulation.time + max(self.reloadTime.modded, self.fireTime.modded) + self.chargeTime.modded
 
-        heapq.heappush(self.simulation.event_queue, (next_event, self.simulation.consume_call_index(), EventTrigger(self.pull_trigger, enemy=enemy)))
+        self.simulation.event_queue.push(next_event, ev.EV_TRIGGER, self, enemy)
 
     def get_info(self):
         return dict(weapon=self.weapon.name, fire_mode=self.name)
@@ -363,9 +515,6 @@ def aid(x):
     # block address of an array.
     return x.__array_interface__['data'][0]
 
-def get_tier(chance):
-    return int(random()<(chance%1)) + int(chance)
-
 class FireModeEffect(FireMode):
     def __init__(self, fire_mode:FireMode, name:str) -> None:
         self.fire_mode = fire_mode
@@ -385,6 +534,7 @@ class FireModeEffect(FireMode):
         self.embedDelay = Parameter( self.data.get("embedDelay", <float>0) )
         self.forcedProc = self.data.get("forcedProc", [])
         self.radial = self.data.get("radial", False)
+        self.damage_version = 0
 
         # self.fire_mode_effects:List[FireModeEffect] = []
         self.fire_mode_effects:dict = {}
@@ -393,6 +543,14 @@ class FireModeEffect(FireMode):
         return getattr(self.fire_mode, attr)
 
 
+def get_state_attrs(parameter):
+    if isinstance(parameter, DamageParameter):
+        return DAMAGE_PARAMETER_STATE
+    if isinstance(parameter, ModifyParameter):
+        return MODIFY_PARAMETER_STATE
+    return PARAMETER_STATE
+
+
 class DamageParameter():
     def __init__(self, base: np.array) -> None:
         self.base = base.astype(np.single)
@@ -447,13 +605,6 @@ class Parameter():
         self.modded = self.base
 
 
-class EventTrigger():
-    def __init__(self, func, name="", info_callback=None, **kwargs) -> None:
-        self.func = func 
-        self.kwargs = kwargs # kwargs for func
-        self.name = name
-        self.info_callback = info_callback
-
 def parse_text(text, combine_rule=const.COMBINE_ADD, parse_rule=const.BASE_RULE):
     if combine_rule == const.COMBINE_ADD:
         return sum([float(i) for i in re.findall(parse_rule, text)])